@@ -18,12 +18,27 @@ app.config['DATABASE_URL'] = os.getenv('DATABASE_URL', 'sqlite:///qr_inventory.d
 app.config['ALERTS_ENABLED'] = os.getenv('ALERTS_ENABLED', 'false').lower() == 'true'
 
 # Register blueprints
-from routes import auth_bp, site_bp, bag_bp, bag_item_bp, qr_bp
+from routes import auth_bp, site_bp, bag_bp, bag_item_bp, qr_bp, metrics_bp, inventory_bp
 app.register_blueprint(auth_bp)
 app.register_blueprint(site_bp)
 app.register_blueprint(bag_bp)
 app.register_blueprint(bag_item_bp)
 app.register_blueprint(qr_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(inventory_bp)
+
+# Accept gzip/zstd compressed inventory submissions (decompressed while read)
+from middleware.request_decompression import RequestDecompressionMiddleware
+app.wsgi_app = RequestDecompressionMiddleware(app.wsgi_app, prefixes=('/api/inventory',))
+
+# Warm the QR scan cache in the background (bounded by a time budget)
+from services.scan_warmup import WARMUP_ON_START, start_background_warmup
+if WARMUP_ON_START:
+    start_background_warmup()
+
+# Replay inventory sessions spooled while the database was unavailable
+from services.inventory_spool import inventory_spool
+inventory_spool.start_if_pending()
 
 
 @app.route('/health', methods=['GET'])
@@ -54,7 +69,8 @@ def root():
                 'list': 'GET /api/sites',
                 'get': 'GET /api/sites/<id>',
                 'update': 'PATCH /api/sites/<id>',
-                'delete': 'DELETE /api/sites/<id>'
+                'delete': 'DELETE /api/sites/<id>',
+                'scan_bundle': 'GET /api/sites/<id>/scan-bundle?since=<version>'
             },
             'bags': {
                 'create': 'POST /api/sites/<site_id>/bags',
@@ -71,8 +87,18 @@ def root():
                 'delete': 'DELETE /api/items/<id>'
             },
             'qr': {
-                'lookup': 'GET /api/qr/<qr_token>'
-            }
+                'lookup': 'GET /api/qr/<qr_token>',
+                'batch': 'POST /api/qr/batch'
+            },
+            'inventory': {
+                'submit': 'POST /api/inventory/<qr_token>',
+                'bulk': 'POST /api/inventory/bulk',
+                'upload_open': 'POST /api/inventory/<qr_token>/uploads',
+                'upload_status': 'GET /api/inventory/uploads/<upload_id>',
+                'upload_chunk': 'PUT /api/inventory/uploads/<upload_id>/chunks/<index>',
+                'upload_finalize': 'POST /api/inventory/uploads/<upload_id>/finalize'
+            },
+            'metrics': 'GET /api/metrics'
         }
     }), 200
 
@@ -0,0 +1,35 @@
+"""
+Backfill the latest inventory check of every bag from historical sessions
+Run with: python backfill_bag_check_state.py [--chunk-size 500]
+
+Sets bags.last_checked_at, last_session_id and last_problem_count (migration
+007); new submissions maintain them. Safe to re-run.
+"""
+import argparse
+import sys
+from dotenv import load_dotenv
+from database import SessionLocal
+from services.inventory_service import InventoryService
+
+load_dotenv()
+
+
+def backfill_bag_check_state(chunk_size: int):
+    """Recompute bag check state from inventory_sessions/inventory_results"""
+    db = SessionLocal()
+    try:
+        updated = InventoryService.backfill_check_state(db, chunk_size)
+        print(f"✓ Updated check state of {updated} bag(s)")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Failed to backfill bag check state: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chunk-size', type=int, default=500, help='bags per chunk')
+    args = parser.parse_args()
+    backfill_bag_check_state(args.chunk_size)
@@ -0,0 +1,96 @@
+"""
+Benchmark: alert email throughput, new SMTP connection per message vs pooled connections
+
+Run from backend/:
+    python benchmarks/bench_alert_mailer.py [--messages 500] [--latency-ms 2] [--pool-size 4]
+
+Sends to a local SMTPSink (tests/smtp_sink.py) that sleeps --latency-ms
+before each reply to stand in for the network round trip to a real relay.
+Reports messages/second for: one connection per message (connect + EHLO +
+QUIT every time), one pooled connection reused sequentially, and the pool
+used by --pool-size threads (as AlertWorker does with send_concurrency).
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['FLASK_DEBUG'] = 'false'
+
+from services.alert_mailer import AlertMailer, SMTPConnectionPool
+from tests.smtp_sink import SMTPSink
+
+ALERT = {
+    'session_id': 1,
+    'checked_at': '2026-10-17T09:30:00+00:00',
+    'nickname': 'bench',
+    'ip_address': None,
+    'geo_city': None,
+    'geo_country': None,
+    'site': {'id': 1, 'name': 'Bench Site'},
+    'bag': {'id': 1, 'name': 'Bench Bag'},
+    'recipients': ['bench@example.com'],
+    'problems': [
+        {'bag_item_id': i, 'item_name': f'Item {i}', 'status': 'missing', 'observed_qty': None,
+         'expected_qty': None, 'notes': None}
+        for i in range(20)
+    ],
+    'expiring': [],
+    'problem_count': 20
+}
+
+
+def bench_connection_per_message(port: int, messages: int) -> float:
+    message = AlertMailer(None).build_message(ALERT)
+    started = time.perf_counter()
+    for _ in range(messages):
+        with smtplib.SMTP('127.0.0.1', port) as smtp:
+            smtp.ehlo()
+            smtp.send_message(message)
+    return time.perf_counter() - started
+
+
+def bench_pool(port: int, messages: int, threads: int, pool_size: int) -> float:
+    mailer = AlertMailer(SMTPConnectionPool('127.0.0.1', port, starttls=False, size=pool_size))
+    started = time.perf_counter()
+    if threads == 1:
+        for _ in range(messages):
+            mailer.send_alert(ALERT)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(mailer.send_alert, [ALERT] * messages))
+    elapsed = time.perf_counter() - started
+    mailer.pool.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated delay per SMTP reply')
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    with SMTPSink(latency=args.latency_ms / 1000) as sink:
+        runs = [
+            ('connection per message', bench_connection_per_message(sink.port, args.messages)),
+            ('pooled, 1 thread', bench_pool(sink.port, args.messages, 1, args.pool_size)),
+            (f'pooled, {args.pool_size} threads', bench_pool(sink.port, args.messages, args.pool_size,
+                                                              args.pool_size))
+        ]
+        connections = sink.connections
+
+    print(f"{args.messages} messages, {args.latency_ms} ms per SMTP reply")
+    print(f"{'mode':<26}{'seconds':>10}{'msg/s':>10}")
+    for name, elapsed in runs:
+        print(f"{name:<26}{elapsed:>10.2f}{args.messages / elapsed:>10.0f}")
+    print(f"(sink saw {connections} connections in total)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: inventory submission, Core executemany vs per-object ORM inserts
+
+Run from backend/:
+    python benchmarks/bench_inventory_submit.py [--sizes 10 100 1000] [--submissions 200]
+
+Uses a throwaway SQLite file by default. Point BENCH_DATABASE_URL at a
+(remote) PostgreSQL database to measure production-like round trips; the
+benchmark creates and drops its own tables there. Each timed submission is
+validation + inserts + commit, as in POST /api/inventory/<qr_token>.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmpdir = tempfile.mkdtemp(prefix='inventory-bench-')
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', f"sqlite:///{_tmpdir}/bench.db")
+os.environ['FLASK_DEBUG'] = 'false'
+
+from database import Base, engine, SessionLocal
+from models import Site, Bag, BagItem, InventorySession, InventoryResult
+from services.inventory_service import InventoryService
+
+STATUSES = ['present', 'missing', 'not_enough', 'battery_low']
+
+
+def seed(db, sizes: list) -> dict:
+    """Create one active bag per checklist size; return size -> (qr_token, body)"""
+    site = Site(name='Bench Site', alert_recipients='["bench@example.com"]')
+    db.add(site)
+    db.flush()
+
+    bags = {}
+    for size in sizes:
+        token = str(uuid.uuid4())
+        bag = Bag(site_id=site.id, name=f"Bag {size}", qr_token=token, active=True)
+        db.add(bag)
+        db.flush()
+        # Every fourth item gets a battery_low result: those need a battery test
+        items = [BagItem(bag_id=bag.id, name=f"Item {i}", expected_qty=5,
+                         test_batteries=STATUSES[i % 4] == 'battery_low')
+                 for i in range(size)]
+        db.add_all(items)
+        db.flush()
+        body = {
+            'nickname': 'bench',
+            'results': [
+                {'bag_item_id': item.id, 'status': STATUSES[i % 4], 'observed_qty': i % 5}
+                for i, item in enumerate(items)
+            ]
+        }
+        bags[size] = (token, body)
+    db.commit()
+    return bags
+
+
+def submit_orm(db, qr_token: str, body: dict) -> None:
+    """Baseline: same validation, then one ORM object per row + flush"""
+    submission = InventoryService.prepare_submission(db, qr_token, body, '127.0.0.1')
+    session = InventorySession(bag_id=submission.bag_id, nickname=submission.nickname,
+                               ip_address=submission.ip_address)
+    db.add(session)
+    db.flush()
+    for result in submission.results:
+        db.add(InventoryResult(session_id=session.id, **result))
+    db.flush()
+    db.commit()
+
+
+def submit_core(db, qr_token: str, body: dict) -> None:
+    """InventoryService.submit: session insert + one executemany for results"""
+    InventoryService.submit(db, qr_token, body, '127.0.0.1')
+
+
+def run(submit, qr_token: str, body: dict, submissions: int) -> dict:
+    """Time `submissions` submissions; return latency stats in ms"""
+    db = SessionLocal()
+    samples = []
+    try:
+        for _ in range(submissions):
+            start = time.perf_counter()
+            submit(db, qr_token, body)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    finally:
+        db.close()
+
+    samples.sort()
+    return {
+        'mean': statistics.mean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[max(0, int(len(samples) * 0.99) - 1)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--submissions', type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        bags = seed(db, args.sizes)
+    finally:
+        db.close()
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{args.submissions} submissions per size and mode\n")
+    print(f"{'items':>6} {'mode':<6} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for size in args.sizes:
+        token, body = bags[size]
+        for name, submit in (('orm', submit_orm), ('core', submit_core)):
+            run(submit, token, body, min(10, args.submissions))  # warm-up
+            stats = run(submit, token, body, args.submissions)
+            print(f"{size:>6} {name:<6} {stats['mean']:>9.3f} {stats['p50']:>9.3f} {stats['p99']:>9.3f}")
+
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: QR scan lookup, snapshot vs joined single-statement vs two-query path
+
+Run from backend/:
+    python benchmarks/bench_qr_lookup.py [--bags 200] [--items 20] [--lookups 2000]
+
+Uses a throwaway SQLite file by default. Point BENCH_DATABASE_URL at a
+(remote) PostgreSQL database to measure the round-trip saving that matters
+in production; the benchmark creates and drops its own tables there.
+Bypasses the scan cache so every lookup hits the database.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmpdir = tempfile.mkdtemp(prefix='qr-bench-')
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', f"sqlite:///{_tmpdir}/bench.db")
+os.environ['FLASK_DEBUG'] = 'false'
+
+from sqlalchemy import event
+from database import Base, engine, SessionLocal
+from models import Site, Bag, BagItem
+from services.qr_service import QRService
+from services.scan_snapshot_service import ScanSnapshotService
+
+
+def seed(db, bag_count: int, items_per_bag: int) -> list:
+    """Create one site with bag_count active bags of items_per_bag items each"""
+    site = Site(name='Bench Site', alert_recipients='["bench@example.com"]')
+    db.add(site)
+    db.flush()
+
+    tokens = []
+    for b in range(bag_count):
+        token = str(uuid.uuid4())
+        bag = Bag(site_id=site.id, name=f"Bag {b}", qr_token=token, active=True)
+        db.add(bag)
+        db.flush()
+        db.add_all([
+            BagItem(bag_id=bag.id, name=f"Item {i}", expected_qty=i, test_batteries=(i % 5 == 0))
+            for i in range(items_per_bag)
+        ])
+        tokens.append(token)
+    db.commit()
+    return tokens
+
+
+def run(loader, tokens: list, lookups: int) -> dict:
+    """Time `lookups` random lookups with loader(db, token); return latency stats in ms"""
+    statements = {'count': 0}
+
+    def count_statement(*args):
+        statements['count'] += 1
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    db = SessionLocal()
+    samples = []
+    try:
+        for _ in range(lookups):
+            token = random.choice(tokens)
+            start = time.perf_counter()
+            loader(db, token)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    finally:
+        db.close()
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    samples.sort()
+    return {
+        'mean': statistics.mean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99) - 1],
+        'statements_per_lookup': statements['count'] / lookups
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--bags', type=int, default=200)
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        tokens = seed(db, args.bags, args.items)
+        ScanSnapshotService.rebuild_all(db)
+    finally:
+        db.close()
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{args.bags} bags x {args.items} items, {args.lookups} lookups per mode\n")
+    print(f"{'mode':<12} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'stmts/lookup':>13}")
+    for name, loader in (
+        ('two_query', QRService._load_scan_entry_two_query),
+        ('joined', QRService._load_scan_entry_joined),
+        ('snapshot', QRService._load_scan_entry_snapshot),
+    ):
+        run(loader, tokens, min(100, args.lookups))  # warm-up
+        stats = run(loader, tokens, args.lookups)
+        print(f"{name:<12} {stats['mean']:>9.3f} {stats['p50']:>9.3f} {stats['p99']:>9.3f} "
+              f"{stats['statements_per_lookup']:>13.1f}")
+
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == '__main__':
+    main()
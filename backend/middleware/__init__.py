@@ -2,5 +2,6 @@
 QR Inventory MVP - Middleware
 """
 from .auth_middleware import require_auth
+from .rate_limit import rate_limit
 
-__all__ = ['require_auth']
+__all__ = ['require_auth', 'rate_limit']
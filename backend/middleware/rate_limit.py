@@ -0,0 +1,161 @@
+"""
+Rate limiting middleware for anonymous endpoints (per IP and per QR token)
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, List, Optional
+from flask import request, jsonify
+from models.types import parse_qr_token
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by string (client IP, QR token, ...).
+
+    Buckets refill lazily on access (no timer thread). Keys are spread over
+    independently locked shards; each shard keeps at most max_keys / shards
+    buckets and drops the least recently used one when full (a dropped key
+    simply starts again with a full bucket).
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000, shards: int = 16):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.shard_size = max(1, max_keys // shards)
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self.rejections = 0
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """
+        Take cost tokens from the bucket of key.
+
+        Returns:
+            0.0 if allowed, otherwise seconds until enough tokens are available
+        """
+        index = hash(key) % len(self._shards)
+        buckets = self._shards[index]
+        now = time.monotonic()
+        with self._locks[index]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+                while len(buckets) >= self.shard_size:
+                    buckets.popitem(last=False)
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                buckets.move_to_end(key)
+
+            if tokens >= cost:
+                buckets[key] = [tokens - cost, now]
+                return 0.0
+
+            buckets[key] = [tokens, now]
+            self.rejections += 1
+            return (cost - tokens) / self.rate
+
+    def reset(self) -> None:
+        """Drop all buckets and counters"""
+        for lock, buckets in zip(self._locks, self._shards):
+            with lock:
+                buckets.clear()
+        self.rejections = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return tracked key count and rejection counter"""
+        return {
+            'keys': sum(len(buckets) for buckets in self._shards),
+            'rate': self.rate,
+            'burst': self.burst,
+            'rejections': self.rejections
+        }
+
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+
+# Process-wide limiters shared by the anonymous routes
+ip_limiter = TokenBucketLimiter(
+    rate=float(os.getenv('RATE_LIMIT_IP_PER_SECOND', '20')),
+    burst=float(os.getenv('RATE_LIMIT_IP_BURST', '100'))
+)
+qr_token_limiter = TokenBucketLimiter(
+    rate=float(os.getenv('RATE_LIMIT_QR_TOKEN_PER_SECOND', '5')),
+    burst=float(os.getenv('RATE_LIMIT_QR_TOKEN_BURST', '30'))
+)
+
+
+def _too_many_requests(retry_after: float):
+    response = jsonify({
+        'error': {
+            'code': 'RATE_LIMITED',
+            'message': 'Too many requests'
+        }
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(token_arg: Optional[str] = None):
+    """
+    Decorator to rate-limit an anonymous route per client IP and,
+    if token_arg names a URL parameter, per QR token in that parameter
+    (keyed by its canonical form, so every spelling of a token shares one
+    bucket; unparsable values are only limited per IP).
+    Runs before the route opens a database session.
+    Returns 429 with Retry-After: {"error": {"code": "RATE_LIMITED", ...}}
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                retry_after = ip_limiter.acquire(request.remote_addr or '')
+                if not retry_after and token_arg is not None:
+                    token = parse_qr_token(str(kwargs.get(token_arg)))
+                    if token is not None:
+                        retry_after = qr_token_limiter.acquire(token)
+                if retry_after:
+                    return _too_many_requests(retry_after)
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
+
+
+def rate_limit_batch(qr_tokens: List[Optional[str]]):
+    """
+    Charge a batch request (route decorated with rate_limit()) for every QR
+    token it looks up: one request per token to the client IP (capped at the
+    IP burst so a full batch stays possible; the decorator charged the first)
+    and one request to the bucket of each distinct parsed token.
+
+    Args:
+        qr_tokens: canonical token per requested token (None if unparsable)
+
+    Returns:
+        None if allowed, otherwise the 429 response (the whole batch is rejected)
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    retry_after = ip_limiter.acquire(request.remote_addr or '', min(len(qr_tokens), ip_limiter.burst) - 1)
+    if not retry_after:
+        for token in dict.fromkeys(token for token in qr_tokens if token is not None):
+            retry_after = qr_token_limiter.acquire(token)
+            if retry_after:
+                break
+    if retry_after:
+        return _too_many_requests(retry_after)
+    return None
+
+
+def reset_rate_limits() -> None:
+    """Drop all rate limit state (tests, admin tooling)"""
+    ip_limiter.reset()
+    qr_token_limiter.reset()
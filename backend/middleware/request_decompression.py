@@ -0,0 +1,156 @@
+"""
+Request decompression - Content-Encoding: gzip (and zstd) request bodies
+
+WSGI middleware that replaces wsgi.input of compressed requests under the
+given path prefixes with a streaming decompressor, so routes read (and
+NDJSON bulk uploads parse line by line) the plain body without the whole
+payload ever being inflated in memory. Reading past the decompressed-size
+limit raises RequestEntityTooLarge (413); corrupt or truncated data raises
+InvalidRequestEncoding (400).
+
+zstd needs the optional `zstandard` package; without it zstd bodies are
+answered 415 like any other unsupported encoding.
+"""
+import gzip
+import io
+import json
+import os
+import zlib
+from typing import IO, Iterable, Optional, Tuple
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.wsgi import LimitedStream
+
+try:
+    import zstandard
+except ImportError:  # optional dependency: zstd request bodies unsupported
+    zstandard = None
+
+# Max decompressed size of one request body
+REQUEST_MAX_DECOMPRESSED_BYTES = int(os.getenv('REQUEST_MAX_DECOMPRESSED_BYTES', str(64 * 1024 * 1024)))
+
+_DECODE_ERRORS: Tuple[type, ...] = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+class InvalidRequestEncoding(BadRequest):
+    """Compressed request body is corrupt or truncated"""
+    description = "Request body is not valid for its Content-Encoding"
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content-Encoding values accepted on request bodies"""
+    return ('gzip', 'zstd') if zstandard is not None else ('gzip',)
+
+
+class DecompressedStream(io.RawIOBase):
+    """Read-only stream of the decompressed body, at most max_bytes long"""
+
+    def __init__(self, decoder: IO[bytes], max_bytes: int):
+        self._decoder = decoder
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # One byte more than allowed tells "exactly at the limit" from "over it"
+        size = min(len(buffer), self.max_bytes - self.bytes_read + 1)
+        try:
+            data = self._decoder.read(size)
+        except _DECODE_ERRORS as e:
+            raise InvalidRequestEncoding() from e
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise RequestEntityTooLarge(f"Decompressed request body exceeds {self.max_bytes} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        try:
+            self._decoder.close()
+        finally:
+            super().close()
+
+
+def decompressing_stream(raw: IO[bytes], encoding: str,
+                         max_bytes: int = REQUEST_MAX_DECOMPRESSED_BYTES) -> IO[bytes]:
+    """
+    Wrap a compressed body stream.
+
+    Args:
+        raw: compressed body (must end at the end of the body)
+        encoding: 'gzip' or 'zstd'
+        max_bytes: max decompressed size
+
+    Returns:
+        buffered binary stream of the decompressed body
+    """
+    if encoding == 'gzip':
+        decoder = gzip.GzipFile(fileobj=raw, mode='rb')
+    elif encoding == 'zstd' and zstandard is not None:
+        decoder = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    else:
+        raise ValueError(f"unsupported encoding: {encoding}")
+    return io.BufferedReader(DecompressedStream(decoder, max_bytes), buffer_size=65536)
+
+
+class RequestDecompressionMiddleware:
+    """
+    WSGI middleware decompressing request bodies of paths under `prefixes`.
+
+    Usage: app.wsgi_app = RequestDecompressionMiddleware(app.wsgi_app, ('/api/inventory',))
+    """
+
+    def __init__(self, wsgi_app, prefixes: Iterable[str],
+                 max_bytes: int = REQUEST_MAX_DECOMPRESSED_BYTES):
+        self.wsgi_app = wsgi_app
+        self.prefixes = tuple(prefixes)
+        self.max_bytes = max_bytes
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if (not encoding or encoding == 'identity'
+                or not environ.get('PATH_INFO', '').startswith(self.prefixes)):
+            return self.wsgi_app(environ, start_response)
+
+        if encoding == 'x-gzip':
+            encoding = 'gzip'
+        if encoding not in supported_encodings():
+            return self._unsupported(encoding, start_response)
+
+        environ['wsgi.input'] = decompressing_stream(self._raw_input(environ), encoding, self.max_bytes)
+        # The decompressed length is unknown: read to the end of the stream
+        environ.pop('CONTENT_LENGTH', None)
+        environ.pop('HTTP_CONTENT_ENCODING')
+        environ['wsgi.input_terminated'] = True
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _raw_input(environ) -> IO[bytes]:
+        """Compressed body, bounded by Content-Length unless the server terminates it"""
+        stream = environ['wsgi.input']
+        if environ.get('wsgi.input_terminated'):
+            return stream
+        content_length: Optional[str] = environ.get('CONTENT_LENGTH')
+        try:
+            length = max(0, int(content_length)) if content_length else 0
+        except ValueError:
+            length = 0
+        return LimitedStream(stream, length)
+
+    @staticmethod
+    def _unsupported(encoding: str, start_response):
+        body = json.dumps({
+            'error': {
+                'code': 'UNSUPPORTED_ENCODING',
+                'message': f"Content-Encoding {encoding} is not supported (use {', '.join(supported_encodings())})"
+            }
+        }).encode('utf-8')
+        start_response('415 Unsupported Media Type', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Accept-Encoding', ', '.join(supported_encodings()))
+        ])
+        return [body]
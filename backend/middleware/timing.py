@@ -0,0 +1,177 @@
+"""
+Request timing - per-stage durations as histograms and a Server-Timing header
+
+A route decorated with @timed(metric) records the time spent in each
+`with stage(name):` block it (or the services it calls) runs. Stage
+durations and the total go to in-process histograms and to the response's
+Server-Timing header. HTTP errors the route raises (e.g. 413 from request
+decompression) are rendered by the errorhandlers within the timing, so
+they are timed too. stage() is a no-op outside a timed request.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional
+from flask import current_app, make_response
+from werkzeug.exceptions import HTTPException
+
+# Upper bounds (ms) of the histogram buckets; one more bucket for slower values
+BUCKET_BOUNDS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram of durations in milliseconds"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """Record one duration"""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+            self.count += 1
+            self.sum_ms += value_ms
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of values (max_ms for the last bucket)"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = fraction * self.count
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return self.bounds[index] if index < len(self.bounds) else self.max_ms
+            return self.max_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Return count, sum, max, p50/p95/p99 and cumulative bucket counts"""
+        p50, p95, p99 = (self.percentile(fraction) for fraction in (0.5, 0.95, 0.99))
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.bounds + ('+Inf',), self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'count': self.count,
+                'sum_ms': round(self.sum_ms, 3),
+                'max_ms': round(self.max_ms, 3),
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'buckets': buckets
+            }
+
+
+class StageTimer:
+    """Durations of the stages of one request (repeated stages add up)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        """Server-Timing header value: stage;dur=ms, ..., total;dur=ms"""
+        entries = [f'{name};dur={duration:.3f}' for name, duration in self.stages.items()]
+        entries.append(f'total;dur={total_ms:.3f}')
+        return ', '.join(entries)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar('request_stage_timer', default=None)
+
+# metric -> {'total': Histogram, 'stages': {stage: Histogram}}
+_histograms: Dict[str, Dict[str, Any]] = {}
+_histograms_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as stage `name` of the current timed request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, (time.perf_counter() - started) * 1000)
+
+
+def _metric(metric: str) -> Dict[str, Any]:
+    with _histograms_lock:
+        return _histograms.setdefault(metric, {'total': Histogram(), 'stages': {}})
+
+
+def _observe(metric: str, timer: StageTimer, total_ms: float) -> None:
+    entry = _metric(metric)
+    entry['total'].observe(total_ms)
+    for name, duration in timer.stages.items():
+        histogram = entry['stages'].get(name)
+        if histogram is None:
+            with _histograms_lock:
+                histogram = entry['stages'].setdefault(name, Histogram())
+        histogram.observe(duration)
+
+
+def timed(metric: str):
+    """
+    Decorator to time a route: records its stages and total under `metric`
+    (e.g. inventory_submission -> inventory_submission_duration_ms) and adds
+    a Server-Timing header to the response.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            timer = StageTimer()
+            token = _current_timer.set(timer)
+            try:
+                try:
+                    rv = f(*args, **kwargs)
+                except HTTPException as e:
+                    rv = current_app.handle_http_exception(e)
+                response = make_response(rv)
+            finally:
+                _current_timer.reset(token)
+            total_ms = timer.elapsed_ms()
+            response.headers['Server-Timing'] = timer.server_timing(total_ms)
+            _observe(metric, timer, total_ms)
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def timing_stats() -> Dict[str, Any]:
+    """Return histograms: {<metric>_duration_ms: {...}, <metric>_stage_ms: {stage: {...}}}"""
+    with _histograms_lock:
+        metrics = {metric: (entry['total'], dict(entry['stages'])) for metric, entry in _histograms.items()}
+    stats = {}
+    for metric, (total, stages) in metrics.items():
+        stats[f'{metric}_duration_ms'] = total.stats()
+        stats[f'{metric}_stage_ms'] = {name: histogram.stats() for name, histogram in stages.items()}
+    return stats
+
+
+def reset_timings() -> None:
+    """Drop all recorded timings (tests, admin tooling)"""
+    with _histograms_lock:
+        _histograms.clear()
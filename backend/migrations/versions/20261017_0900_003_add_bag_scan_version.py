@@ -0,0 +1,29 @@
+"""add_bag_scan_version
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 09:00:00.000000
+
+Adds bags.scan_version, bumped on every change to a bag or its items.
+Used as the strong ETag of the public QR lookup response.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add scan_version column to bags"""
+    op.add_column('bags', sa.Column('scan_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Drop scan_version column from bags"""
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.drop_column('scan_version')
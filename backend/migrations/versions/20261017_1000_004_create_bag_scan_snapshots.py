@@ -0,0 +1,41 @@
+"""create_bag_scan_snapshots
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 10:00:00.000000
+
+Creates bag_scan_snapshots: pre-serialized QR scan response per active bag,
+rebuilt in the same transaction as any bag/item change.
+Existing bags fall back to live assembly until snapshots are built:
+    python rebuild_scan_snapshots.py
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create bag_scan_snapshots table"""
+    op.create_table(
+        'bag_scan_snapshots',
+        sa.Column('qr_token', sa.String(length=255), nullable=False),
+        sa.Column('bag_id', sa.Integer(), nullable=False),
+        sa.Column('etag', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['bag_id'], ['bags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('qr_token'),
+        sa.UniqueConstraint('bag_id')
+    )
+
+
+def downgrade() -> None:
+    """Drop bag_scan_snapshots table"""
+    op.drop_table('bag_scan_snapshots')
@@ -0,0 +1,122 @@
+"""binary_qr_tokens
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 11:00:00.000000
+
+Stores QR tokens as 16 bytes instead of 36-char strings (native uuid on
+PostgreSQL, BLOB elsewhere) and keeps a single unique index on bags.qr_token
+(drops the duplicate unique constraint from 002).
+
+bags rows are converted in batches of BATCH_SIZE through a new column.
+Scan snapshots are derived data: they are cleared here (scans fall back to
+live assembly) and rebuilt afterwards with:
+    python warm_scan_cache.py
+
+"""
+import uuid
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _binary_token_type():
+    if op.get_bind().dialect.name == 'postgresql':
+        return postgresql.UUID(as_uuid=True)
+    return sa.LargeBinary(length=16)
+
+
+def _copy_tokens(source: str, target: str, convert) -> None:
+    """Copy bags.<source> into bags.<target> in id-ordered batches"""
+    bind = op.get_bind()
+    bags = sa.table('bags', sa.column('id', sa.Integer), sa.column(source), sa.column(target))
+    update = (
+        bags.update()
+        .where(bags.c.id == sa.bindparam('bag_id'))
+        .values({target: sa.bindparam('value')})
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(bags.c.id, bags.c[source])
+            .where(bags.c.id > last_id)
+            .order_by(bags.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(update, [{'bag_id': bag_id, 'value': convert(value)} for bag_id, value in rows])
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Convert bags.qr_token and bag_scan_snapshots.qr_token to 16-byte binary"""
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    token_type = _binary_token_type()
+
+    def to_binary(value):
+        token = uuid.UUID(value)
+        return token if is_postgresql else token.bytes
+
+    # Snapshots: clear and retype (rebuilt by warm_scan_cache.py)
+    op.execute('DELETE FROM bag_scan_snapshots')
+    with op.batch_alter_table('bag_scan_snapshots') as batch_op:
+        batch_op.alter_column(
+            'qr_token',
+            existing_type=sa.String(length=255),
+            type_=token_type,
+            existing_nullable=False,
+            postgresql_using='qr_token::uuid'
+        )
+
+    # Bags: backfill a binary column in batches, then swap it in
+    op.add_column('bags', sa.Column('qr_token_bin', token_type, nullable=True))
+    _copy_tokens('qr_token', 'qr_token_bin', to_binary)
+
+    op.drop_index('ix_bags_qr_token', table_name='bags')
+    if is_postgresql:
+        op.drop_constraint('bags_qr_token_key', 'bags', type_='unique')
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.drop_column('qr_token')
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.alter_column('qr_token_bin', new_column_name='qr_token',
+                              existing_type=token_type, nullable=False)
+    op.create_index('ix_bags_qr_token', 'bags', ['qr_token'], unique=True)
+
+
+def downgrade() -> None:
+    """Convert QR tokens back to strings (unique index only)"""
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    token_type = _binary_token_type()
+
+    def to_string(value):
+        return str(value if is_postgresql else uuid.UUID(bytes=bytes(value)))
+
+    op.add_column('bags', sa.Column('qr_token_str', sa.String(length=255), nullable=True))
+    _copy_tokens('qr_token', 'qr_token_str', to_string)
+
+    op.drop_index('ix_bags_qr_token', table_name='bags')
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.drop_column('qr_token')
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.alter_column('qr_token_str', new_column_name='qr_token',
+                              existing_type=sa.String(length=255), nullable=False)
+    op.create_index('ix_bags_qr_token', 'bags', ['qr_token'], unique=True)
+
+    op.execute('DELETE FROM bag_scan_snapshots')
+    with op.batch_alter_table('bag_scan_snapshots') as batch_op:
+        batch_op.alter_column(
+            'qr_token',
+            existing_type=token_type,
+            type_=sa.String(length=255),
+            existing_nullable=False,
+            postgresql_using='qr_token::text'
+        )
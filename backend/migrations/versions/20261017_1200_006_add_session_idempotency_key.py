@@ -0,0 +1,37 @@
+"""add_session_idempotency_key
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 12:00:00.000000
+
+Adds inventory_sessions.idempotency_key with a unique index on
+(bag_id, idempotency_key): a retried submission carrying the same
+Idempotency-Key header resolves to the original session.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add idempotency_key column and its unique index to inventory_sessions"""
+    op.add_column('inventory_sessions', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_index(
+        'uq_inventory_sessions_idempotency_key',
+        'inventory_sessions',
+        ['bag_id', 'idempotency_key'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Drop idempotency_key column and its index from inventory_sessions"""
+    op.drop_index('uq_inventory_sessions_idempotency_key', table_name='inventory_sessions')
+    with op.batch_alter_table('inventory_sessions') as batch_op:
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,36 @@
+"""add_bag_check_state
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 13:00:00.000000
+
+Adds the latest inventory check of each bag to bags (last_checked_at,
+last_session_id, last_problem_count). Lookups of sessions by bag_id use
+uq_inventory_sessions_idempotency_key (bag_id, idempotency_key) from 006.
+Existing sessions are not backfilled here; run afterwards:
+    python backfill_bag_check_state.py
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add check state columns to bags"""
+    op.add_column('bags', sa.Column('last_checked_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('bags', sa.Column('last_session_id', sa.Integer(), nullable=True))
+    op.add_column('bags', sa.Column('last_problem_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop check state columns from bags"""
+    with op.batch_alter_table('bags') as batch_op:
+        batch_op.drop_column('last_problem_count')
+        batch_op.drop_column('last_session_id')
+        batch_op.drop_column('last_checked_at')
@@ -0,0 +1,65 @@
+"""create_inventory_uploads
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 14:00:00.000000
+
+Creates inventory_uploads / inventory_upload_chunks (resumable chunked
+submissions) and a unique index on inventory_results (session_id,
+bag_item_id).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create upload tables and the results index"""
+    if op.get_bind().dialect.name == 'postgresql':
+        token_type = postgresql.UUID(as_uuid=True)
+    else:
+        token_type = sa.LargeBinary(length=16)
+
+    op.create_table(
+        'inventory_uploads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('upload_token', token_type, nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.Column('finalized_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['inventory_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('upload_token'),
+        sa.UniqueConstraint('session_id')
+    )
+    op.create_table(
+        'inventory_upload_chunks',
+        sa.Column('upload_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('result_count', sa.Integer(), nullable=False),
+        sa.Column('problem_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['upload_id'], ['inventory_uploads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_id', 'chunk_index')
+    )
+    op.create_index(
+        'uq_inventory_results_session_item',
+        'inventory_results',
+        ['session_id', 'bag_item_id'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Drop upload tables and the results index"""
+    op.drop_index('uq_inventory_results_session_item', table_name='inventory_results')
+    op.drop_table('inventory_upload_chunks')
+    op.drop_table('inventory_uploads')
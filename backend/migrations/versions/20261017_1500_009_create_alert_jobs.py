@@ -0,0 +1,48 @@
+"""create_alert_jobs
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 15:00:00.000000
+
+Creates alert_jobs: the queue of inventory sessions waiting for problem
+analysis, claimed by alert worker processes.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create alert_jobs table"""
+    op.create_table(
+        'alert_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'DONE', 'FAILED', name='alertjobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.Column('lease_token', sa.String(length=36), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('problem_count', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['inventory_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_id')
+    )
+    op.create_index('ix_alert_jobs_status_run_after', 'alert_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop alert_jobs table"""
+    op.drop_index('ix_alert_jobs_status_run_after', table_name='alert_jobs')
+    op.drop_table('alert_jobs')
+    sa.Enum(name='alertjobstatus').drop(op.get_bind(), checkfirst=True)
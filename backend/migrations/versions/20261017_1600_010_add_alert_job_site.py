@@ -0,0 +1,37 @@
+"""add_alert_job_site
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 16:00:00.000000
+
+Adds alert_jobs.site_id (site of the session's bag) so workers can claim
+all pending jobs of a site together and send one digest per site.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add and fill alert_jobs.site_id"""
+    op.add_column('alert_jobs', sa.Column('site_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE alert_jobs SET site_id = ("
+        "SELECT bags.site_id FROM inventory_sessions "
+        "JOIN bags ON bags.id = inventory_sessions.bag_id "
+        "WHERE inventory_sessions.id = alert_jobs.session_id)"
+    )
+    op.create_index('ix_alert_jobs_site_id_status', 'alert_jobs', ['site_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop alert_jobs.site_id"""
+    op.drop_index('ix_alert_jobs_site_id_status', table_name='alert_jobs')
+    with op.batch_alter_table('alert_jobs') as batch_op:
+        batch_op.drop_column('site_id')
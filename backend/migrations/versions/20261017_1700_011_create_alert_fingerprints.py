@@ -0,0 +1,43 @@
+"""create_alert_fingerprints
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 17:00:00.000000
+
+Creates alert_fingerprints: problems (bag, item, status) already alerted,
+shared by alert workers to suppress repeat alerts.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import func
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create alert_fingerprints table"""
+    op.create_table(
+        'alert_fingerprints',
+        sa.Column('bag_id', sa.Integer(), nullable=False),
+        sa.Column('bag_item_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['bag_id'], ['bags.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['bag_item_id'], ['bag_items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bag_id', 'bag_item_id', 'status')
+    )
+    op.create_index('ix_alert_fingerprints_bag_item_id', 'alert_fingerprints', ['bag_item_id'], unique=False)
+    op.create_index('ix_alert_fingerprints_expires_at', 'alert_fingerprints', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop alert_fingerprints table"""
+    op.drop_index('ix_alert_fingerprints_expires_at', table_name='alert_fingerprints')
+    op.drop_index('ix_alert_fingerprints_bag_item_id', table_name='alert_fingerprints')
+    op.drop_table('alert_fingerprints')
@@ -7,6 +7,10 @@ from .bag import Bag
 from .bag_item import BagItem
 from .inventory_session import InventorySession
 from .inventory_result import InventoryResult, InventoryStatus
+from .bag_scan_snapshot import BagScanSnapshot
+from .inventory_upload import InventoryUpload, InventoryUploadChunk
+from .alert_job import AlertJob, AlertJobStatus
+from .alert_fingerprint import AlertFingerprint
 
 __all__ = [
     'Admin',
@@ -15,5 +19,11 @@ __all__ = [
     'BagItem',
     'InventorySession',
     'InventoryResult',
-    'InventoryStatus'
+    'InventoryStatus',
+    'BagScanSnapshot',
+    'InventoryUpload',
+    'InventoryUploadChunk',
+    'AlertJob',
+    'AlertJobStatus',
+    'AlertFingerprint'
 ]
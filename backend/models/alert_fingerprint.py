@@ -0,0 +1,27 @@
+"""
+AlertFingerprint model - A problem that was already alerted
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from database import Base
+
+
+class AlertFingerprint(Base):
+    """AlertFingerprint model - Suppresses repeat alerts of a problem until it changes or expires"""
+    __tablename__ = 'alert_fingerprints'
+    __table_args__ = (
+        # Fingerprints of an item are cleared when it is found present again
+        Index('ix_alert_fingerprints_bag_item_id', 'bag_item_id'),
+        Index('ix_alert_fingerprints_expires_at', 'expires_at'),
+    )
+
+    bag_id = Column(Integer, ForeignKey('bags.id', ondelete='CASCADE'), primary_key=True)
+    bag_item_id = Column(Integer, ForeignKey('bag_items.id', ondelete='CASCADE'), primary_key=True)
+    # Result status (missing / not_enough / battery_low) or "expiring:<expiry date>"
+    status = Column(String(32), primary_key=True)
+    # After this the problem is alerted again (reminder)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AlertFingerprint(bag_id={self.bag_id}, bag_item_id={self.bag_item_id}, status={self.status})>"
@@ -0,0 +1,46 @@
+"""
+AlertJob model - Queued problem analysis (and alert email) of an inventory session
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.sql import func
+import enum
+from database import Base
+
+
+class AlertJobStatus(enum.Enum):
+    """Enum for alert job status"""
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class AlertJob(Base):
+    """AlertJob model - One analysis job per completed inventory session"""
+    __tablename__ = 'alert_jobs'
+    __table_args__ = (
+        # Workers claim pending jobs that are due, oldest first
+        Index('ix_alert_jobs_status_run_after', 'status', 'run_after'),
+        # A claim takes the other pending jobs of the same sites along (digests)
+        Index('ix_alert_jobs_site_id_status', 'site_id', 'status'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey('inventory_sessions.id', ondelete='CASCADE'), nullable=False, unique=True)
+    # Site of the session's bag (copied at enqueue time to group jobs per site)
+    site_id = Column(Integer, nullable=True)
+    status = Column(Enum(AlertJobStatus), nullable=False, default=AlertJobStatus.PENDING)
+    # Claims made so far (a claim whose lease expired counts as a failed attempt)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not claimable before (digest window, retry backoff)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Lease of the worker batch processing the job; expired leases are reclaimed
+    lease_token = Column(String(36), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Problems found (missing / not_enough / battery_low results plus expiring items)
+    problem_count = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<AlertJob(id={self.id}, session_id={self.session_id}, status={self.status.value})>"
@@ -5,6 +5,7 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
+from models.types import QRToken
 
 
 class Bag(Base):
@@ -15,10 +16,18 @@ class Bag(Base):
     site_id = Column(Integer, ForeignKey('sites.id', ondelete='RESTRICT'), nullable=False)
     name = Column(String(255), nullable=False)
     active = Column(Boolean, nullable=False, default=True)
-    # QR token - unique identifier for bag (UUIDv4 format)
-    qr_token = Column(String(255), unique=True, nullable=False, index=True)
+    # QR token - unique identifier for bag (UUIDv4, stored as 16 bytes; single unique index)
+    qr_token = Column(QRToken, unique=True, nullable=False, index=True)
+    # Bumped whenever the bag or one of its items changes (scan ETag)
+    scan_version = Column(Integer, nullable=False, default=0, server_default='0')
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Latest inventory check (maintained by InventoryService in the submission
+    # transaction; writing them keeps updated_at, which tracks scan changes)
+    last_checked_at = Column(DateTime(timezone=True), nullable=True)
+    last_session_id = Column(Integer, nullable=True)
+    # Results of the latest check with a status other than present
+    last_problem_count = Column(Integer, nullable=True)
 
     # Relationships
     site = relationship('Site', back_populates='bags')
@@ -0,0 +1,23 @@
+"""
+BagScanSnapshot model - Pre-serialized public scan response of an active bag
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+from models.types import QRToken
+
+
+class BagScanSnapshot(Base):
+    """BagScanSnapshot model - Scan JSON rebuilt whenever the bag or its items change"""
+    __tablename__ = 'bag_scan_snapshots'
+
+    # Keyed by qr_token so a scan is a single primary-key read
+    qr_token = Column(QRToken, primary_key=True)
+    bag_id = Column(Integer, ForeignKey('bags.id', ondelete='CASCADE'), nullable=False, unique=True)
+    etag = Column(String(64), nullable=False)
+    # Exact JSON body of GET /api/qr/<qr_token>
+    payload = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<BagScanSnapshot(bag_id={self.bag_id}, etag={self.etag})>"
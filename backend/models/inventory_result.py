@@ -1,7 +1,7 @@
 """
 InventoryResult model - Represents the status of a single item in an inventory check
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -19,6 +19,11 @@ class InventoryStatus(enum.Enum):
 class InventoryResult(Base):
     """InventoryResult model - Status of a single item in inventory check"""
     __tablename__ = 'inventory_results'
+    __table_args__ = (
+        # One result per item and session (chunked uploads cannot report an
+        # item twice); also serves lookups of a session's results
+        Index('uq_inventory_results_session_item', 'session_id', 'bag_item_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey('inventory_sessions.id', ondelete='CASCADE'), nullable=False)
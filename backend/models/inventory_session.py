@@ -1,7 +1,7 @@
 """
 InventorySession model - Represents a single inventory check event
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -10,6 +10,12 @@ from database import Base
 class InventorySession(Base):
     """InventorySession model - A single inventory check event"""
     __tablename__ = 'inventory_sessions'
+    __table_args__ = (
+        # Retried submissions resolve to the original session (insert-or-return);
+        # NULL keys (no Idempotency-Key header) never conflict. Also serves
+        # lookups by bag_id (leading column)
+        Index('uq_inventory_sessions_idempotency_key', 'bag_id', 'idempotency_key', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bag_id = Column(Integer, ForeignKey('bags.id', ondelete='RESTRICT'), nullable=False)
@@ -21,6 +27,8 @@ class InventorySession(Base):
     ip_address = Column(String(45), nullable=True)  # IPv6-compatible (45 chars)
     geo_city = Column(String(255), nullable=True)
     geo_country = Column(String(255), nullable=True)
+    # Client-supplied Idempotency-Key header (unique per bag)
+    idempotency_key = Column(String(255), nullable=True)
 
     # Relationships
     bag = relationship('Bag', back_populates='inventory_sessions')
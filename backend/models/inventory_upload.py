@@ -0,0 +1,38 @@
+"""
+InventoryUpload model - Resumable (chunked) submission of a large inventory check
+"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+from models.types import QRToken
+
+
+class InventoryUpload(Base):
+    """InventoryUpload model - Open or finalized chunked upload of one inventory session"""
+    __tablename__ = 'inventory_uploads'
+
+    id = Column(Integer, primary_key=True)
+    # Public handle of the upload (random UUID: the endpoints are anonymous)
+    upload_token = Column(QRToken, unique=True, nullable=False)
+    # Session receiving the results; counts as a completed check once finalized
+    session_id = Column(Integer, ForeignKey('inventory_sessions.id', ondelete='CASCADE'), nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finalized_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<InventoryUpload(id={self.id}, session_id={self.session_id}, finalized_at={self.finalized_at})>"
+
+
+class InventoryUploadChunk(Base):
+    """InventoryUploadChunk model - One received chunk of results (retries are no-ops)"""
+    __tablename__ = 'inventory_upload_chunks'
+
+    upload_id = Column(Integer, ForeignKey('inventory_uploads.id', ondelete='CASCADE'), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    result_count = Column(Integer, nullable=False)
+    # Results with a status other than present (summed into Bag.last_problem_count)
+    problem_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<InventoryUploadChunk(upload_id={self.upload_id}, chunk_index={self.chunk_index})>"
@@ -0,0 +1,48 @@
+"""
+Custom column types
+"""
+import uuid
+from typing import Optional
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+def parse_qr_token(value: str) -> Optional[str]:
+    """
+    Normalize a QR token from the API to canonical UUID form.
+
+    Returns:
+        str: lowercase hyphenated UUID, or None if value is not a UUID
+    """
+    try:
+        return str(uuid.UUID(value))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class QRToken(TypeDecorator):
+    """
+    UUID QR token stored as 16 bytes: native uuid on PostgreSQL,
+    BLOB(16) elsewhere. Python values are canonical UUID strings.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        token = value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+        return token if dialect.name == 'postgresql' else token.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
@@ -0,0 +1,28 @@
+"""
+Rebuild the pre-serialized QR scan snapshots of all bags
+Run with: python rebuild_scan_snapshots.py
+"""
+import sys
+from dotenv import load_dotenv
+from database import SessionLocal
+from services.scan_snapshot_service import ScanSnapshotService
+
+load_dotenv()
+
+
+def rebuild_scan_snapshots():
+    """Rebuild bag_scan_snapshots from bags and bag_items"""
+    db = SessionLocal()
+    try:
+        count = ScanSnapshotService.rebuild_all(db)
+        print(f"✓ Rebuilt {count} scan snapshot(s)")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Failed to rebuild scan snapshots: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    rebuild_scan_snapshots()
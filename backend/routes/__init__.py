@@ -6,5 +6,7 @@ from .site_routes import site_bp
 from .bag_routes import bag_bp
 from .bag_item_routes import bag_item_bp
 from .qr_routes import qr_bp
+from .metrics_routes import metrics_bp
+from .inventory_routes import inventory_bp
 
-__all__ = ['auth_bp', 'site_bp', 'bag_bp', 'bag_item_bp', 'qr_bp']
+__all__ = ['auth_bp', 'site_bp', 'bag_bp', 'bag_item_bp', 'qr_bp', 'metrics_bp', 'inventory_bp']
@@ -0,0 +1,335 @@
+"""
+Inventory routes - Public endpoint for submitting inventory checks
+No authentication required (anonymous endpoint, rate limited)
+"""
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from database import SessionLocal
+from middleware.rate_limit import rate_limit
+from middleware.request_decompression import InvalidRequestEncoding
+from middleware.timing import stage, timed
+from models.types import parse_qr_token
+from services.inventory_service import InventoryService, SubmissionConflictError
+from services.inventory_spool import DB_UNAVAILABLE_ERRORS, inventory_spool
+from services.inventory_upload_service import InventoryUploadService, UploadConflictError
+from services.inventory_writer import WRITE_BEHIND_ENABLED, inventory_writer
+
+inventory_bp = Blueprint('inventory', __name__)
+
+
+def error_response(code: str, message: str, status_code: int):
+    """Helper to create consistent error responses"""
+    return jsonify({
+        "error": {
+            "code": code,
+            "message": message
+        }
+    }), status_code
+
+
+@inventory_bp.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """Compressed body inflating past REQUEST_MAX_DECOMPRESSED_BYTES"""
+    return error_response('PAYLOAD_TOO_LARGE', e.description, 413)
+
+
+@inventory_bp.errorhandler(InvalidRequestEncoding)
+def invalid_request_encoding(e):
+    """Corrupt or truncated gzip/zstd body"""
+    return error_response('INVALID_INPUT', e.description, 400)
+
+
+@inventory_bp.route('/api/inventory/<qr_token>', methods=['POST'])
+@rate_limit(token_arg='qr_token')
+@timed('inventory_submission')
+def submit_inventory(qr_token):
+    """
+    Submit the results of an inventory check (public endpoint).
+    
+    POST /api/inventory/<qr_token>
+    Headers: Idempotency-Key (optional) - a retry with the same key for the
+             same bag returns the original session instead of a duplicate
+             Content-Encoding (optional) - gzip or zstd compressed body
+    Body: {
+        "nickname": "..." (optional),
+        "results": [{"bag_item_id": 1, "status": "present|missing|not_enough|battery_low",
+                     "observed_qty": 3 (optional), "notes": "..." (optional)}]
+    }
+    
+    Returns:
+        201: {session_id, bag_id, result_count, replayed: false}
+        200: {session_id, bag_id, result_count, replayed: true} for a retried Idempotency-Key
+        202: {status: "accepted", bag_id, result_count} in write-behind mode
+             (INVENTORY_WRITE_BEHIND=true): stored by the background writer
+        202: {status: "accepted", spooled: true, result_count} if the database is
+             unavailable: spooled to disk and stored once it is back
+        400: validation error (or corrupt compressed body)
+        404: bag not found or inactive
+        409: the bag or a checked item was deleted after the checklist was loaded
+        413: decompressed body exceeds REQUEST_MAX_DECOMPRESSED_BYTES
+        415: unsupported Content-Encoding
+        429: rate limit exceeded (Retry-After header)
+        503: write-behind queue full (Retry-After header)
+    Every response but 429 carries a Server-Timing header with the duration
+    of each stage (parse, validate, resolve, write | enqueue | spool) and the total.
+    """
+    with stage('parse'):
+        qr_token = parse_qr_token(qr_token)
+        data = request.get_json(silent=True)
+    if qr_token is None:
+        return error_response('NOT_FOUND', 'Bag not found', 404)
+    if data is None:
+        return error_response('INVALID_INPUT', 'Request body must be JSON', 400)
+    
+    idempotency_key = request.headers.get('Idempotency-Key')
+    
+    db = SessionLocal()
+    try:
+        if not WRITE_BEHIND_ENABLED:
+            result = InventoryService.submit(db, qr_token, data, request.remote_addr, idempotency_key)
+            return jsonify(result), 200 if result['replayed'] else 201
+        
+        submission = InventoryService.prepare_submission(
+            db, qr_token, data, request.remote_addr, idempotency_key
+        )
+        with stage('enqueue'):
+            enqueued = inventory_writer.enqueue(submission)
+        if not enqueued:
+            response, status = error_response('UNAVAILABLE', 'Too many pending submissions, retry later', 503)
+            response.headers['Retry-After'] = '1'
+            return response, status
+        return jsonify({
+            'status': 'accepted',
+            'bag_id': submission.bag_id,
+            'result_count': len(submission.results)
+        }), 202
+    
+    except DB_UNAVAILABLE_ERRORS:
+        # Body and key were validated before the database was touched
+        if not inventory_spool.enabled:
+            raise
+        db.rollback()
+        with stage('spool'):
+            inventory_spool.spool_request(qr_token, data, request.remote_addr, idempotency_key)
+        return jsonify({
+            'status': 'accepted',
+            'spooled': True,
+            'result_count': len(data['results'])
+        }), 202
+    
+    except KeyError:
+        # Both "not found" and "inactive" return 404 to avoid info leakage
+        return error_response('NOT_FOUND', 'Bag not found', 404)
+    
+    except SubmissionConflictError as e:
+        return error_response('CONFLICT', str(e), 409)
+    
+    except ValueError as e:
+        return error_response('INVALID_INPUT', str(e), 400)
+    
+    finally:
+        db.close()
+
+
+@inventory_bp.route('/api/inventory/bulk', methods=['POST'])
+@rate_limit()
+def submit_inventory_bulk():
+    """
+    Upload inventory sessions recorded offline (public endpoint).
+    
+    POST /api/inventory/bulk
+    Body (application/x-ndjson), one session per line:
+        {"qr_token": "...", "idempotency_key": "..." (optional), "nickname": "..." (optional),
+         "results": [...same as POST /api/inventory/<qr_token>...]}
+    
+    The body is parsed line by line and committed every
+    INVENTORY_BULK_CHUNK_SIZE sessions; results stream back as they are stored.
+    The body may be gzip or zstd compressed (Content-Encoding); it is
+    decompressed while it is parsed.
+    
+    Returns:
+        200: application/x-ndjson, one line per input line:
+             {line, ok: true, session_id, bag_id, result_count, replayed}
+             or {line, ok: false, error: {code: INVALID_INPUT|NOT_FOUND|CONFLICT|UNAVAILABLE, message}}
+             If the compressed body turns out corrupt or too large, a last
+             {ok: false, error: {code: INVALID_INPUT|PAYLOAD_TOO_LARGE, message}} line
+             ends the stream (lines not answered before it were not stored)
+        415: unsupported Content-Encoding
+        429: rate limit exceeded (Retry-After header)
+    """
+    lines = InventoryService.iter_ndjson(request.stream)
+    ip_address = request.remote_addr
+    
+    def generate():
+        db = SessionLocal()
+        try:
+            for outcome in InventoryService.submit_bulk(db, lines, ip_address):
+                yield json.dumps(outcome) + '\n'
+        except (InvalidRequestEncoding, RequestEntityTooLarge) as e:
+            # Headers are sent: report the failure as the last line
+            db.rollback()
+            code = 'PAYLOAD_TOO_LARGE' if isinstance(e, RequestEntityTooLarge) else 'INVALID_INPUT'
+            yield json.dumps({'ok': False, 'error': {'code': code, 'message': e.description}}) + '\n'
+        finally:
+            db.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@inventory_bp.route('/api/inventory/<qr_token>/uploads', methods=['POST'])
+@rate_limit(token_arg='qr_token')
+def open_inventory_upload(qr_token):
+    """
+    Open a resumable upload for a large inventory check (public endpoint).
+    
+    POST /api/inventory/<qr_token>/uploads
+    Headers: Idempotency-Key (optional) - a retried open returns the same upload
+    Body: {"nickname": "..." (optional)}
+    
+    Then: PUT /api/inventory/uploads/<upload_id>/chunks/<index> for each chunk,
+    POST /api/inventory/uploads/<upload_id>/finalize with {"total_chunks": n}.
+    
+    Returns:
+        201: {upload_id, session_id, bag_id, received_chunks, result_count, finalized}
+        200: same, for a retried Idempotency-Key
+        400: validation error
+        404: bag not found or inactive
+        409: Idempotency-Key already used by a regular submission, or the bag
+             was deleted after its checklist was loaded
+    """
+    qr_token = parse_qr_token(qr_token)
+    if qr_token is None:
+        return error_response('NOT_FOUND', 'Bag not found', 404)
+    
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    
+    db = SessionLocal()
+    try:
+        upload, created = InventoryUploadService.open_upload(
+            db, qr_token, data, request.remote_addr, request.headers.get('Idempotency-Key')
+        )
+        return jsonify(upload), 201 if created else 200
+    
+    except KeyError:
+        return error_response('NOT_FOUND', 'Bag not found', 404)
+    
+    except ValueError as e:
+        return error_response('INVALID_INPUT', str(e), 400)
+    
+    except (UploadConflictError, SubmissionConflictError) as e:
+        return error_response('CONFLICT', str(e), 409)
+    
+    finally:
+        db.close()
+
+
+@inventory_bp.route('/api/inventory/uploads/<upload_id>', methods=['GET'])
+@rate_limit()
+def get_inventory_upload(upload_id):
+    """
+    Get the received chunks of an upload (to resend only the missing ones).
+    
+    GET /api/inventory/uploads/<upload_id>
+    
+    Returns:
+        200: {upload_id, session_id, bag_id, received_chunks, result_count, finalized}
+        404: upload not found
+    """
+    upload_id = parse_qr_token(upload_id)
+    if upload_id is None:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    db = SessionLocal()
+    try:
+        return jsonify(InventoryUploadService.get_upload(db, upload_id)), 200
+    
+    except KeyError:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    finally:
+        db.close()
+
+
+@inventory_bp.route('/api/inventory/uploads/<upload_id>/chunks/<int:chunk_index>', methods=['PUT'])
+@rate_limit()
+def put_inventory_upload_chunk(upload_id, chunk_index):
+    """
+    Upload one chunk of results.
+    
+    PUT /api/inventory/uploads/<upload_id>/chunks/<index>
+    Body: {"results": [...same as POST /api/inventory/<qr_token>...]}
+    
+    Returns:
+        201: {upload_id, chunk_index, result_count}
+        200: same, chunk was already received (nothing changed)
+        400: validation error, or an item already sent in another chunk
+        404: upload not found
+        409: upload already finalized
+    """
+    upload_id = parse_qr_token(upload_id)
+    if upload_id is None:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    data = request.get_json(silent=True)
+    if data is None:
+        return error_response('INVALID_INPUT', 'Request body must be JSON', 400)
+    
+    db = SessionLocal()
+    try:
+        chunk, created = InventoryUploadService.put_chunk(db, upload_id, chunk_index, data)
+        return jsonify(chunk), 201 if created else 200
+    
+    except KeyError:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    except ValueError as e:
+        return error_response('INVALID_INPUT', str(e), 400)
+    
+    except UploadConflictError as e:
+        return error_response('CONFLICT', str(e), 409)
+    
+    finally:
+        db.close()
+
+
+@inventory_bp.route('/api/inventory/uploads/<upload_id>/finalize', methods=['POST'])
+@rate_limit()
+def finalize_inventory_upload(upload_id):
+    """
+    Complete an upload once every chunk is received.
+    
+    POST /api/inventory/uploads/<upload_id>/finalize
+    Body: {"total_chunks": 12}
+    
+    Returns:
+        200: {session_id, bag_id, result_count} (also when finalized before)
+        400: validation error
+        404: upload not found
+        409: chunks missing ("missing chunks: [...]")
+    """
+    upload_id = parse_qr_token(upload_id)
+    if upload_id is None:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    data = request.get_json(silent=True)
+    if data is None:
+        return error_response('INVALID_INPUT', 'Request body must be JSON', 400)
+    
+    db = SessionLocal()
+    try:
+        return jsonify(InventoryUploadService.finalize(db, upload_id, data)), 200
+    
+    except KeyError:
+        return error_response('NOT_FOUND', 'Upload not found', 404)
+    
+    except ValueError as e:
+        return error_response('INVALID_INPUT', str(e), 400)
+    
+    except UploadConflictError as e:
+        return error_response('CONFLICT', str(e), 409)
+    
+    finally:
+        db.close()
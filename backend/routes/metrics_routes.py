@@ -0,0 +1,48 @@
+"""
+Metrics routes - admin-protected operational counters
+"""
+from flask import Blueprint, jsonify
+from database import SessionLocal
+from middleware.auth_middleware import require_auth
+from middleware.rate_limit import ip_limiter, qr_token_limiter
+from middleware.timing import timing_stats
+from services.alert_job_service import AlertJobService
+from services.checklist_index import checklist_cache
+from services.inventory_spool import inventory_spool
+from services.inventory_writer import inventory_writer
+from services.qr_service import QRService
+from services.recipient_cache import recipient_cache
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/api')
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@require_auth
+def get_metrics():
+    """
+    Get in-process operational counters
+    GET /api/metrics
+    Auth: Required
+    Returns: 200 with {"scan_cache": {...}, "token_filter": {...}, "rate_limits": {...}, "checklist_cache": {...}, "recipient_cache": {...}, "inventory_writer": {...}, "inventory_spool": {...}, "timings": {...}, "alert_jobs": {...}}
+    Note: counters are per worker process (alert_jobs: queue-wide, from the database)
+    """
+    db = SessionLocal()
+    try:
+        alert_jobs = AlertJobService.stats(db)
+    finally:
+        db.close()
+    
+    return jsonify({
+        'scan_cache': QRService.cache_stats(),
+        'token_filter': QRService.token_filter_stats(),
+        'rate_limits': {
+            'ip': ip_limiter.stats(),
+            'qr_token': qr_token_limiter.stats()
+        },
+        'checklist_cache': checklist_cache.stats(),
+        'recipient_cache': recipient_cache.stats(),
+        'inventory_writer': inventory_writer.stats(),
+        'inventory_spool': inventory_spool.stats(),
+        'timings': timing_stats(),
+        'alert_jobs': alert_jobs
+    }), 200
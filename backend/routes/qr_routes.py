@@ -2,9 +2,12 @@
 QR routes - Public endpoint for QR token lookup
 No authentication required (anonymous endpoint)
 """
-from flask import Blueprint, jsonify
+import json
+from flask import Blueprint, Response, jsonify, request
 from database import SessionLocal
-from services.qr_service import QRService
+from middleware.rate_limit import rate_limit, rate_limit_batch
+from models.types import parse_qr_token
+from services.qr_service import QRService, QR_BATCH_MAX_TOKENS
 
 qr_bp = Blueprint('qr', __name__)
 
@@ -20,20 +23,39 @@ def error_response(code: str, message: str, status_code: int):
 
 
 @qr_bp.route('/api/qr/<qr_token>', methods=['GET'])
+@rate_limit(token_arg='qr_token')
 def lookup_qr(qr_token):
     """
     Look up a bag by QR token (public endpoint).
     
     GET /api/qr/<qr_token>
+    Headers: If-None-Match: "<etag>" (optional)
     
     Returns:
-        200: {bag: {...}, items: [...]}
+        200: {bag: {...}, items: [...]} with strong ETag header
+        304: ETag matches If-None-Match (items are not loaded)
         404: bag not found or inactive
+        429: rate limit exceeded for client IP or QR token (Retry-After header)
     """
+    # Tokens are UUIDs: anything else is unknown without a database round trip
+    qr_token = parse_qr_token(qr_token)
+    if qr_token is None:
+        return error_response('NOT_FOUND', 'Bag not found', 404)
+    
     db = SessionLocal()
     try:
-        result = QRService.lookup_by_qr_token(db, qr_token)
-        return jsonify(result), 200
+        if request.if_none_match:
+            etag = QRService.get_scan_etag(db, qr_token)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+        
+        # Body is pre-serialized JSON (snapshot or cache): no re-encoding
+        entry = QRService.lookup_scan(db, qr_token)
+        response = Response(entry.body, status=200, mimetype='application/json')
+        response.set_etag(entry.etag)
+        return response
     
     except ValueError as e:
         # Both "not found" and "inactive" return 404 to avoid info leakage
@@ -41,3 +63,56 @@ def lookup_qr(qr_token):
     
     finally:
         db.close()
+
+
+# Same marker for unknown and inactive tokens (no info leakage)
+_BATCH_NOT_FOUND = b'{"error":{"code":"NOT_FOUND","message":"Bag not found"}}'
+
+
+@qr_bp.route('/api/qr/batch', methods=['POST'])
+@rate_limit()
+def lookup_qr_batch():
+    """
+    Look up many bags by QR token in one request (public endpoint).
+    Used by devices to prefetch checklists before going offline.
+    
+    POST /api/qr/batch
+    Body: {"qr_tokens": ["...", "..."]} (at most QR_BATCH_MAX_TOKENS)
+    
+    Returns:
+        200: {"results": {"<qr_token>": {bag, items} | {"error": {"code": "NOT_FOUND", ...}}}}
+        400: invalid body or too many tokens
+        429: rate limit exceeded for client IP or one of the tokens (Retry-After header);
+             each token counts as one request
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return error_response('INVALID_INPUT', 'Request body must be JSON', 400)
+    
+    qr_tokens = data.get('qr_tokens')
+    if not isinstance(qr_tokens, list) or not qr_tokens:
+        return error_response('INVALID_INPUT', 'qr_tokens must be a non-empty list', 400)
+    if not all(isinstance(token, str) and token for token in qr_tokens):
+        return error_response('INVALID_INPUT', 'qr_tokens entries must be non-empty strings', 400)
+    if len(qr_tokens) > QR_BATCH_MAX_TOKENS:
+        return error_response('INVALID_INPUT', f'at most {QR_BATCH_MAX_TOKENS} qr_tokens per request', 400)
+    
+    # Results are keyed by the tokens as sent; lookups use the canonical UUID form
+    canonical = {token: parse_qr_token(token) for token in qr_tokens}
+    limited = rate_limit_batch([canonical[token] for token in qr_tokens])
+    if limited is not None:
+        return limited
+    
+    db = SessionLocal()
+    try:
+        results = QRService.lookup_scan_batch(db, [token for token in canonical.values() if token])
+    finally:
+        db.close()
+    
+    # Splice the pre-serialized scan bodies instead of re-encoding them
+    parts = []
+    for token, canonical_token in canonical.items():
+        entry = results.get(canonical_token) if canonical_token else None
+        parts.append(json.dumps(token).encode('utf-8') + b':' + (entry.body if entry else _BATCH_NOT_FOUND))
+    body = b'{"results":{' + b','.join(parts) + b'}}'
+    return Response(body, status=200, mimetype='application/json')
@@ -2,9 +2,11 @@
 Site routes - CRUD endpoints for site management
 All endpoints require JWT authentication
 """
-from flask import Blueprint, request, jsonify
+import gzip
+from flask import Blueprint, Response, request, jsonify
 from sqlalchemy.exc import IntegrityError
 from database import SessionLocal
+from services.scan_bundle_service import ScanBundleService
 from services.site_service import SiteService
 from middleware.auth_middleware import require_auth
 
@@ -160,3 +162,38 @@ def delete_site(site_id: int):
         return error_response('INVALID_INPUT', f'Failed to delete site: {str(e)}', 400)
     finally:
         db.close()
+
+
+@site_bp.route('/<int:site_id>/scan-bundle', methods=['GET'])
+@require_auth
+def get_scan_bundle(site_id: int):
+    """
+    Get the scan responses of all active bags of a site (offline use)
+    GET /api/sites/<id>/scan-bundle?since=<version>
+    Auth: Required
+    Query: since (optional) - version of a previous bundle; only bags changed since are included
+    Returns: 200 with {"site_id", "version", "full", "active_bag_ids", "bags": [{qr_token, etag, scan}]}
+             (gzip-encoded if the client accepts it), 400 if since is invalid, 404 if site not found
+    """
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = ScanBundleService.parse_version(since)
+        except ValueError as e:
+            return error_response('INVALID_INPUT', str(e), 400)
+    
+    db = SessionLocal()
+    try:
+        body = ScanBundleService.build_bundle(db, site_id, since)
+    except ValueError:
+        return error_response('NOT_FOUND', 'Site not found', 404)
+    finally:
+        db.close()
+    
+    response = Response(body, status=200, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
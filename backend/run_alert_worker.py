@@ -0,0 +1,34 @@
+"""
+Run the alert worker pool (problem analysis and alerts of inventory sessions)
+Run with: python run_alert_worker.py [--processes 2] [--batch-size 50]
+
+Sessions are queued only when ALERTS_ENABLED=true. Start as many pools
+(on as many hosts) as needed; workers share the alert_jobs table. Alerts
+are emailed through SMTP_HOST when it is set, otherwise only logged;
+several alerts of one site are sent as one digest.
+"""
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Before the service imports: they read SMTP_* / ALERT_* at import time
+load_dotenv()
+
+from services.alert_mailer import SMTP_HOST, send_alert_email, send_digest_email
+from services.alert_worker import (
+    ALERT_WORKER_BATCH_SIZE, ALERT_WORKER_POLL_SECONDS, ALERT_WORKER_PROCESSES, log_alert, log_digest,
+    run_worker_pool
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--processes', type=int, default=ALERT_WORKER_PROCESSES, help='worker processes')
+    parser.add_argument('--batch-size', type=int, default=ALERT_WORKER_BATCH_SIZE, help='jobs claimed per batch')
+    parser.add_argument('--poll-interval', type=float, default=ALERT_WORKER_POLL_SECONDS,
+                        help='seconds between polls when idle')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+    run_worker_pool(args.processes, batch_size=args.batch_size, poll_interval=args.poll_interval,
+                    send_alert=send_alert_email if SMTP_HOST else log_alert,
+                    send_digest=send_digest_email if SMTP_HOST else log_digest)
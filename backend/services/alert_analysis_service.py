@@ -0,0 +1,146 @@
+"""
+Alert analysis service - finds the problems of inventory sessions
+
+Problems are results with status missing / not_enough / battery_low, plus
+items of the bag whose expiry date is at most ALERT_EXPIRY_THRESHOLD_DAYS
+after the check (decision 8: 30 days). A session with no problems gets no
+alert (decision 3).
+"""
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.bag import Bag
+from models.bag_item import BagItem
+from models.inventory_result import InventoryResult, InventoryStatus
+from models.inventory_session import InventorySession
+from models.site import Site
+from services.site_service import SiteService
+
+ALERT_EXPIRY_THRESHOLD_DAYS = int(os.getenv('ALERT_EXPIRY_THRESHOLD_DAYS', '30'))
+
+
+class AlertAnalysisService:
+    """Builds alerts from stored inventory sessions"""
+
+    @staticmethod
+    def analyze_sessions(db: Session, session_ids: Iterable[int],
+                         expiry_threshold_days: int = ALERT_EXPIRY_THRESHOLD_DAYS
+                         ) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        Analyze many sessions with three queries (sessions, results,
+        expiring items).
+
+        Args:
+            db: Database session
+            session_ids: IDs of the sessions
+            expiry_threshold_days: items expiring within this many days of the
+                check count as problems
+
+        Returns:
+            dict: session_id -> alert dict, or None if the session has no
+                problems (sessions that no longer exist are left out). Alert:
+                {session_id, checked_at, nickname, ip_address, geo_city, geo_country,
+                 site: {id, name}, bag: {id, name}, recipients,
+                 problems: [{bag_item_id, item_name, status, observed_qty, expected_qty, notes}],
+                 expiring: [{bag_item_id, item_name, expiry_date}], problem_count}
+        """
+        return AlertAnalysisService.analyze_batch(db, session_ids, expiry_threshold_days)[0]
+
+    @staticmethod
+    def analyze_batch(db: Session, session_ids: Iterable[int],
+                      expiry_threshold_days: int = ALERT_EXPIRY_THRESHOLD_DAYS
+                      ) -> Tuple[Dict[int, Optional[Dict[str, Any]]], Dict[int, List[Tuple[int, int]]]]:
+        """
+        analyze_sessions, plus the items each session found present (used to
+        clear alert fingerprints).
+
+        Returns:
+            tuple: (alerts as in analyze_sessions,
+                    session_id -> [(bag_id, bag_item_id)] of present results)
+        """
+        session_ids = list(session_ids)
+        if not session_ids:
+            return {}, {}
+
+        sessions = db.execute(
+            select(InventorySession.id, InventorySession.bag_id, InventorySession.created_at,
+                   InventorySession.nickname, InventorySession.ip_address,
+                   InventorySession.geo_city, InventorySession.geo_country,
+                   Bag.name.label('bag_name'), Site.id.label('site_id'), Site.name.label('site_name'),
+                   Site.alert_recipients, Site.updated_at.label('site_updated_at'))
+            .join(Bag, Bag.id == InventorySession.bag_id)
+            .join(Site, Site.id == Bag.site_id)
+            .where(InventorySession.id.in_(session_ids))
+        ).all()
+        if not sessions:
+            return {}, {}
+
+        bag_ids = {session.id: session.bag_id for session in sessions}
+        problems: Dict[int, List[Dict[str, Any]]] = {}
+        present: Dict[int, List[Tuple[int, int]]] = {}
+        for row in db.execute(
+            select(InventoryResult.session_id, InventoryResult.bag_item_id, InventoryResult.status,
+                   InventoryResult.observed_qty, InventoryResult.notes,
+                   BagItem.name, BagItem.expected_qty)
+            .outerjoin(BagItem, BagItem.id == InventoryResult.bag_item_id)
+            .where(InventoryResult.session_id.in_(list(bag_ids)))
+            .order_by(InventoryResult.session_id, InventoryResult.id)
+        ):
+            if row.status is InventoryStatus.PRESENT:
+                present.setdefault(row.session_id, []).append((bag_ids[row.session_id], row.bag_item_id))
+                continue
+            problems.setdefault(row.session_id, []).append({
+                'bag_item_id': row.bag_item_id,
+                'item_name': row.name,
+                'status': row.status.value,
+                'observed_qty': row.observed_qty,
+                'expected_qty': row.expected_qty,
+                'notes': row.notes
+            })
+
+        threshold = timedelta(days=expiry_threshold_days)
+        latest_check = max(AlertAnalysisService._check_date(session) for session in sessions)
+        expiring_items: Dict[int, List[Any]] = {}
+        for row in db.execute(
+            select(BagItem.id, BagItem.bag_id, BagItem.name, BagItem.expiry_date)
+            .where(BagItem.bag_id.in_({session.bag_id for session in sessions}),
+                   BagItem.track_expiry.is_(True),
+                   BagItem.expiry_date.is_not(None),
+                   BagItem.expiry_date <= latest_check + threshold)
+            .order_by(BagItem.expiry_date, BagItem.id)
+        ):
+            expiring_items.setdefault(row.bag_id, []).append(row)
+
+        alerts = {}
+        for session in sessions:
+            limit = AlertAnalysisService._check_date(session) + threshold
+            expiring = [
+                {'bag_item_id': item.id, 'item_name': item.name, 'expiry_date': item.expiry_date.isoformat()}
+                for item in expiring_items.get(session.bag_id, []) if item.expiry_date <= limit
+            ]
+            session_problems = problems.get(session.id, [])
+            if not session_problems and not expiring:
+                alerts[session.id] = None
+                continue
+            alerts[session.id] = {
+                'session_id': session.id,
+                'checked_at': session.created_at.isoformat(),
+                'nickname': session.nickname,
+                'ip_address': session.ip_address,
+                'geo_city': session.geo_city,
+                'geo_country': session.geo_country,
+                'site': {'id': session.site_id, 'name': session.site_name},
+                'bag': {'id': session.bag_id, 'name': session.bag_name},
+                'recipients': SiteService.get_alert_recipients(session.site_id, session.site_updated_at,
+                                                                session.alert_recipients),
+                'problems': session_problems,
+                'expiring': expiring,
+                'problem_count': len(session_problems) + len(expiring)
+            }
+        return alerts, present
+
+    @staticmethod
+    def _check_date(session) -> date:
+        return session.created_at.date()
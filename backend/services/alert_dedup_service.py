@@ -0,0 +1,245 @@
+"""
+Alert deduplication - suppresses repeat alerts of unchanged problems
+
+A problem is fingerprinted as (bag_id, bag_item_id, status); expiring items
+use the status "expiring:<expiry date>". Once alerted, a fingerprint
+suppresses the same problem in later checks until it expires
+(ALERT_DEDUP_TTL_SECONDS, a reminder), the item's status changes, or the
+item is found present again. Only new or changed problems are emailed.
+
+Fingerprints live in the alert_fingerprints table, shared by all workers.
+Each worker also keeps recently confirmed fingerprints in an LRU so
+repeated problems need no lookup; entries are trusted for at most
+ALERT_DEDUP_CACHE_SECONDS, which bounds how long a fingerprint cleared by
+another worker can still suppress an alert here.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.alert_fingerprint import AlertFingerprint
+from models.inventory_result import InventoryStatus
+
+ALERT_DEDUP_ENABLED = os.getenv('ALERT_DEDUP_ENABLED', 'true').lower() == 'true'
+ALERT_DEDUP_TTL_SECONDS = float(os.getenv('ALERT_DEDUP_TTL_SECONDS', '86400'))
+ALERT_DEDUP_CACHE_SIZE = int(os.getenv('ALERT_DEDUP_CACHE_SIZE', '10000'))
+ALERT_DEDUP_CACHE_SECONDS = float(os.getenv('ALERT_DEDUP_CACHE_SECONDS', '60'))
+
+# (bag_id, bag_item_id, status)
+Fingerprint = Tuple[int, int, str]
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Fingerprint statuses of results; at most one per item, cleared by a present result
+RESULT_STATUSES = tuple(status.value for status in InventoryStatus if status is not InventoryStatus.PRESENT)
+
+
+def problem_fingerprint(bag_id: int, problem: Dict[str, Any]) -> Optional[Fingerprint]:
+    """Fingerprint of a problem or expiring entry of an alert (None for deleted items)"""
+    if problem['bag_item_id'] is None:
+        return None
+    if 'expiry_date' in problem:
+        return bag_id, problem['bag_item_id'], f"expiring:{problem['expiry_date']}"
+    return bag_id, problem['bag_item_id'], problem['status']
+
+
+class DedupResult(NamedTuple):
+    """Outcome of AlertDedupStore.filter for a batch of sessions"""
+    # session_id -> alert reduced to new problems, or None if nothing is new
+    alerts: Dict[int, Optional[Dict[str, Any]]]
+    # session_id -> fingerprints to record once its alert was sent
+    fingerprints: Dict[int, List[Fingerprint]]
+    # Items found present: their result fingerprints are cleared
+    cleared: Set[int]
+
+
+class AlertDedupStore:
+    """Fingerprint store of one worker: the shared table plus a local LRU"""
+
+    def __init__(self, ttl: float = ALERT_DEDUP_TTL_SECONDS, cache_size: int = ALERT_DEDUP_CACHE_SIZE,
+                 cache_seconds: float = ALERT_DEDUP_CACHE_SECONDS):
+        if cache_size < 1:
+            raise ValueError("cache_size must be >= 1")
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache_seconds = cache_seconds
+        # fingerprint -> (expires_at, monotonic time it was confirmed)
+        self._cache: 'OrderedDict[Fingerprint, Tuple[datetime, float]]' = OrderedDict()
+        self.cache_hits = 0
+        self.lookups = 0
+
+    def filter(self, db: Session, alerts: Dict[int, Optional[Dict[str, Any]]],
+               present: Dict[int, List[Tuple[int, int]]]) -> DedupResult:
+        """
+        Drop already alerted problems from a batch of alerts (at most one query).
+
+        Sessions are replayed oldest first, so a problem that reappears after
+        its item was present (or changed status) earlier in the batch is new.
+
+        Args:
+            db: Database session
+            alerts: AlertAnalysisService.analyze_batch alerts
+            present: session_id -> [(bag_id, bag_item_id)] found present
+
+        Returns:
+            DedupResult
+        """
+        now = datetime.now(timezone.utc)
+        candidates = {
+            fingerprint for alert in alerts.values() if alert is not None
+            for fingerprint in self._fingerprints(alert) if fingerprint is not None
+        }
+        active = self._active(db, candidates, now)
+
+        filtered: Dict[int, Optional[Dict[str, Any]]] = {}
+        pending: Dict[Fingerprint, int] = {}
+        cleared: Set[int] = set()
+        for session_id in sorted(set(alerts) | set(present)):
+            for bag_id, bag_item_id in present.get(session_id, []):
+                cleared.add(bag_item_id)
+                self._supersede(active, pending, bag_id, bag_item_id)
+            alert = alerts.get(session_id)
+            if alert is None:
+                continue
+            bag_id = alert['bag']['id']
+            problems = []
+            for problem in alert['problems']:
+                fingerprint = problem_fingerprint(bag_id, problem)
+                if fingerprint in active:
+                    continue
+                problems.append(problem)
+                if fingerprint is not None:
+                    self._supersede(active, pending, bag_id, problem['bag_item_id'])
+                    active.add(fingerprint)
+                    pending[fingerprint] = session_id
+            expiring = []
+            for item in alert['expiring']:
+                fingerprint = problem_fingerprint(bag_id, item)
+                if fingerprint not in active:
+                    expiring.append(item)
+                    active.add(fingerprint)
+                    pending[fingerprint] = session_id
+            if problems or expiring:
+                filtered[session_id] = dict(alert, problems=problems, expiring=expiring,
+                                            problem_count=len(problems) + len(expiring))
+            else:
+                filtered[session_id] = None
+
+        fingerprints: Dict[int, List[Fingerprint]] = {}
+        for fingerprint, session_id in pending.items():
+            fingerprints.setdefault(session_id, []).append(fingerprint)
+        return DedupResult(filtered, fingerprints, cleared)
+
+    def record(self, db: Session, fingerprints: Iterable[Fingerprint], cleared: Iterable[int]) -> None:
+        """
+        Store fingerprints of sent alerts, drop the result fingerprints they
+        replace or that were cleared, and purge expired ones (does not commit;
+        call remember() after the commit).
+
+        Fingerprints are upserted (a fingerprint another worker stored
+        meanwhile gets the new expiry), so concurrent workers never fail
+        the transaction on the primary key.
+        """
+        fingerprints = list(fingerprints)
+        items = set(cleared) | {bag_item_id for _, bag_item_id, _ in fingerprints}
+        now = datetime.now(timezone.utc)
+        conditions = [AlertFingerprint.expires_at <= now]
+        if items:
+            conditions.append(AlertFingerprint.bag_item_id.in_(items) & AlertFingerprint.status.in_(RESULT_STATUSES))
+        db.execute(delete(AlertFingerprint).where(or_(*conditions)))
+        if fingerprints:
+            expires_at = now + timedelta(seconds=self.ttl)
+            self._upsert(db, [
+                {'bag_id': bag_id, 'bag_item_id': bag_item_id, 'status': status, 'expires_at': expires_at}
+                for bag_id, bag_item_id, status in fingerprints
+            ])
+        for fingerprint in [fingerprint for fingerprint in self._cache if fingerprint[1] in items]:
+            del self._cache[fingerprint]
+
+    def remember(self, fingerprints: Iterable[Fingerprint]) -> None:
+        """Cache fingerprints whose record() was committed"""
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        for fingerprint in fingerprints:
+            self._cache_put(fingerprint, expires_at)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache size and hit counters"""
+        return {'cached': len(self._cache), 'lookups': self.lookups, 'cache_hits': self.cache_hits}
+
+    @staticmethod
+    def _upsert(db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Insert fingerprint rows, or move the expiry of existing ones"""
+        table = AlertFingerprint.__table__
+        dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            statement = dialect_insert(table)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.bag_id, table.c.bag_item_id, table.c.status],
+                set_={'expires_at': statement.excluded.expires_at}
+            ), rows)
+            return
+
+        # Other backends: savepoint around each plain INSERT
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**row))
+            except IntegrityError:
+                db.execute(update(table).where(and_(
+                    table.c.bag_id == row['bag_id'],
+                    table.c.bag_item_id == row['bag_item_id'],
+                    table.c.status == row['status']
+                )).values(expires_at=row['expires_at']))
+
+    @staticmethod
+    def _fingerprints(alert: Dict[str, Any]) -> List[Optional[Fingerprint]]:
+        bag_id = alert['bag']['id']
+        return [problem_fingerprint(bag_id, entry) for entry in alert['problems'] + alert['expiring']]
+
+    @staticmethod
+    def _supersede(active: Set[Fingerprint], pending: Dict[Fingerprint, int], bag_id: int, bag_item_id: int) -> None:
+        """Forget the result fingerprints of an item (its status changed)"""
+        for status in RESULT_STATUSES:
+            active.discard((bag_id, bag_item_id, status))
+            pending.pop((bag_id, bag_item_id, status), None)
+
+    def _active(self, db: Session, candidates: Set[Fingerprint], now: datetime) -> Set[Fingerprint]:
+        """The candidates that were alerted and have not expired (cache first)"""
+        active = set()
+        unknown = set()
+        confirmed_after = time.monotonic() - self.cache_seconds
+        for fingerprint in candidates:
+            self.lookups += 1
+            entry = self._cache.get(fingerprint)
+            if entry is not None and entry[0] > now and entry[1] > confirmed_after:
+                self._cache.move_to_end(fingerprint)
+                self.cache_hits += 1
+                active.add(fingerprint)
+            else:
+                unknown.add(fingerprint)
+        if unknown:
+            for row in db.execute(
+                select(AlertFingerprint.bag_id, AlertFingerprint.bag_item_id, AlertFingerprint.status,
+                       AlertFingerprint.expires_at)
+                .where(AlertFingerprint.bag_item_id.in_({fingerprint[1] for fingerprint in unknown}),
+                       AlertFingerprint.expires_at > now)
+            ):
+                fingerprint = (row.bag_id, row.bag_item_id, row.status)
+                if fingerprint in unknown:
+                    active.add(fingerprint)
+                    # SQLite returns naive datetimes (stored as UTC)
+                    expires_at = row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=timezone.utc)
+                    self._cache_put(fingerprint, expires_at)
+        return active
+
+    def _cache_put(self, fingerprint: Fingerprint, expires_at: datetime) -> None:
+        self._cache[fingerprint] = (expires_at, time.monotonic())
+        self._cache.move_to_end(fingerprint)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,207 @@
+"""
+Alert job service - persistent queue of inventory sessions awaiting problem analysis
+
+Jobs are inserted in the transaction that stores a completed session, so a
+session is never stored without its job. Workers (any number of processes)
+claim due jobs in batches under a lease: on PostgreSQL the candidate rows
+are selected FOR UPDATE SKIP LOCKED, so concurrent workers pick disjoint
+batches without waiting; on SQLite (no row locks) the conditional UPDATE
+that sets the lease decides which worker gets a job. A worker that dies
+leaves its jobs leased until lease_expires_at, then they are claimed again.
+
+Digests: a new job becomes due ALERT_DIGEST_WINDOW_SECONDS after its
+session; claiming it also claims the other pending jobs of the same site,
+so a site checked many times within the window gets one digest.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import and_, bindparam, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+from middleware.timing import stage
+from models.alert_job import AlertJob, AlertJobStatus
+from models.bag import Bag
+from models.inventory_session import InventorySession
+
+# Feature flag for alerts; without it no jobs are queued (nothing would process them)
+ALERTS_ENABLED = os.getenv('ALERTS_ENABLED', 'false').lower() == 'true'
+
+# Delay before retry n is ALERT_JOB_RETRY_BASE_SECONDS * 2^(n-1), at most ALERT_JOB_RETRY_MAX_SECONDS
+ALERT_JOB_RETRY_BASE_SECONDS = float(os.getenv('ALERT_JOB_RETRY_BASE_SECONDS', '5'))
+ALERT_JOB_RETRY_MAX_SECONDS = float(os.getenv('ALERT_JOB_RETRY_MAX_SECONDS', '300'))
+
+# Alerts must reach recipients within 5 minutes of the check (BE-7)
+ALERT_SLA_SECONDS = 300
+# How long alerts of a site are held to be sent as one digest; capped to
+# leave a minute of the SLA for polling, analysis and sending
+ALERT_DIGEST_WINDOW_SECONDS = min(float(os.getenv('ALERT_DIGEST_WINDOW_SECONDS', '60')), ALERT_SLA_SECONDS - 60)
+
+
+class AlertJobService:
+    """Queue operations on alert_jobs"""
+
+    @staticmethod
+    def enqueue(db: Session, session_ids: Iterable[int]) -> int:
+        """
+        Queue analysis of completed sessions with one INSERT ... SELECT that
+        copies each session's site (does not commit). Jobs are due after
+        the digest window.
+
+        No-op unless ALERTS_ENABLED.
+
+        Returns:
+            int: number of jobs queued
+        """
+        if not ALERTS_ENABLED:
+            return 0
+        session_ids = list(session_ids)
+        if not session_ids:
+            return 0
+        run_after = datetime.now(timezone.utc) + timedelta(seconds=ALERT_DIGEST_WINDOW_SECONDS)
+        with stage('enqueue_analysis'):
+            db.execute(insert(AlertJob.__table__).from_select(
+                ['session_id', 'site_id', 'status', 'attempts', 'run_after'],
+                select(InventorySession.id, Bag.site_id,
+                       literal(AlertJobStatus.PENDING, AlertJob.status.type),
+                       literal(0),
+                       literal(run_after, AlertJob.run_after.type))
+                .join(Bag, Bag.id == InventorySession.bag_id)
+                .where(InventorySession.id.in_(session_ids))
+            ))
+        return len(session_ids)
+
+    @staticmethod
+    def claim(db: Session, batch_size: int, lease_seconds: float) -> Tuple[str, List[Any]]:
+        """
+        Lease up to batch_size due jobs, oldest first, plus (up to batch_size)
+        not yet due first-attempt jobs of the same sites (commits).
+
+        Args:
+            db: Database session
+            batch_size: max due jobs to claim
+            lease_seconds: how long the jobs stay reserved for this caller
+
+        Returns:
+            tuple: (lease_token, rows of (id, session_id, site_id, attempts)) -
+                attempts includes this claim
+        """
+        now = datetime.now(timezone.utc)
+        lease_token = str(uuid.uuid4())
+        unleased = and_(
+            AlertJob.status == AlertJobStatus.PENDING,
+            or_(AlertJob.lease_expires_at.is_(None), AlertJob.lease_expires_at < now)
+        )
+        try:
+            # FOR UPDATE SKIP LOCKED on PostgreSQL; not rendered on SQLite
+            due = db.execute(
+                select(AlertJob.id, AlertJob.site_id).where(unleased, AlertJob.run_after <= now)
+                .order_by(AlertJob.run_after, AlertJob.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not due:
+                db.rollback()
+                return lease_token, []
+            job_ids = [job.id for job in due]
+            site_ids = {job.site_id for job in due if job.site_id is not None}
+            if site_ids:
+                # Held for the digest window; jobs in retry backoff keep waiting
+                job_ids += db.execute(
+                    select(AlertJob.id).where(unleased, AlertJob.site_id.in_(site_ids),
+                                              AlertJob.attempts == 0, AlertJob.id.not_in(job_ids))
+                    .order_by(AlertJob.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                ).scalars().all()
+            # Re-checking the lease makes the UPDATE the arbiter where rows are not locked
+            db.execute(
+                update(AlertJob.__table__)
+                .where(AlertJob.id.in_(job_ids), unleased)
+                .values(lease_token=lease_token,
+                        lease_expires_at=now + timedelta(seconds=lease_seconds),
+                        attempts=AlertJob.attempts + 1)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        jobs = db.execute(
+            select(AlertJob.id, AlertJob.session_id, AlertJob.site_id, AlertJob.attempts)
+            .where(AlertJob.lease_token == lease_token)
+            .order_by(AlertJob.id)
+        ).all()
+        db.rollback()
+        return lease_token, jobs
+
+    @staticmethod
+    def complete(db: Session, lease_token: str, results: List[Tuple[int, int]]) -> None:
+        """
+        Mark jobs done in one executemany UPDATE (does not commit). Jobs whose
+        lease was lost meanwhile are left alone.
+
+        Args:
+            db: Database session
+            lease_token: token returned by claim
+            results: (job_id, problem_count) per job
+        """
+        if not results:
+            return
+        table = AlertJob.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'), table.c.lease_token == lease_token)
+            .values(status=AlertJobStatus.DONE, problem_count=bindparam('b_problem_count'),
+                    completed_at=datetime.now(timezone.utc), lease_token=None, lease_expires_at=None,
+                    last_error=None),
+            [{'b_id': job_id, 'b_problem_count': problem_count} for job_id, problem_count in results]
+        )
+
+    @staticmethod
+    def retry(db: Session, lease_token: str, job_id: int, attempts: int, error: str,
+              max_attempts: int) -> bool:
+        """
+        Release a failed job for a later attempt with exponential backoff, or
+        mark it failed after max_attempts (does not commit).
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        retried = attempts < max_attempts
+        values = {'lease_token': None, 'lease_expires_at': None, 'last_error': error[:2000]}
+        if retried:
+            delay = min(ALERT_JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), ALERT_JOB_RETRY_MAX_SECONDS)
+            values['run_after'] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        else:
+            values['status'] = AlertJobStatus.FAILED
+            values['completed_at'] = datetime.now(timezone.utc)
+        db.execute(
+            update(AlertJob.__table__)
+            .where(AlertJob.id == job_id, AlertJob.lease_token == lease_token)
+            .values(**values)
+        )
+        return retried
+
+    @staticmethod
+    def stats(db: Session) -> Dict[str, Any]:
+        """
+        Return job counts by status and the age of the oldest pending job
+        (compare with the 5-minute alert target).
+        """
+        rows = db.execute(
+            select(AlertJob.status, func.count(), func.min(AlertJob.created_at))
+            .group_by(AlertJob.status)
+        ).all()
+        stats = {status.value: 0 for status in AlertJobStatus}
+        oldest_pending_seconds = None
+        for status, count, oldest in rows:
+            stats[status.value] = count
+            if status is AlertJobStatus.PENDING and oldest is not None:
+                now = datetime.now(timezone.utc)
+                if oldest.tzinfo is None:
+                    # SQLite returns naive UTC
+                    now = now.replace(tzinfo=None)
+                oldest_pending_seconds = round((now - oldest).total_seconds(), 3)
+        stats['oldest_pending_seconds'] = oldest_pending_seconds
+        return stats
@@ -0,0 +1,281 @@
+"""
+Alert mailer - alert emails over a pool of persistent SMTP connections
+
+Connecting, EHLO, STARTTLS and AUTH cost several round trips each, so
+connections are kept open and reused for many messages: a connection is
+retired after SMTP_MAX_MESSAGES_PER_CONNECTION messages or
+SMTP_MAX_IDLE_SECONDS without use (before the server's own idle timeout
+drops it). A message that fails on a reused connection because the server
+went away is sent again once on a fresh connection.
+"""
+import logging
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv('SMTP_HOST', '')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() == 'true'
+SMTP_TIMEOUT_SECONDS = float(os.getenv('SMTP_TIMEOUT_SECONDS', '10'))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '4'))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+SMTP_MAX_IDLE_SECONDS = float(os.getenv('SMTP_MAX_IDLE_SECONDS', '30'))
+ALERT_EMAIL_FROM = os.getenv('ALERT_EMAIL_FROM', 'inventory-alerts@localhost')
+
+# Errors meaning "this connection is unusable" (retry on a new one)
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _PooledConnection:
+    """An open SMTP client with its usage counters"""
+    __slots__ = ('smtp', 'messages', 'last_used')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Up to `size` persistent SMTP connections shared by threads.
+
+    connection() hands out an idle connection (most recently used first) or
+    opens one; callers block while all `size` connections are in use.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 starttls: bool = True, timeout: float = SMTP_TIMEOUT_SECONDS,
+                 size: int = SMTP_POOL_SIZE, max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 max_idle: float = SMTP_MAX_IDLE_SECONDS):
+        if size < 1 or max_messages < 1:
+            raise ValueError("size and max_messages must be >= 1")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.size = size
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._stats_lock = threading.Lock()
+        self.connections_opened = 0
+        self.connections_closed = 0
+
+    def _open(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._stats_lock:
+            self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    def _close(self, smtp: smtplib.SMTP, polite: bool = False) -> None:
+        try:
+            if polite:
+                smtp.quit()
+            else:
+                smtp.close()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+        with self._stats_lock:
+            self.connections_closed += 1
+
+    def _take_idle(self) -> Optional[_PooledConnection]:
+        """Most recently used idle connection that is still fresh enough"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - connection.last_used <= self.max_idle:
+                return connection
+            self._close(connection.smtp, polite=True)
+
+    @contextmanager
+    def connection(self, fresh: bool = False) -> Iterator[_PooledConnection]:
+        """
+        Borrow a connection (a new one if fresh). It goes back to the pool
+        unless the block raised or it reached max_messages.
+        """
+        self._slots.acquire()
+        try:
+            connection = None if fresh else self._take_idle()
+            if connection is None:
+                connection = self._open()
+            try:
+                yield connection
+            except BaseException:
+                self._close(connection.smtp)
+                raise
+            connection.last_used = time.monotonic()
+            if connection.messages >= self.max_messages:
+                self._close(connection.smtp, polite=True)
+            else:
+                self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(connection.smtp, polite=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool size and connection counters"""
+        return {
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'connections_opened': self.connections_opened,
+            'connections_closed': self.connections_closed
+        }
+
+
+class AlertMailer:
+    """Formats alerts (AlertAnalysisService) as emails and sends them through a pool"""
+
+    def __init__(self, pool: SMTPConnectionPool, sender: str = ALERT_EMAIL_FROM):
+        self.pool = pool
+        self.sender = sender
+        self.sent = 0
+        self.reconnects = 0
+        self._stats_lock = threading.Lock()
+
+    def send(self, message: EmailMessage) -> None:
+        """
+        Send one message (thread-safe).
+
+        Raises:
+            smtplib.SMTPException / OSError: if sending failed (also on a fresh connection)
+        """
+        reused = False
+        try:
+            with self.pool.connection() as connection:
+                reused = connection.messages > 0
+                self._send_on(connection, message)
+        except _CONNECTION_ERRORS:
+            if not reused:
+                raise
+            # The server dropped an idle/reused connection: once more on a new one
+            with self._stats_lock:
+                self.reconnects += 1
+            with self.pool.connection(fresh=True) as connection:
+                self._send_on(connection, message)
+        with self._stats_lock:
+            self.sent += 1
+
+    @staticmethod
+    def _send_on(connection: _PooledConnection, message: EmailMessage) -> None:
+        connection.messages += 1
+        connection.smtp.send_message(message)
+
+    def send_alert(self, alert: Dict[str, Any]) -> None:
+        """Send the email of one alert to its site's recipients"""
+        self.send(self.build_message(alert))
+
+    def send_digest(self, alerts: List[Dict[str, Any]]) -> None:
+        """Send one email for several alerts of a site (same recipients)"""
+        self.send(self.build_digest(alerts))
+
+    def build_message(self, alert: Dict[str, Any]) -> EmailMessage:
+        """Plain-text alert email"""
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(alert['recipients'])
+        message['Subject'] = (f"[Inventory] {alert['problem_count']} problem(s): "
+                              f"{alert['site']['name']} / {alert['bag']['name']}")
+        message.set_content('\n'.join([f"Site: {alert['site']['name']}"] + self._alert_lines(alert)))
+        return message
+
+    def build_digest(self, alerts: List[Dict[str, Any]]) -> EmailMessage:
+        """Plain-text digest email: one section per checked bag, oldest check first"""
+        alerts = sorted(alerts, key=lambda alert: (alert['checked_at'] or '', alert['session_id']))
+        site = alerts[0]['site']['name']
+        problem_count = sum(alert['problem_count'] for alert in alerts)
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(alerts[0]['recipients'])
+        message['Subject'] = f"[Inventory] {problem_count} problem(s) in {len(alerts)} checks: {site}"
+        lines = [f"Site: {site}", f"Checks with problems: {len(alerts)}", '']
+        for alert in alerts:
+            lines.append('=' * 40)
+            lines.extend(self._alert_lines(alert))
+        message.set_content('\n'.join(lines))
+        return message
+
+    @staticmethod
+    def _alert_lines(alert: Dict[str, Any]) -> List[str]:
+        """Body lines of one alert (bag, check and its problems)"""
+        location = ', '.join(part for part in (alert['geo_city'], alert['geo_country']) if part) or 'unknown'
+        lines = [
+            f"Bag: {alert['bag']['name']}",
+            f"Checked at: {alert['checked_at']}",
+            f"Checked by: {alert['nickname'] or 'anonymous'}",
+            f"Location: {location}",
+            ''
+        ]
+        if alert['problems']:
+            lines.append('Problems:')
+            for problem in alert['problems']:
+                line = f"- {problem['item_name'] or 'Unknown item'}: {problem['status'].replace('_', ' ')}"
+                if problem['observed_qty'] is not None:
+                    line += f" ({problem['observed_qty']}"
+                    line += f" of {problem['expected_qty']})" if problem['expected_qty'] is not None else ")"
+                if problem['notes']:
+                    line += f" - {problem['notes']}"
+                lines.append(line)
+            lines.append('')
+        if alert['expiring']:
+            lines.append('Expiring soon:')
+            lines.extend(f"- {item['item_name']}: {item['expiry_date']}" for item in alert['expiring'])
+            lines.append('')
+        return lines
+
+    def stats(self) -> Dict[str, Any]:
+        """Return message counters and pool stats"""
+        return {'sent': self.sent, 'reconnects': self.reconnects, 'pool': self.pool.stats()}
+
+
+# Process-wide mailer (None without SMTP_HOST: alerts are only logged)
+alert_mailer = AlertMailer(SMTPConnectionPool(
+    SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, starttls=SMTP_STARTTLS
+)) if SMTP_HOST else None
+
+
+def send_alert_email(alert: Dict[str, Any]) -> None:
+    """AlertWorker sender using the process-wide mailer"""
+    if alert_mailer is None:
+        raise RuntimeError("SMTP_HOST is not configured")
+    alert_mailer.send_alert(alert)
+
+
+def send_digest_email(alerts: List[Dict[str, Any]]) -> None:
+    """AlertWorker digest sender using the process-wide mailer"""
+    if alert_mailer is None:
+        raise RuntimeError("SMTP_HOST is not configured")
+    alert_mailer.send_digest(alerts)
@@ -0,0 +1,258 @@
+"""
+Alert worker - processes queued alert jobs outside the request path
+
+Each worker polls alert_jobs, claims a batch (AlertJobService.claim),
+analyzes the batch's sessions with a few queries and sends the alerts,
+send_concurrency at a time. A claim brings along the site's other pending
+jobs, and alerts of one site with the same recipients go out as a single
+digest when a send_digest function is given. Problems that were already
+alerted are dropped first (AlertDedupStore), so unchanged problems send
+no mail. Workers coordinate
+through the table only, so any number of worker processes (on any number
+of hosts) can run side by side; run_worker_pool starts and supervises
+several in one host.
+
+Delivery is at least once: a worker that dies after sending but before
+committing leaves its jobs to be claimed again when the lease expires.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from database import SessionLocal
+from services.alert_analysis_service import AlertAnalysisService
+from services.alert_dedup_service import ALERT_DEDUP_ENABLED, AlertDedupStore
+from services.alert_job_service import AlertJobService
+
+logger = logging.getLogger(__name__)
+
+ALERT_WORKER_PROCESSES = int(os.getenv('ALERT_WORKER_PROCESSES', '2'))
+ALERT_WORKER_BATCH_SIZE = int(os.getenv('ALERT_WORKER_BATCH_SIZE', '50'))
+ALERT_WORKER_LEASE_SECONDS = float(os.getenv('ALERT_WORKER_LEASE_SECONDS', '120'))
+ALERT_WORKER_POLL_SECONDS = float(os.getenv('ALERT_WORKER_POLL_SECONDS', '2'))
+ALERT_JOB_MAX_ATTEMPTS = int(os.getenv('ALERT_JOB_MAX_ATTEMPTS', '5'))
+ALERT_WORKER_SEND_CONCURRENCY = int(os.getenv('ALERT_WORKER_SEND_CONCURRENCY', '4'))
+
+
+def log_alert(alert: Dict[str, Any]) -> None:
+    """Default alert sender: log the alert (no email service configured)"""
+    logger.warning(
+        "Inventory problems at %s / %s (session %s): %d problem(s), recipients %s",
+        alert['site']['name'], alert['bag']['name'], alert['session_id'],
+        alert['problem_count'], ', '.join(alert['recipients'])
+    )
+
+
+def log_digest(alerts: List[Dict[str, Any]]) -> None:
+    """Default digest sender: log each alert of the digest"""
+    for alert in alerts:
+        log_alert(alert)
+
+
+class AlertWorker:
+    """Claims and processes alert jobs in batches"""
+
+    def __init__(self, session_factory=SessionLocal, send_alert: Callable[[Dict[str, Any]], None] = log_alert,
+                 batch_size: int = ALERT_WORKER_BATCH_SIZE, lease_seconds: float = ALERT_WORKER_LEASE_SECONDS,
+                 poll_interval: float = ALERT_WORKER_POLL_SECONDS, max_attempts: int = ALERT_JOB_MAX_ATTEMPTS,
+                 send_concurrency: int = ALERT_WORKER_SEND_CONCURRENCY,
+                 send_digest: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 dedup: bool = ALERT_DEDUP_ENABLED):
+        if batch_size < 1 or max_attempts < 1 or send_concurrency < 1:
+            raise ValueError("batch_size, max_attempts and send_concurrency must be >= 1")
+        self.session_factory = session_factory
+        self.send_alert = send_alert
+        # Without a digest sender, every alert is sent on its own
+        self.send_digest = send_digest
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        # Alerts of a batch sent in parallel (over the mailer's connection pool)
+        self.send_concurrency = send_concurrency
+        self.dedup = AlertDedupStore() if dedup else None
+        self._executor = None
+        self.processed = 0
+        self.alerts_sent = 0
+        self.digests_sent = 0
+        self.suppressed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def run_once(self) -> int:
+        """
+        Claim and process one batch.
+
+        Returns:
+            int: number of jobs claimed (0 if none were due)
+        """
+        db = self.session_factory()
+        try:
+            lease_token, jobs = AlertJobService.claim(db, self.batch_size, self.lease_seconds)
+            if not jobs:
+                return 0
+
+            try:
+                # Jobs reclaimed after their worker died count the lost claims too
+                for job in jobs:
+                    if job.attempts > self.max_attempts:
+                        self._retry(db, lease_token, job, "lease expired too many times")
+                active = [job for job in jobs if job.attempts <= self.max_attempts]
+
+                try:
+                    alerts, present = AlertAnalysisService.analyze_batch(db, [job.session_id for job in active])
+                except Exception as e:
+                    logger.exception("Alert analysis failed for %d job(s)", len(active))
+                    db.rollback()
+                    for job in active:
+                        self._retry(db, lease_token, job, f"analysis failed: {e}")
+                    db.commit()
+                    return len(jobs)
+
+                problem_counts = {session_id: alert['problem_count']
+                                  for session_id, alert in alerts.items() if alert is not None}
+                fingerprints, cleared = {}, set()
+                if self.dedup is not None:
+                    alerts, fingerprints, cleared = self.dedup.filter(db, alerts, present)
+
+                done = []
+                deliveries = {}
+                for job in active:
+                    alert = alerts.get(job.session_id)
+                    if alert is None:
+                        if job.session_id in problem_counts:
+                            self.suppressed += 1
+                        done.append((job.id, problem_counts.get(job.session_id, 0)))
+                    else:
+                        key = (alert['site']['id'], tuple(alert['recipients']))
+                        deliveries.setdefault(key, []).append((job, alert))
+                groups = list(deliveries.values())
+                if self.send_digest is None:
+                    groups = [[entry] for group in groups for entry in group]
+                errors = self._send_all([[alert for _, alert in group] for group in groups])
+                sent_fingerprints = []
+                for group, error in zip(groups, errors):
+                    for job, alert in group:
+                        if error is not None:
+                            self._retry(db, lease_token, job, f"send failed: {error}")
+                        else:
+                            done.append((job.id, problem_counts[job.session_id]))
+                            sent_fingerprints.extend(fingerprints.get(job.session_id, []))
+                    if error is None:
+                        self.alerts_sent += len(group)
+                        self.digests_sent += len(group) > 1
+
+                if self.dedup is not None:
+                    self.dedup.record(db, sent_fingerprints, cleared)
+                AlertJobService.complete(db, lease_token, done)
+                db.commit()
+                if self.dedup is not None:
+                    self.dedup.remember(sent_fingerprints)
+                self.processed += len(done)
+            except Exception:
+                db.rollback()
+                raise
+            return len(jobs)
+        finally:
+            db.close()
+
+    def _send_all(self, deliveries: List[List[Dict[str, Any]]]) -> List[Optional[Exception]]:
+        """
+        Send deliveries (send_concurrency at a time): one alert each, or a
+        digest of several. Returns the error of each, or None.
+        """
+        if self.send_concurrency > 1 and len(deliveries) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.send_concurrency, thread_name_prefix='alert-send')
+            return list(self._executor.map(self._send, deliveries))
+        return [self._send(alerts) for alerts in deliveries]
+
+    def _send(self, alerts: List[Dict[str, Any]]) -> Optional[Exception]:
+        try:
+            if len(alerts) == 1:
+                self.send_alert(alerts[0])
+            else:
+                self.send_digest(alerts)
+            return None
+        except Exception as e:
+            logger.exception("Sending alert of session(s) %s failed",
+                             ', '.join(str(alert['session_id']) for alert in alerts))
+            return e
+
+    def _retry(self, db, lease_token: str, job, error: str) -> None:
+        if AlertJobService.retry(db, lease_token, job.id, job.attempts, error, self.max_attempts):
+            self.retried += 1
+        else:
+            self.failed += 1
+            logger.error("Alert job %s (session %s) failed permanently: %s", job.id, job.session_id, error)
+
+    def run(self, stop_event) -> None:
+        """Process batches until stop_event is set (sleeps poll_interval when idle)"""
+        while not stop_event.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Alert worker batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                stop_event.wait(self.poll_interval)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters of this worker"""
+        return {
+            'processed': self.processed,
+            'alerts_sent': self.alerts_sent,
+            'digests_sent': self.digests_sent,
+            'suppressed': self.suppressed,
+            'retried': self.retried,
+            'failed': self.failed
+        }
+
+
+def _worker_process(options: Dict[str, Any]) -> None:
+    # Ctrl+C reaches the whole process group: the parent stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    AlertWorker(**options).run(stop_event)
+
+
+def run_worker_pool(processes: int = ALERT_WORKER_PROCESSES, **options) -> None:
+    """
+    Run `processes` AlertWorker processes until SIGINT/SIGTERM; workers that
+    die are restarted. On stop, each worker finishes its current batch.
+
+    Args:
+        processes: number of worker processes
+        **options: AlertWorker arguments (must be picklable)
+    """
+    if processes < 1:
+        raise ValueError("processes must be >= 1")
+    # spawn: each worker opens its own database connections
+    context = multiprocessing.get_context('spawn')
+    stopping = threading.Event()
+
+    def start(index):
+        process = context.Process(target=_worker_process, args=(options,), name=f'alert-worker-{index}')
+        process.start()
+        return process
+
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    workers = [start(index) for index in range(processes)]
+    logger.info("Started %d alert worker process(es)", processes)
+    while not stopping.wait(1.0):
+        for index, process in enumerate(workers):
+            if not process.is_alive():
+                logger.error("Alert worker %s exited with code %s; restarting", process.name, process.exitcode)
+                workers[index] = start(index)
+
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.join()
+    logger.info("Alert workers stopped")
@@ -0,0 +1,11 @@
+"""
+Bag caches - invalidation of the in-process caches keyed by bag
+"""
+from services.checklist_index import checklist_cache
+from services.scan_cache import scan_cache
+
+
+def invalidate_bag(bag_id: int) -> None:
+    """Drop the cached scan payload and checklist of a bag after it (or one of its items) changed"""
+    scan_cache.invalidate_bag(bag_id)
+    checklist_cache.invalidate_bag(bag_id)
@@ -8,6 +8,8 @@ from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from models.bag_item import BagItem
 from models.bag import Bag
+from services.bag_service import BagService
+from services.bag_caches import invalidate_bag
 
 
 class BagItemService:
@@ -106,9 +108,12 @@ class BagItemService:
         )
         
         db.add(item)
+        BagService.record_scan_change(db, bag_id)
         db.commit()
         db.refresh(item)
         
+        invalidate_bag(bag_id)
+        
         return item
     
     @staticmethod
@@ -202,9 +207,12 @@ class BagItemService:
             item.test_batteries = data['test_batteries']
         
         # SQLAlchemy will handle updated_at automatically via onupdate
+        BagService.record_scan_change(db, item.bag_id)
         db.commit()
         db.refresh(item)
         
+        invalidate_bag(item.bag_id)
+        
         return item
     
     @staticmethod
@@ -226,8 +234,12 @@ class BagItemService:
         if not item:
             raise KeyError(f"Item not found")
         
+        bag_id = item.bag_id
         db.delete(item)
+        BagService.record_scan_change(db, bag_id)
         db.commit()
+        
+        invalidate_bag(bag_id)
     
     @staticmethod
     def bag_item_to_dict(item):
@@ -7,6 +7,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from models.bag import Bag
 from models.site import Site
+from services.bag_caches import invalidate_bag
+from services.token_filter import token_filter
 
 
 class BagService:
@@ -73,9 +75,14 @@ class BagService:
         )
         
         db.add(bag)
+        db.flush()
+        BagService.rebuild_scan_snapshot(db, bag.id)
         db.commit()
         db.refresh(bag)
         
+        # Make the new token scannable immediately in this process
+        token_filter.add(qr_token)
+        
         return bag
 
     @staticmethod
@@ -152,11 +159,48 @@ class BagService:
                 raise ValueError("active must be a boolean")
             bag.active = active
         
+        BagService.record_scan_change(db, bag.id)
         db.commit()
         db.refresh(bag)
         
+        # Name/active are part of the public scan payload
+        invalidate_bag(bag_id)
+        if bag.active:
+            token_filter.forget_not_found(bag.qr_token)
+        
         return bag
 
+    @staticmethod
+    def record_scan_change(db: Session, bag_id: int) -> None:
+        """
+        Increment the bag's scan_version and rebuild its scan snapshot
+        in the current transaction (does not commit).
+        Call before committing any change to the bag or its items.
+        
+        Args:
+            db: Database session
+            bag_id: ID of the bag
+        """
+        db.query(Bag).filter(Bag.id == bag_id).update(
+            {Bag.scan_version: Bag.scan_version + 1},
+            synchronize_session=False
+        )
+        BagService.rebuild_scan_snapshot(db, bag_id)
+
+    @staticmethod
+    def rebuild_scan_snapshot(db: Session, bag_id: int) -> None:
+        """Rebuild the bag's pre-serialized scan response (does not commit)"""
+        # Imported here: scan_snapshot_service -> qr_service -> bag_item_service -> bag_service
+        from services.scan_snapshot_service import ScanSnapshotService
+        ScanSnapshotService.rebuild(db, bag_id)
+
+    @staticmethod
+    def delete_scan_snapshot(db: Session, bag_id: int) -> None:
+        """Drop the bag's pre-serialized scan response (does not commit)"""
+        # Imported here for the same cycle as rebuild_scan_snapshot
+        from services.scan_snapshot_service import ScanSnapshotService
+        ScanSnapshotService.delete(db, bag_id)
+
     @staticmethod
     def delete_bag(db: Session, bag_id: int) -> None:
         """
@@ -174,8 +218,11 @@ class BagService:
         """
         bag = BagService.get_bag_by_id(db, bag_id)
         
+        BagService.delete_scan_snapshot(db, bag_id)
         db.delete(bag)
         db.commit()
+        
+        invalidate_bag(bag_id)
 
     @staticmethod
     def bag_to_dict(bag: Bag) -> Dict[str, Any]:
@@ -195,5 +242,8 @@ class BagService:
             "qr_token": bag.qr_token,
             "active": bag.active,
             "created_at": bag.created_at.isoformat() if bag.created_at else None,
-            "updated_at": bag.updated_at.isoformat() if bag.updated_at else None
+            "updated_at": bag.updated_at.isoformat() if bag.updated_at else None,
+            "last_checked_at": bag.last_checked_at.isoformat() if bag.last_checked_at else None,
+            "last_session_id": bag.last_session_id,
+            "last_problem_count": bag.last_problem_count
         }
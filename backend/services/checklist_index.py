@@ -0,0 +1,79 @@
+"""
+Checklist index - compact per-bag item data for validating inventory submissions
+"""
+import os
+from array import array
+from typing import Iterable, Optional, Tuple
+from services.scan_cache import QR_SCAN_CACHE_TTL_SECONDS, ScanCache
+
+FLAG_TEST_BATTERIES = 1
+FLAG_TRACK_EXPIRY = 2
+
+# expected_qty slot value of presence-only items
+NO_EXPECTED_QTY = -1
+
+
+class Checklist:
+    """
+    Item ids of an active bag plus, per item, its expected_qty and flags.
+
+    Items are stored by position: an id -> position dict, an int array of
+    expected quantities and a byte per item of FLAG_* bits.
+    """
+    __slots__ = ('bag_id', 'positions', 'expected_qty', 'flags')
+
+    def __init__(self, bag_id: int,
+                 items: Iterable[Tuple[int, Optional[int], bool, bool]] = ()):
+        """
+        Args:
+            bag_id: ID of the bag
+            items: (item_id, expected_qty, test_batteries, track_expiry) per item
+        """
+        self.bag_id = bag_id
+        self.positions = {}
+        self.expected_qty = array('l')
+        self.flags = bytearray()
+        for item_id, expected_qty, test_batteries, track_expiry in items:
+            self.positions[item_id] = len(self.expected_qty)
+            self.expected_qty.append(NO_EXPECTED_QTY if expected_qty is None else expected_qty)
+            self.flags.append((FLAG_TEST_BATTERIES if test_batteries else 0)
+                              | (FLAG_TRACK_EXPIRY if track_expiry else 0))
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def check(self, item_id: int, status: str, observed_qty: Optional[int]) -> Optional[str]:
+        """
+        Check one result against the item's configuration.
+
+        Rules: the item must belong to the bag; battery_low only for items
+        with test_batteries; not_enough only for items with an expected_qty,
+        and observed_qty (if given) must then be below it.
+
+        Returns:
+            error message, or None if the result is valid
+        """
+        position = self.positions.get(item_id)
+        if position is None:
+            return f"bag_item_id {item_id} is not an item of this bag"
+
+        if status == 'battery_low' and not self.flags[position] & FLAG_TEST_BATTERIES:
+            return f"bag_item_id {item_id} does not require a battery test"
+
+        if status == 'not_enough':
+            expected_qty = self.expected_qty[position]
+            if expected_qty == NO_EXPECTED_QTY:
+                return f"bag_item_id {item_id} has no expected quantity"
+            if observed_qty is not None and observed_qty >= expected_qty:
+                return f"observed_qty of bag_item_id {item_id} must be below its expected quantity ({expected_qty})"
+
+        return None
+
+
+# Process-wide checklists keyed by qr_token, invalidated by bag/item mutations
+# together with scan_cache and expiring after the same ttl
+checklist_cache = ScanCache(max_size=int(os.getenv('INVENTORY_CHECKLIST_CACHE_SIZE', '4096')),
+                            ttl=QR_SCAN_CACHE_TTL_SECONDS)
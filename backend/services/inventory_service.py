@@ -0,0 +1,608 @@
+"""
+Inventory service - business logic for inventory check submissions
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import Table, and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.bag import Bag
+from models.bag_item import BagItem
+from models.inventory_result import InventoryResult, InventoryStatus
+from models.inventory_session import InventorySession
+from models.inventory_upload import InventoryUpload
+from middleware.timing import stage
+from models.types import parse_qr_token
+from services.alert_job_service import AlertJobService
+from services.bag_caches import invalidate_bag
+from services.checklist_index import Checklist, checklist_cache
+
+logger = logging.getLogger(__name__)
+
+# Max results per submitted session
+INVENTORY_MAX_RESULTS = int(os.getenv('INVENTORY_MAX_RESULTS', '2000'))
+
+_STATUS_BY_VALUE = {status.value: status for status in InventoryStatus}
+
+# Bulk upload (POST /api/inventory/bulk): sessions per transaction, max NDJSON line size
+INVENTORY_BULK_CHUNK_SIZE = int(os.getenv('INVENTORY_BULK_CHUNK_SIZE', '100'))
+INVENTORY_BULK_MAX_LINE_BYTES = int(os.getenv('INVENTORY_BULK_MAX_LINE_BYTES', str(1024 * 1024)))
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING RETURNING
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+class SubmissionConflictError(Exception):
+    """Bag or items changed after the submission was validated against the cached checklist"""
+
+
+class PreparedSubmission(NamedTuple):
+    """Validated inventory session, ready to be written"""
+    bag_id: int
+    nickname: Optional[str]
+    ip_address: Optional[str]
+    # Column dicts for inventory_results (session_id is added on write)
+    results: List[Dict[str, Any]]
+    # Idempotency-Key header of the request, if any
+    idempotency_key: Optional[str] = None
+    # Time the check was submitted, if written later (spool replay); default: write time
+    created_at: Optional[datetime] = None
+
+
+class InventoryService:
+    """Handles inventory submission validation and storage"""
+
+    @staticmethod
+    def validate_submission_data(data: Any) -> tuple[bool, str | None]:
+        """
+        Validate the shape of a submission body (no database access).
+
+        Args:
+            data: parsed JSON body {nickname?, results: [{bag_item_id, status, observed_qty?, notes?}]}
+
+        Returns:
+            tuple: (is_valid, error_message)
+        """
+        if not isinstance(data, dict):
+            return False, "request body must be a JSON object"
+
+        nickname = data.get('nickname')
+        if nickname is not None and (not isinstance(nickname, str) or len(nickname) > 255):
+            return False, "nickname must be a string of at most 255 characters"
+
+        results = data.get('results')
+        if not isinstance(results, list) or not results:
+            return False, "results must be a non-empty list"
+        if len(results) > INVENTORY_MAX_RESULTS:
+            return False, f"at most {INVENTORY_MAX_RESULTS} results per session"
+
+        seen = set()
+        for result in results:
+            if not isinstance(result, dict):
+                return False, "results entries must be objects"
+
+            item_id = result.get('bag_item_id')
+            if not isinstance(item_id, int) or isinstance(item_id, bool):
+                return False, "bag_item_id must be an integer"
+            if item_id in seen:
+                return False, f"duplicate result for bag_item_id {item_id}"
+            seen.add(item_id)
+
+            if result.get('status') not in _STATUS_BY_VALUE:
+                return False, f"status must be one of: {', '.join(_STATUS_BY_VALUE)}"
+
+            qty = result.get('observed_qty')
+            if qty is not None and (not isinstance(qty, int) or isinstance(qty, bool) or qty < 0):
+                return False, "observed_qty must be an integer >= 0"
+
+            notes = result.get('notes')
+            if notes is not None and not isinstance(notes, str):
+                return False, "notes must be a string"
+
+        return True, None
+
+    @staticmethod
+    def prepare_submission(db: Session, qr_token: str, data: Any, ip_address: Optional[str] = None,
+                           idempotency_key: Optional[str] = None) -> PreparedSubmission:
+        """
+        Validate a submission against the bag's checklist.
+
+        Args:
+            db: Database session
+            qr_token: QR token of the checked bag (canonical UUID form)
+            data: parsed JSON body
+            ip_address: client IP address
+            idempotency_key: Idempotency-Key header value, if any
+
+        Returns:
+            PreparedSubmission
+
+        Raises:
+            KeyError: if bag not found or inactive
+            ValueError: if validation fails or an item is not in the bag
+        """
+        with stage('validate'):
+            InventoryService.validate_submission(data, idempotency_key)
+        with stage('resolve'):
+            checklist = InventoryService.load_checklists(db, [qr_token]).get(qr_token)
+        if checklist is None:
+            raise KeyError("Bag not found")
+        with stage('validate'):
+            return InventoryService.build_submission(checklist, data, ip_address, idempotency_key)
+
+    @staticmethod
+    def load_checklists(db: Session, qr_tokens: Iterable[str]) -> Dict[str, Checklist]:
+        """
+        Resolve active bags and their checklists for many QR tokens.
+
+        Checklists come from checklist_cache; tokens not cached are loaded
+        with one query and cached.
+
+        Args:
+            db: Database session
+            qr_tokens: QR tokens (canonical UUID form)
+
+        Returns:
+            dict: qr_token -> Checklist; unknown and inactive tokens are absent
+        """
+        checklists: Dict[str, Checklist] = {}
+        missing = set()
+        for token in set(qr_tokens):
+            checklist = checklist_cache.get(token)
+            if checklist is None:
+                missing.add(token)
+            else:
+                checklists[token] = checklist
+        if not missing:
+            return checklists
+
+        # Read before loading: results of a load racing a bag/item write are not cached
+        generation = checklist_cache.generation
+        rows = db.execute(
+            select(Bag.qr_token, Bag.id, BagItem.id.label('item_id'), BagItem.expected_qty,
+                   BagItem.test_batteries, BagItem.track_expiry)
+            # Outer join keeps item-less bags
+            .outerjoin(BagItem, BagItem.bag_id == Bag.id)
+            .where(Bag.qr_token.in_(missing), Bag.active.is_(True))
+            .order_by(Bag.id, BagItem.id)
+        ).all()
+
+        for token, bag_rows in groupby(rows, key=lambda row: row.qr_token):
+            bag_rows = list(bag_rows)
+            checklist = Checklist(bag_rows[0].id, [
+                (row.item_id, row.expected_qty, row.test_batteries, row.track_expiry)
+                for row in bag_rows if row.item_id is not None
+            ])
+            checklist_cache.put(token, checklist.bag_id, checklist, generation)
+            checklists[token] = checklist
+        return checklists
+
+    @staticmethod
+    def build_submission(checklist: Checklist, data: Any, ip_address: Optional[str] = None,
+                         idempotency_key: Optional[str] = None) -> PreparedSubmission:
+        """
+        Check an already shape-validated submission against a checklist
+        from load_checklists (in memory, no database access).
+
+        Raises:
+            ValueError: if a result does not fit its item (see Checklist.check)
+        """
+        results = []
+        for result in data['results']:
+            error = checklist.check(result['bag_item_id'], result['status'], result.get('observed_qty'))
+            if error is not None:
+                raise ValueError(error)
+            results.append({
+                'bag_item_id': result['bag_item_id'],
+                'status': _STATUS_BY_VALUE[result['status']],
+                'observed_qty': result.get('observed_qty'),
+                'notes': result.get('notes')
+            })
+
+        return PreparedSubmission(checklist.bag_id, data.get('nickname'), ip_address, results, idempotency_key)
+
+    @staticmethod
+    def validate_submission(data: Any, idempotency_key: Optional[str] = None) -> None:
+        """
+        Validate a submission body and idempotency key (no database access).
+
+        Raises:
+            ValueError: if validation fails
+        """
+        is_valid, error_msg = InventoryService.validate_submission_data(data)
+        if not is_valid:
+            raise ValueError(error_msg)
+        InventoryService.validate_idempotency_key(idempotency_key)
+
+    @staticmethod
+    def validate_idempotency_key(idempotency_key: Optional[str]) -> None:
+        """
+        Raises:
+            ValueError: if idempotency_key is neither None nor a 1-255 character string
+        """
+        if idempotency_key is not None and (not isinstance(idempotency_key, str)
+                                            or not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH):
+            raise ValueError(f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+
+    @staticmethod
+    def write_submission(db: Session, submission: PreparedSubmission) -> Tuple[int, bool]:
+        """
+        Insert the session row and all result rows (does not commit).
+
+        Returns:
+            tuple: (session_id, created) - created is False if the submission's
+                idempotency key was already used for this bag
+        """
+        return InventoryService.write_submissions(db, [submission])[0]
+
+    @staticmethod
+    def write_submissions(db: Session, submissions: List[PreparedSubmission],
+                          completed: bool = True) -> List[Tuple[int, bool]]:
+        """
+        Insert many sessions and their results (does not commit).
+
+        One INSERT per session row (its id is needed), then the results of
+        all sessions in one executemany INSERT (batched into multi-row
+        VALUES by the driver/SQLAlchemy), not per-object ORM adds.
+
+        A session whose (bag_id, idempotency_key) already exists is not
+        inserted again: its INSERT is a no-op on the unique index and the
+        existing session id is returned, without results.
+
+        The check state of the bags (Bag.last_checked_at, ...) is updated and
+        an alert analysis job is queued per new session in the same
+        transaction, unless completed is False (chunked uploads: both happen
+        when finalized).
+
+        Returns:
+            list[tuple]: (session_id, created) per submission, in order
+
+        Raises:
+            SubmissionConflictError: if a bag or item was deleted after
+                validation (foreign key violation); the bags' cached
+                checklists are dropped and the caller must roll back
+        """
+        try:
+            return InventoryService._write_submissions(db, submissions, completed)
+        except IntegrityError as e:
+            for bag_id in {submission.bag_id for submission in submissions}:
+                invalidate_bag(bag_id)
+            raise SubmissionConflictError("Bag changed since it was loaded, reload it and check again") from e
+
+    @staticmethod
+    def _write_submissions(db: Session, submissions: List[PreparedSubmission],
+                           completed: bool) -> List[Tuple[int, bool]]:
+        now = datetime.now(timezone.utc)
+        written = []
+        rows = []
+        states = []
+        for submission in submissions:
+            checked_at = submission.created_at or now
+            session_id = InventoryService._insert_session(db, submission, checked_at)
+            created = session_id is not None
+            if not created:
+                session_id = db.execute(
+                    select(InventorySession.id).where(
+                        InventorySession.bag_id == submission.bag_id,
+                        InventorySession.idempotency_key == submission.idempotency_key
+                    )
+                ).scalar_one()
+            else:
+                rows.extend({'session_id': session_id, **result} for result in submission.results)
+                states.append({
+                    'b_bag_id': submission.bag_id,
+                    'b_checked_at': checked_at,
+                    'b_session_id': session_id,
+                    'b_problem_count': sum(1 for result in submission.results
+                                           if result['status'] is not InventoryStatus.PRESENT)
+                })
+            written.append((session_id, created))
+
+        if rows:
+            db.execute(insert(InventoryResult.__table__), rows)
+        if states and completed:
+            InventoryService.record_check_state(db, states)
+            AlertJobService.enqueue(db, [state['b_session_id'] for state in states])
+        return written
+
+    @staticmethod
+    def record_check_state(db: Session, states: List[Dict[str, Any]], only_if_newer: bool = True) -> None:
+        """
+        Store the latest check of bags in one executemany UPDATE (does not commit).
+
+        Bag.updated_at is kept: it tracks changes of the scan payload (delta
+        scan bundles), which a check does not change.
+
+        Args:
+            db: Database session
+            states: dicts with b_bag_id, b_checked_at, b_session_id, b_problem_count
+            only_if_newer: skip bags whose stored check is more recent
+                (sessions replayed from the spool can be older)
+        """
+        bags = Bag.__table__
+        statement = (
+            update(bags)
+            .where(bags.c.id == bindparam('b_bag_id'))
+            .values(
+                last_checked_at=bindparam('b_checked_at'),
+                last_session_id=bindparam('b_session_id'),
+                last_problem_count=bindparam('b_problem_count'),
+                updated_at=bags.c.updated_at
+            )
+        )
+        if only_if_newer:
+            statement = statement.where(or_(
+                bags.c.last_checked_at.is_(None),
+                bags.c.last_checked_at <= bindparam('b_checked_at')
+            ))
+        db.execute(statement, states)
+
+    @staticmethod
+    def backfill_check_state(db: Session, chunk_size: int = 500) -> int:
+        """
+        Recompute the check state of every bag from its sessions (commits per chunk).
+        Sessions of uploads that were not finalized are not completed checks
+        and are skipped.
+
+        Args:
+            db: Database session
+            chunk_size: bags per chunk
+
+        Returns:
+            int: number of bags with at least one session
+        """
+        latest = select(
+            InventorySession.bag_id,
+            InventorySession.id,
+            InventorySession.created_at,
+            func.row_number().over(
+                partition_by=InventorySession.bag_id,
+                order_by=(InventorySession.created_at.desc(), InventorySession.id.desc())
+            ).label('position')
+        ).outerjoin(InventoryUpload, InventoryUpload.session_id == InventorySession.id).where(
+            or_(InventoryUpload.id.is_(None), InventoryUpload.finalized_at.is_not(None))
+        )
+
+        updated = 0
+        last_id = 0
+        while True:
+            bag_ids = db.execute(
+                select(Bag.id).where(Bag.id > last_id).order_by(Bag.id).limit(chunk_size)
+            ).scalars().all()
+            if not bag_ids:
+                return updated
+            last_id = bag_ids[-1]
+
+            ranked = latest.where(InventorySession.bag_id.in_(bag_ids)).subquery()
+            rows = db.execute(
+                select(ranked.c.bag_id, ranked.c.id, ranked.c.created_at, func.count(InventoryResult.id))
+                .outerjoin(InventoryResult, and_(
+                    InventoryResult.session_id == ranked.c.id,
+                    InventoryResult.status != InventoryStatus.PRESENT
+                ))
+                .where(ranked.c.position == 1)
+                .group_by(ranked.c.bag_id, ranked.c.id, ranked.c.created_at)
+            ).all()
+            if rows:
+                InventoryService.record_check_state(db, [
+                    {'b_bag_id': bag_id, 'b_checked_at': created_at,
+                     'b_session_id': session_id, 'b_problem_count': problem_count}
+                    for bag_id, session_id, created_at, problem_count in rows
+                ], only_if_newer=False)
+            db.commit()
+            updated += len(rows)
+
+    @staticmethod
+    def _insert_session(db: Session, submission: PreparedSubmission, created_at: datetime) -> Optional[int]:
+        """Insert a session row; None if its idempotency key is already taken"""
+        values = {
+            'bag_id': submission.bag_id,
+            'created_at': created_at,
+            'nickname': submission.nickname,
+            'ip_address': submission.ip_address,
+            'idempotency_key': submission.idempotency_key
+        }
+        table = InventorySession.__table__
+        if submission.idempotency_key is None:
+            return db.execute(insert(table).values(**values)).inserted_primary_key[0]
+        return InventoryService.insert_if_absent(db, table, values, ['bag_id', 'idempotency_key'])
+
+    @staticmethod
+    def insert_if_absent(db: Session, table: Table, values: Dict[str, Any],
+                         index_elements: List[str]) -> Optional[Any]:
+        """
+        INSERT a row unless it conflicts on the unique index over index_elements
+        (does not commit).
+
+        Returns:
+            first primary key column of the new row, or None if the row already existed
+        """
+        key_column = table.primary_key.columns.values()[0]
+        dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            return db.execute(
+                dialect_insert(table).values(**values)
+                .on_conflict_do_nothing(index_elements=index_elements)
+                .returning(key_column)
+            ).scalar()
+
+        # Other backends: savepoint around a plain INSERT
+        try:
+            with db.begin_nested():
+                return db.execute(insert(table).values(**values)).inserted_primary_key[0]
+        except IntegrityError:
+            return None
+
+    @staticmethod
+    def submit(db: Session, qr_token: str, data: Any, ip_address: Optional[str] = None,
+               idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Validate and store an inventory check in one transaction.
+
+        Args:
+            db: Database session
+            qr_token: QR token of the checked bag (canonical UUID form)
+            data: parsed JSON body
+            ip_address: client IP address
+            idempotency_key: Idempotency-Key header value, if any
+
+        Returns:
+            dict: {session_id, bag_id, result_count, replayed} - replayed is
+                True if the key was already used and nothing was written
+
+        Raises:
+            KeyError: if bag not found or inactive
+            ValueError: if validation fails
+            SubmissionConflictError: if the bag or an item was deleted meanwhile
+        """
+        submission = InventoryService.prepare_submission(db, qr_token, data, ip_address, idempotency_key)
+        try:
+            with stage('write'):
+                session_id, created = InventoryService.write_submission(db, submission)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return {
+            'session_id': session_id,
+            'bag_id': submission.bag_id,
+            'result_count': len(submission.results),
+            'replayed': not created
+        }
+
+    @staticmethod
+    def iter_ndjson(stream: IO[bytes], max_line_bytes: int = INVENTORY_BULK_MAX_LINE_BYTES
+                    ) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """
+        Parse an NDJSON body one line at a time (never buffers the whole body).
+
+        Args:
+            stream: binary request stream
+            max_line_bytes: longest accepted line
+
+        Yields:
+            tuple: (line_number, parsed_value, error_message) - blank lines are skipped
+        """
+        line_number = 0
+        while True:
+            line = stream.readline(max_line_bytes + 1)
+            if not line:
+                return
+            line_number += 1
+
+            if len(line) > max_line_bytes:
+                # Skip the rest of the oversized line
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(65536)
+                yield line_number, None, f"line exceeds {max_line_bytes} bytes"
+                continue
+            if not line.strip():
+                continue
+
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError:
+                yield line_number, None, "line is not valid JSON"
+
+    @staticmethod
+    def submit_bulk(db: Session, lines: Iterable[Tuple[int, Any, Optional[str]]],
+                    ip_address: Optional[str] = None,
+                    chunk_size: int = INVENTORY_BULK_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Store many sessions (lines from iter_ndjson), committing every chunk_size lines.
+
+        Each line is {"qr_token", "idempotency_key"?, "nickname"?, "results"}.
+        Tokens of a chunk are resolved with one query; valid sessions of a
+        chunk are written in one transaction (one by one if it fails).
+
+        Yields:
+            dict: per line, in order - {line, ok: true, session_id, bag_id, result_count, replayed}
+                or {line, ok: false, error: {code, message}}
+        """
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield from InventoryService._submit_chunk(db, chunk, ip_address)
+                chunk = []
+        if chunk:
+            yield from InventoryService._submit_chunk(db, chunk, ip_address)
+
+    @staticmethod
+    def _submit_chunk(db: Session, chunk: List[Tuple[int, Any, Optional[str]]],
+                      ip_address: Optional[str]) -> List[Dict[str, Any]]:
+        def failed(line_number, code, message):
+            return {'line': line_number, 'ok': False, 'error': {'code': code, 'message': message}}
+
+        outcomes: Dict[int, Dict[str, Any]] = {}
+        valid = []
+        for line_number, data, error in chunk:
+            if error is None:
+                try:
+                    if not isinstance(data, dict):
+                        raise ValueError("line must be a JSON object")
+                    InventoryService.validate_submission(data, data.get('idempotency_key'))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                outcomes[line_number] = failed(line_number, 'INVALID_INPUT', error)
+                continue
+            token = data.get('qr_token')
+            valid.append((line_number, data, parse_qr_token(token) if isinstance(token, str) else None))
+
+        checklists = InventoryService.load_checklists(db, (token for _, _, token in valid if token))
+
+        prepared = []
+        for line_number, data, token in valid:
+            if token not in checklists:
+                outcomes[line_number] = failed(line_number, 'NOT_FOUND', 'Bag not found')
+                continue
+            try:
+                prepared.append((line_number, InventoryService.build_submission(
+                    checklists[token], data, ip_address, data.get('idempotency_key')
+                )))
+            except ValueError as e:
+                outcomes[line_number] = failed(line_number, 'INVALID_INPUT', str(e))
+
+        def stored(line_number, submission, written):
+            session_id, created = written
+            return {
+                'line': line_number,
+                'ok': True,
+                'session_id': session_id,
+                'bag_id': submission.bag_id,
+                'result_count': len(submission.results),
+                'replayed': not created
+            }
+
+        if prepared:
+            try:
+                written = InventoryService.write_submissions(db, [submission for _, submission in prepared])
+                db.commit()
+                for (line_number, submission), row in zip(prepared, written):
+                    outcomes[line_number] = stored(line_number, submission, row)
+            except Exception:
+                db.rollback()
+                # Isolate the failing session(s)
+                for line_number, submission in prepared:
+                    try:
+                        row = InventoryService.write_submission(db, submission)
+                        db.commit()
+                        outcomes[line_number] = stored(line_number, submission, row)
+                    except SubmissionConflictError as e:
+                        db.rollback()
+                        outcomes[line_number] = failed(line_number, 'CONFLICT', str(e))
+                    except Exception:
+                        db.rollback()
+                        logger.exception("Bulk inventory line %d could not be stored", line_number)
+                        outcomes[line_number] = failed(line_number, 'UNAVAILABLE', 'Session could not be stored')
+
+        return [outcomes[line_number] for line_number in sorted(outcomes)]
@@ -0,0 +1,344 @@
+"""
+Inventory spool - durable local queue for submissions the database could not take
+
+When a submission fails with a connection-level database error it is
+appended to an append-only spool file (one JSON line per session, fsync'd
+before the client is answered). A background replayer writes spooled
+sessions back in batches once the database is reachable again.
+
+Every spooled session carries an idempotency key (generated if the client
+sent none), so replaying a batch twice - after a crash or a failed commit -
+never stores a session twice.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy.exc import InterfaceError, OperationalError
+from database import SessionLocal
+from models.inventory_result import InventoryStatus
+from services.inventory_service import InventoryService, PreparedSubmission
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms: in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning "database unreachable" (spool and retry later), as opposed to bad data
+DB_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class InventorySpool:
+    """
+    fsync'd append-only spool file plus a background replayer thread.
+
+    Files next to path: <path> receives appends; the replayer atomically
+    renames it to <path>.replaying and drains that, so appends never wait
+    for a replay. Records that can never be stored (bag or item deleted
+    meanwhile, corrupt lines) are moved to <path>.rejected for review.
+    Locks: <path>.lock (appends / rename) and <path>.replay.lock (one
+    replayer across worker processes).
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, replay_interval: float = 5.0,
+                 session_factory=SessionLocal):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.path = path
+        self.replaying_path = path + '.replaying'
+        self.rejected_path = path + '.rejected'
+        self.batch_size = batch_size
+        self.replay_interval = replay_interval
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        # (inode, offset) of the replaying file up to which records are stored
+        self._replayed_upto = (None, 0)
+        self.spooled = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.replay_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        """False if no spool path is configured"""
+        return bool(self.path)
+
+    # Appending
+
+    def spool_request(self, qr_token: str, data: Dict[str, Any], ip_address: Optional[str] = None,
+                      idempotency_key: Optional[str] = None) -> None:
+        """
+        Durably spool a shape-validated submission whose bag could not be resolved
+        (checked against the bag's checklist on replay).
+        """
+        self._append([{
+            'qr_token': qr_token,
+            'nickname': data.get('nickname'),
+            'ip_address': ip_address,
+            'idempotency_key': idempotency_key or self._new_key(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'results': [
+                {key: result.get(key) for key in ('bag_item_id', 'status', 'observed_qty', 'notes')}
+                for result in data['results']
+            ]
+        }])
+
+    def spool_submissions(self, submissions: List[PreparedSubmission]) -> None:
+        """Durably spool prepared (already validated) submissions"""
+        now = datetime.now(timezone.utc)
+        self._append([{
+            'bag_id': submission.bag_id,
+            'nickname': submission.nickname,
+            'ip_address': submission.ip_address,
+            'idempotency_key': submission.idempotency_key or self._new_key(),
+            'created_at': (submission.created_at or now).isoformat(),
+            'results': [{**result, 'status': result['status'].value} for result in submission.results]
+        } for submission in submissions])
+
+    @staticmethod
+    def _new_key() -> str:
+        return f'spool-{uuid.uuid4().hex}'
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        data = b''.join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+                        for record in records)
+        with self._file_lock(self._lock, self.path + '.lock'):
+            created = not os.path.exists(self.path)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if created:
+                self._fsync_dir()
+        self.spooled += len(records)
+        logger.warning("Database unavailable: spooled %d inventory session(s) to %s", len(records), self.path)
+        self.start()
+
+    def _fsync_dir(self) -> None:
+        """Persist the directory entry of a newly created spool file"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    @contextmanager
+    def _file_lock(lock: threading.Lock, lock_path: str, blocking: bool = True) -> Iterator[bool]:
+        """Hold lock and an flock on lock_path (other processes); yields False if not acquired"""
+        if not lock.acquire(blocking):
+            yield False
+            return
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o600)
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        yield False
+                        return
+                yield True
+            finally:
+                os.close(fd)
+        finally:
+            lock.release()
+
+    # Replaying
+
+    def replay_once(self) -> bool:
+        """
+        Write back everything spooled so far.
+
+        Returns:
+            bool: True if the spool is empty afterwards (False: database still
+                unavailable or another process is replaying)
+        """
+        with self._file_lock(self._replay_lock, self.path + '.replay.lock', blocking=False) as acquired:
+            if not acquired:
+                return False
+
+            if not os.path.exists(self.replaying_path):
+                with self._file_lock(self._lock, self.path + '.lock'):
+                    if not os.path.exists(self.path):
+                        return True
+                    os.replace(self.path, self.replaying_path)
+
+            with open(self.replaying_path, 'rb') as spool_file:
+                # Resume after the batches this process already stored
+                inode = os.fstat(spool_file.fileno()).st_ino
+                if self._replayed_upto[0] == inode:
+                    spool_file.seek(self._replayed_upto[1])
+                batch = []
+                for line in spool_file:
+                    batch.append(line)
+                    if len(batch) >= self.batch_size:
+                        if not self._replay_batch(batch):
+                            return False
+                        self._replayed_upto = (inode, spool_file.tell())
+                        batch = []
+                if batch and not self._replay_batch(batch):
+                    return False
+
+            os.remove(self.replaying_path)
+            self._replayed_upto = (None, 0)
+            return not os.path.exists(self.path)
+
+    def _replay_batch(self, lines: List[bytes]) -> bool:
+        """Store one batch of spool lines; False if the database is unavailable"""
+        records = []
+        for line in lines:
+            try:
+                records.append((line, json.loads(line)))
+            except ValueError:
+                # Torn final line of a crashed append, or corruption
+                self._reject(line, "not valid JSON")
+
+        db = self.session_factory()
+        try:
+            try:
+                submissions = self._prepare(db, records)
+                InventoryService.write_submissions(db, [submission for _, submission in submissions])
+                db.commit()
+                self.replayed += len(submissions)
+                return True
+            except DB_UNAVAILABLE_ERRORS:
+                db.rollback()
+                self.replay_failures += 1
+                logger.warning("Inventory spool replay: database still unavailable")
+                return False
+            except Exception:
+                db.rollback()
+                logger.exception("Inventory spool batch failed; replaying one by one")
+
+            for line, record in records:
+                try:
+                    submissions = self._prepare(db, [(line, record)])
+                    InventoryService.write_submissions(db, [submission for _, submission in submissions])
+                    db.commit()
+                    self.replayed += len(submissions)
+                except DB_UNAVAILABLE_ERRORS:
+                    db.rollback()
+                    self.replay_failures += 1
+                    return False
+                except Exception as e:
+                    db.rollback()
+                    self._reject(line, str(e))
+            return True
+        finally:
+            db.close()
+
+    def _prepare(self, db, records) -> List[tuple]:
+        """(line, PreparedSubmission) per storable record; others are rejected"""
+        checklists = InventoryService.load_checklists(
+            db, (record['qr_token'] for _, record in records if 'qr_token' in record)
+        )
+        prepared = []
+        for line, record in records:
+            try:
+                created_at = datetime.fromisoformat(record['created_at'])
+                if 'bag_id' in record:
+                    prepared.append((line, PreparedSubmission(
+                        record['bag_id'], record['nickname'], record['ip_address'],
+                        [{**result, 'status': InventoryStatus(result['status'])} for result in record['results']],
+                        record['idempotency_key'], created_at
+                    )))
+                    continue
+
+                InventoryService.validate_submission(record, record['idempotency_key'])
+                checklist = checklists.get(record['qr_token'])
+                if checklist is None:
+                    raise ValueError("Bag not found")
+                submission = InventoryService.build_submission(
+                    checklist, record, record['ip_address'], record['idempotency_key']
+                )
+                prepared.append((line, submission._replace(created_at=created_at)))
+            except (KeyError, TypeError, ValueError) as e:
+                self._reject(line, str(e))
+        return prepared
+
+    def _reject(self, line: bytes, reason: str) -> None:
+        """Move an unstorable record to the rejected file"""
+        self.rejected += 1
+        logger.error("Inventory spool record rejected (%s)", reason)
+        with open(self.rejected_path, 'ab') as rejected_file:
+            rejected_file.write(line if line.endswith(b'\n') else line + b'\n')
+
+    # Background replayer
+
+    def start(self) -> None:
+        """Start the replayer thread (no-op if running)"""
+        if self._thread is not None or not self.enabled:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='inventory-spool', daemon=True)
+                self._thread.start()
+
+    def start_if_pending(self) -> None:
+        """Start the replayer if a previous process left spooled records"""
+        if self.enabled and (os.path.exists(self.path) or os.path.exists(self.replaying_path)):
+            self.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the replayer thread (spooled records stay on disk)"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.replay_interval):
+            try:
+                if self.replay_once():
+                    logger.info("Inventory spool drained")
+            except Exception:
+                logger.exception("Inventory spool replay failed")
+
+    def depth(self) -> int:
+        """Number of records waiting in the spool files"""
+        count = 0
+        for path in (self.replaying_path, self.path):
+            try:
+                with open(path, 'rb') as spool_file:
+                    count += sum(chunk.count(b'\n') for chunk in iter(lambda: spool_file.read(65536), b''))
+            except FileNotFoundError:
+                pass
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Return spool depth and counters"""
+        return {
+            'depth': self.depth() if self.enabled else 0,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'rejected': self.rejected,
+            'replay_failures': self.replay_failures
+        }
+
+
+# Process-wide spool (INVENTORY_SPOOL_PATH='' disables spooling)
+inventory_spool = InventorySpool(
+    os.getenv('INVENTORY_SPOOL_PATH', 'inventory_spool.ndjson'),
+    batch_size=int(os.getenv('INVENTORY_SPOOL_BATCH_SIZE', '200')),
+    replay_interval=float(os.getenv('INVENTORY_SPOOL_REPLAY_INTERVAL_SECONDS', '5'))
+)
@@ -0,0 +1,268 @@
+"""
+Inventory upload service - resumable chunked submission of large inventory checks
+
+Protocol: open an upload (creates the session), PUT result chunks by index
+(each chunk one transaction and one bulk INSERT into inventory_results;
+re-sending a received chunk is a no-op), GET the upload to see which
+chunks arrived, then finalize with the total number of chunks.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.bag import Bag
+from models.inventory_result import InventoryResult, InventoryStatus
+from models.inventory_session import InventorySession
+from models.inventory_upload import InventoryUpload, InventoryUploadChunk
+from services.alert_job_service import AlertJobService
+from services.bag_caches import invalidate_bag
+from services.inventory_service import InventoryService, PreparedSubmission
+
+# Max chunks per upload (each holds up to INVENTORY_MAX_RESULTS results)
+INVENTORY_UPLOAD_MAX_CHUNKS = int(os.getenv('INVENTORY_UPLOAD_MAX_CHUNKS', '1000'))
+
+
+class UploadConflictError(Exception):
+    """Request does not fit the upload's state (finalized, chunks missing, key reused)"""
+
+
+class InventoryUploadService:
+    """Handles chunked inventory uploads"""
+
+    @staticmethod
+    def open_upload(db: Session, qr_token: str, data: Any, ip_address: Optional[str] = None,
+                    idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Open an upload for a bag (commits).
+
+        Args:
+            db: Database session
+            qr_token: QR token of the checked bag (canonical UUID form)
+            data: parsed JSON body {nickname?}
+            ip_address: client IP address
+            idempotency_key: Idempotency-Key header value; a retried open
+                returns the existing upload
+
+        Returns:
+            tuple: (upload status dict, created)
+
+        Raises:
+            KeyError: if bag not found or inactive
+            ValueError: if validation fails
+            UploadConflictError: if the key was used by a regular submission
+        """
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        nickname = data.get('nickname')
+        if nickname is not None and (not isinstance(nickname, str) or len(nickname) > 255):
+            raise ValueError("nickname must be a string of at most 255 characters")
+        InventoryService.validate_idempotency_key(idempotency_key)
+
+        checklist = InventoryService.load_checklists(db, [qr_token]).get(qr_token)
+        if checklist is None:
+            raise KeyError("Bag not found")
+
+        try:
+            # Results arrive in chunks; check state and alert job on finalize
+            [(session_id, created)] = InventoryService.write_submissions(
+                db, [PreparedSubmission(checklist.bag_id, nickname, ip_address, [], idempotency_key)],
+                completed=False
+            )
+            if created:
+                upload_token = str(uuid.uuid4())
+                db.execute(insert(InventoryUpload.__table__).values(
+                    upload_token=upload_token, session_id=session_id
+                ))
+            else:
+                upload_token = db.execute(
+                    select(InventoryUpload.upload_token).where(InventoryUpload.session_id == session_id)
+                ).scalar()
+                if upload_token is None:
+                    raise UploadConflictError("Idempotency-Key was already used by a completed submission")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return InventoryUploadService.get_upload(db, upload_token), created
+
+    @staticmethod
+    def get_upload(db: Session, upload_token: str) -> Dict[str, Any]:
+        """
+        Get the state of an upload.
+
+        Returns:
+            dict: {upload_id, session_id, bag_id, received_chunks, result_count, finalized}
+
+        Raises:
+            KeyError: if upload not found
+        """
+        upload = InventoryUploadService._load(db, upload_token)
+        chunks = db.execute(
+            select(InventoryUploadChunk.chunk_index, InventoryUploadChunk.result_count)
+            .where(InventoryUploadChunk.upload_id == upload.id)
+            .order_by(InventoryUploadChunk.chunk_index)
+        ).all()
+        return {
+            'upload_id': upload_token,
+            'session_id': upload.session_id,
+            'bag_id': upload.bag_id,
+            'received_chunks': [chunk.chunk_index for chunk in chunks],
+            'result_count': sum(chunk.result_count for chunk in chunks),
+            'finalized': upload.finalized_at is not None
+        }
+
+    @staticmethod
+    def put_chunk(db: Session, upload_token: str, chunk_index: int, data: Any) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store one chunk of results (commits). Re-sending a received chunk
+        changes nothing.
+
+        Args:
+            db: Database session
+            upload_token: upload id returned by open_upload
+            chunk_index: 0-based chunk number
+            data: parsed JSON body {results: [...]} (same format as a submission)
+
+        Returns:
+            tuple: ({upload_id, chunk_index, result_count}, created)
+
+        Raises:
+            KeyError: if upload not found (or its bag was deactivated)
+            ValueError: if validation fails, an item was already sent in
+                another chunk or an item was deleted meanwhile
+            UploadConflictError: if the upload is finalized
+        """
+        if not 0 <= chunk_index < INVENTORY_UPLOAD_MAX_CHUNKS:
+            raise ValueError(f"chunk index must be between 0 and {INVENTORY_UPLOAD_MAX_CHUNKS - 1}")
+        InventoryService.validate_submission(data)
+
+        upload = InventoryUploadService._load(db, upload_token)
+        if upload.finalized_at is not None:
+            raise UploadConflictError("Upload is already finalized")
+        checklist = InventoryService.load_checklists(db, [upload.qr_token]).get(upload.qr_token)
+        if checklist is None:
+            raise KeyError("Bag not found")
+        results = InventoryService.build_submission(checklist, data).results
+        item_ids = [result['bag_item_id'] for result in results]
+
+        try:
+            created = InventoryService.insert_if_absent(db, InventoryUploadChunk.__table__, {
+                'upload_id': upload.id,
+                'chunk_index': chunk_index,
+                'result_count': len(results),
+                'problem_count': sum(1 for result in results if result['status'] is not InventoryStatus.PRESENT)
+            }, ['upload_id', 'chunk_index']) is not None
+            if created:
+                InventoryUploadService._check_not_sent(db, upload.session_id, item_ids)
+                db.execute(insert(InventoryResult.__table__),
+                           [{'session_id': upload.session_id, **result} for result in results])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            # A concurrent chunk sent one of the items, or an item was deleted
+            # after the cached checklist was loaded (foreign key)
+            InventoryUploadService._check_not_sent(db, upload.session_id, item_ids)
+            invalidate_bag(checklist.bag_id)
+            raise ValueError("results contain items that no longer exist")
+        except Exception:
+            db.rollback()
+            raise
+
+        return {'upload_id': upload_token, 'chunk_index': chunk_index, 'result_count': len(results)}, created
+
+    @staticmethod
+    def _check_not_sent(db: Session, session_id: int, item_ids: List[int]) -> None:
+        """Raise ValueError if results for any of the items are already stored"""
+        sent = db.execute(
+            select(InventoryResult.bag_item_id).where(
+                InventoryResult.session_id == session_id,
+                InventoryResult.bag_item_id.in_(item_ids)
+            )
+        ).scalars().all()
+        if sent:
+            raise ValueError(f"items already sent in another chunk: {sorted(sent)}")
+
+    @staticmethod
+    def finalize(db: Session, upload_token: str, data: Any) -> Dict[str, Any]:
+        """
+        Complete an upload once chunks 0..total_chunks-1 are stored (commits):
+        records the bag's check state and queues the alert analysis.
+        Finalizing again returns the same result.
+
+        Args:
+            db: Database session
+            upload_token: upload id returned by open_upload
+            data: parsed JSON body {total_chunks}
+
+        Returns:
+            dict: {session_id, bag_id, result_count}
+
+        Raises:
+            KeyError: if upload not found
+            ValueError: if total_chunks is invalid
+            UploadConflictError: if chunks are missing (message lists them)
+        """
+        total_chunks = data.get('total_chunks') if isinstance(data, dict) else None
+        if (not isinstance(total_chunks, int) or isinstance(total_chunks, bool)
+                or not 0 < total_chunks <= INVENTORY_UPLOAD_MAX_CHUNKS):
+            raise ValueError(f"total_chunks must be an integer between 1 and {INVENTORY_UPLOAD_MAX_CHUNKS}")
+
+        upload = InventoryUploadService._load(db, upload_token)
+        chunks = db.execute(
+            select(InventoryUploadChunk.chunk_index, InventoryUploadChunk.result_count,
+                   InventoryUploadChunk.problem_count)
+            .where(InventoryUploadChunk.upload_id == upload.id)
+        ).all()
+        received = {chunk.chunk_index for chunk in chunks}
+        result = {
+            'session_id': upload.session_id,
+            'bag_id': upload.bag_id,
+            'result_count': sum(chunk.result_count for chunk in chunks)
+        }
+        if upload.finalized_at is not None:
+            return result
+
+        extra = sorted(index for index in received if index >= total_chunks)
+        if extra:
+            raise ValueError(f"chunks beyond total_chunks were received: {extra}")
+        missing = sorted(set(range(total_chunks)) - received)
+        if missing:
+            raise UploadConflictError(f"missing chunks: {missing}")
+
+        try:
+            finalized = db.execute(
+                update(InventoryUpload.__table__)
+                .where(InventoryUpload.id == upload.id, InventoryUpload.finalized_at.is_(None))
+                .values(finalized_at=datetime.now(timezone.utc))
+            ).rowcount
+            if finalized:
+                InventoryService.record_check_state(db, [{
+                    'b_bag_id': upload.bag_id,
+                    'b_checked_at': upload.checked_at,
+                    'b_session_id': upload.session_id,
+                    'b_problem_count': sum(chunk.problem_count for chunk in chunks)
+                }])
+                AlertJobService.enqueue(db, [upload.session_id])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result
+
+    @staticmethod
+    def _load(db: Session, upload_token: str):
+        """Upload row with its session's bag (id, qr_token) and check time"""
+        upload = db.execute(
+            select(InventoryUpload.id, InventoryUpload.session_id, InventoryUpload.finalized_at,
+                   InventorySession.bag_id, InventorySession.created_at.label('checked_at'), Bag.qr_token)
+            .join(InventorySession, InventorySession.id == InventoryUpload.session_id)
+            .join(Bag, Bag.id == InventorySession.bag_id)
+            .where(InventoryUpload.upload_token == upload_token)
+        ).first()
+        if upload is None:
+            raise KeyError("Upload not found")
+        return upload
@@ -0,0 +1,182 @@
+"""
+Inventory writer - write-behind batching of validated inventory submissions
+
+Requests validate a submission, hand it to the writer and are acknowledged
+immediately; a background thread groups queued sessions into one transaction.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+from database import SessionLocal
+from services.inventory_service import InventoryService, PreparedSubmission
+from services.inventory_spool import DB_UNAVAILABLE_ERRORS, inventory_spool
+
+logger = logging.getLogger(__name__)
+
+# Acknowledge submissions before they are written (default: write in the request)
+WRITE_BEHIND_ENABLED = os.getenv('INVENTORY_WRITE_BEHIND', 'false').lower() == 'true'
+
+
+class InventoryWriter:
+    """
+    Bounded queue + background thread writing submissions in batches.
+
+    A batch is written when batch_size submissions are queued or
+    flush_interval seconds after its first submission, whichever comes
+    first. A failing batch is retried one submission at a time so one bad
+    row does not drop the others; a batch failing because the database is
+    unavailable goes to the spool. stop() drains the queue before returning.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.05, session_factory=SessionLocal, spool=inventory_spool):
+        if max_queue < 1 or batch_size < 1:
+            raise ValueError("max_queue and batch_size must be >= 1")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self.spool = spool
+        self._queue: "queue.Queue[PreparedSubmission]" = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.spooled = 0
+        self.batches = 0
+
+    def enqueue(self, submission: PreparedSubmission) -> bool:
+        """
+        Queue a validated submission for writing (starts the writer thread).
+
+        Returns:
+            bool: False if the queue is full (caller should answer 503)
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(submission)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def start(self) -> None:
+        """Start the writer thread (no-op if running)"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='inventory-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """
+        Drain queued submissions and stop the writer thread.
+
+        Returns:
+            bool: True if everything queued was written (or failed) before timeout
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return self._queue.empty()
+            self._stopping.set()
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning("Inventory writer did not drain within %.1fs (%d queued)",
+                               timeout, self._queue.qsize())
+                return False
+            self._thread = None
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and write counters (duplicates: retried idempotency keys, not re-written)"""
+        return {
+            'queued': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'written': self.written,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'spooled': self.spooled,
+            'batches': self.batches
+        }
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _next_batch(self) -> List[PreparedSubmission]:
+        """Collect up to batch_size submissions, waiting at most flush_interval after the first"""
+        try:
+            first = self._queue.get(timeout=0 if self._stopping.is_set() else self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._stopping.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[PreparedSubmission]) -> None:
+        db = self.session_factory()
+        try:
+            try:
+                written = InventoryService.write_submissions(db, batch)
+                db.commit()
+                self.written += len(batch)
+                self.duplicates += sum(1 for _, created in written if not created)
+                self.batches += 1
+                return
+            except DB_UNAVAILABLE_ERRORS:
+                db.rollback()
+                if self.spool is not None and self.spool.enabled:
+                    try:
+                        self.spool.spool_submissions(batch)
+                        self.spooled += len(batch)
+                        return
+                    except OSError:
+                        logger.exception("Inventory batch of %d could not be spooled", len(batch))
+                else:
+                    logger.exception("Inventory batch of %d failed; database unavailable", len(batch))
+            except Exception:
+                db.rollback()
+                logger.exception("Inventory batch of %d failed; retrying one by one", len(batch))
+
+            for submission in batch:
+                try:
+                    _, created = InventoryService.write_submission(db, submission)
+                    db.commit()
+                    self.written += 1
+                    self.duplicates += not created
+                except Exception:
+                    db.rollback()
+                    self.failed += 1
+                    logger.exception("Inventory submission for bag %d could not be written", submission.bag_id)
+        finally:
+            db.close()
+
+
+# Process-wide writer used by the inventory routes in write-behind mode
+inventory_writer = InventoryWriter(
+    max_queue=int(os.getenv('INVENTORY_QUEUE_SIZE', '10000')),
+    batch_size=int(os.getenv('INVENTORY_BATCH_SIZE', '200')),
+    flush_interval=float(os.getenv('INVENTORY_FLUSH_INTERVAL_MS', '50')) / 1000
+)
+atexit.register(inventory_writer.stop)
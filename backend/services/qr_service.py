@@ -1,11 +1,43 @@
 """
 QR service - Business logic for QR token lookup
 """
-from typing import Dict, Any, Optional
+import json
+import os
+from datetime import date
+from itertools import groupby
+from typing import Dict, Any, List, NamedTuple, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.bag import Bag
 from models.bag_item import BagItem
+from models.bag_scan_snapshot import BagScanSnapshot
+from models.types import parse_qr_token
 from services.bag_item_service import BagItemService
+from services.checklist_index import checklist_cache
+from services.scan_cache import scan_cache
+from services.token_filter import token_filter
+
+# 'snapshot' (default): primary-key read of the prebuilt JSON, falling back
+#   to 'joined' for bags without a snapshot
+# 'joined': one statement for bag + items, only scan columns
+# 'two_query': legacy path (bag, then items via ORM objects)
+QR_LOOKUP_MODE = os.getenv('QR_LOOKUP_MODE', 'snapshot')
+
+# Bloom filter + negative cache in front of the lookup query
+TOKEN_FILTER_ENABLED = os.getenv('QR_TOKEN_FILTER_ENABLED', 'true').lower() == 'true'
+
+# Max tokens per POST /api/qr/batch request
+QR_BATCH_MAX_TOKENS = int(os.getenv('QR_BATCH_MAX_TOKENS', '200'))
+
+# Bump when the scan payload format changes so old ETags stop matching
+SCAN_ETAG_FORMAT = 'v1'
+
+
+class ScanEntry(NamedTuple):
+    """Finished scan response for one bag: strong ETag + serialized JSON body"""
+    bag_id: int
+    etag: str
+    body: bytes
 
 
 class QRService:
@@ -26,6 +58,260 @@ class QRService:
         Raises:
             ValueError: if qr_token is invalid/not found or bag is inactive
         """
+        return json.loads(QRService.lookup_scan(db, qr_token).body)
+
+    @staticmethod
+    def lookup_scan(db: Session, qr_token: str) -> ScanEntry:
+        """
+        Look up a bag by its QR token and return its ETag + JSON body.
+        
+        Read-through: served from the in-process scan cache when possible,
+        otherwise loaded from the database and cached. Tokens rejected by
+        the token filter (never issued, or recently not found) raise without
+        touching the database.
+        
+        Args:
+            db: Database session
+            qr_token: The QR token to look up
+        
+        Returns:
+            ScanEntry
+        
+        Raises:
+            ValueError: if qr_token is invalid/not found or bag is inactive
+        """
+        cached = scan_cache.get(qr_token)
+        if cached is not None:
+            return cached
+        
+        QRService._check_token_filter(db, qr_token)
+        generation = scan_cache.generation
+        try:
+            entry = QRService._load_scan_entry(db, qr_token)
+        except ValueError:
+            QRService._record_not_found(qr_token)
+            raise
+        scan_cache.put(qr_token, entry.bag_id, entry, generation=generation)
+        return entry
+
+    @staticmethod
+    def lookup_scan_batch(db: Session, qr_tokens: List[str]) -> Dict[str, Optional[ScanEntry]]:
+        """
+        Look up many QR tokens with set-based queries.
+        
+        Cache hits and token-filter rejections are resolved in memory; the
+        rest is read with one IN query on the snapshots and, for tokens
+        without a snapshot, one IN query joining bags and items.
+        
+        Args:
+            db: Database session
+            qr_tokens: tokens to look up (duplicates are ignored)
+        
+        Returns:
+            dict token -> ScanEntry, or None if not found or inactive
+        """
+        results: Dict[str, Optional[ScanEntry]] = {}
+        pending = []
+        for qr_token in dict.fromkeys(qr_tokens):
+            cached = scan_cache.get(qr_token)
+            if cached is not None:
+                results[qr_token] = cached
+            elif parse_qr_token(qr_token) is None:
+                results[qr_token] = None
+            elif TOKEN_FILTER_ENABLED and not token_filter.might_exist(db, qr_token):
+                results[qr_token] = None
+            else:
+                pending.append(qr_token)
+        
+        if not pending:
+            return results
+        
+        generation = scan_cache.generation
+        loaded: Dict[str, ScanEntry] = {}
+        if QR_LOOKUP_MODE == 'snapshot':
+            rows = db.execute(
+                select(BagScanSnapshot.qr_token, BagScanSnapshot.bag_id,
+                       BagScanSnapshot.etag, BagScanSnapshot.payload)
+                .where(BagScanSnapshot.qr_token.in_(pending))
+            )
+            for row in rows:
+                loaded[row.qr_token] = ScanEntry(row.bag_id, row.etag, row.payload.encode('utf-8'))
+        
+        missing = [qr_token for qr_token in pending if qr_token not in loaded]
+        if missing:
+            rows = db.execute(QRService.scan_rows_statement(Bag.qr_token.in_(missing)))
+            for _, bag_rows in groupby(rows, key=lambda row: row.id):
+                bag_rows = list(bag_rows)
+                loaded[bag_rows[0].qr_token] = QRService.entry_from_rows(bag_rows)
+        
+        for qr_token in pending:
+            entry = loaded.get(qr_token)
+            if entry is None:
+                QRService._record_not_found(qr_token)
+            else:
+                scan_cache.put(qr_token, entry.bag_id, entry, generation=generation)
+            results[qr_token] = entry
+        return results
+
+    @staticmethod
+    def get_scan_etag(db: Session, qr_token: str) -> str:
+        """
+        Return the current ETag of a bag's scan response without loading items.
+        
+        Served from the scan cache when possible, otherwise a single-row
+        read of the bag's id and scan_version.
+        
+        Raises:
+            ValueError: if qr_token is invalid/not found or bag is inactive
+        """
+        cached = scan_cache.get(qr_token)
+        if cached is not None:
+            return cached.etag
+        
+        QRService._check_token_filter(db, qr_token)
+        row = db.execute(
+            select(Bag.id, Bag.scan_version)
+            .where(Bag.qr_token == qr_token, Bag.active.is_(True))
+        ).first()
+        if row is None:
+            QRService._record_not_found(qr_token)
+            raise ValueError("Bag not found")
+        return QRService.scan_etag(row.id, row.scan_version)
+
+    @staticmethod
+    def _check_token_filter(db: Session, qr_token: str) -> None:
+        """Raise ValueError if qr_token is not a UUID or the token filter says it cannot exist"""
+        if parse_qr_token(qr_token) is None:
+            raise ValueError("Bag not found")
+        if TOKEN_FILTER_ENABLED and not token_filter.might_exist(db, qr_token):
+            raise ValueError("Bag not found")
+
+    @staticmethod
+    def _record_not_found(qr_token: str) -> None:
+        """Negative-cache a token the database did not resolve"""
+        if TOKEN_FILTER_ENABLED:
+            token_filter.record_not_found(qr_token)
+
+    @staticmethod
+    def scan_etag(bag_id: int, scan_version: int) -> str:
+        """Build the (unquoted) strong ETag of a bag's scan response"""
+        return f"{SCAN_ETAG_FORMAT}-{bag_id}-{scan_version}"
+
+    @staticmethod
+    def serialize_payload(payload: Dict[str, Any]) -> bytes:
+        """Serialize a scan payload to the exact response body"""
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def _load_scan_entry(db: Session, qr_token: str) -> ScanEntry:
+        """Build the scan entry from the database (cache miss path)"""
+        if QR_LOOKUP_MODE == 'two_query':
+            return QRService._load_scan_entry_two_query(db, qr_token)
+        if QR_LOOKUP_MODE == 'snapshot':
+            entry = QRService._load_scan_entry_snapshot(db, qr_token)
+            if entry is not None:
+                return entry
+        return QRService._load_scan_entry_joined(db, qr_token)
+
+    @staticmethod
+    def _load_scan_entry_snapshot(db: Session, qr_token: str) -> Optional[ScanEntry]:
+        """
+        Read the prebuilt scan body by primary key.
+        
+        Returns:
+            ScanEntry, or None if the bag has no snapshot (unknown, inactive,
+            or not built yet) and the caller should fall back to a live query
+        """
+        row = db.execute(
+            select(BagScanSnapshot.bag_id, BagScanSnapshot.etag, BagScanSnapshot.payload)
+            .where(BagScanSnapshot.qr_token == qr_token)
+        ).first()
+        if row is None:
+            return None
+        return ScanEntry(row.bag_id, row.etag, row.payload.encode('utf-8'))
+
+    @staticmethod
+    def scan_rows_statement(*criteria):
+        """
+        Single-statement scan query: active bag(s) LEFT JOIN items.
+        
+        Selects only the columns the scan response needs (no ORM object
+        construction). A bag without items yields one row with NULL item
+        columns. Rows are grouped by bag and ordered by item created_at.
+        
+        Args:
+            criteria: extra WHERE clauses on Bag (e.g. Bag.qr_token == token)
+        """
+        return (
+            select(
+                Bag.id, Bag.site_id, Bag.name, Bag.scan_version, Bag.qr_token,
+                BagItem.id.label('item_id'),
+                BagItem.name.label('item_name'),
+                BagItem.expected_qty,
+                BagItem.track_expiry,
+                BagItem.expiry_date,
+                BagItem.test_batteries,
+                BagItem.created_at,
+                BagItem.updated_at
+            )
+            .outerjoin(BagItem, BagItem.bag_id == Bag.id)
+            .where(Bag.active.is_(True), *criteria)
+            .order_by(Bag.id, BagItem.created_at, BagItem.id)
+        )
+
+    @staticmethod
+    def entry_from_rows(rows: List[Any]) -> ScanEntry:
+        """Build the scan entry of one bag from its scan_rows_statement rows"""
+        first = rows[0]
+        items = [
+            {
+                'id': row.item_id,
+                'bag_id': first.id,
+                'name': row.item_name,
+                'expected_qty': row.expected_qty,
+                'track_expiry': row.track_expiry,
+                'expiry_date': row.expiry_date.isoformat() if isinstance(row.expiry_date, date) else row.expiry_date,
+                'test_batteries': row.test_batteries,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            }
+            for row in rows if row.item_id is not None
+        ]
+        
+        payload = {
+            'bag': {
+                'id': first.id,
+                'site_id': first.site_id,
+                'name': first.name,
+                'active': True
+            },
+            'items': items
+        }
+        return ScanEntry(
+            first.id,
+            QRService.scan_etag(first.id, first.scan_version),
+            QRService.serialize_payload(payload)
+        )
+
+    @staticmethod
+    def _load_scan_entry_joined(db: Session, qr_token: str) -> ScanEntry:
+        """
+        Build the scan entry with a single round trip.
+        
+        Raises:
+            ValueError: if qr_token is not found or bag is inactive
+        """
+        rows = db.execute(QRService.scan_rows_statement(Bag.qr_token == qr_token)).all()
+        
+        # Inactive bags are filtered in SQL: same 404 as unknown tokens
+        if not rows:
+            raise ValueError("Bag not found")
+        
+        return QRService.entry_from_rows(rows)
+
+    @staticmethod
+    def _load_scan_entry_two_query(db: Session, qr_token: str) -> ScanEntry:
+        """Build the scan entry with two queries (bag, then items)"""
         # Look up bag by qr_token
         bag = db.query(Bag).filter(Bag.qr_token == qr_token).first()
         
@@ -42,7 +328,7 @@ class QRService:
         ).order_by(BagItem.created_at).all()
         
         # Convert to response format
-        return {
+        payload = {
             'bag': {
                 'id': bag.id,
                 'site_id': bag.site_id,
@@ -51,3 +337,25 @@ class QRService:
             },
             'items': [BagItemService.bag_item_to_dict(item) for item in items]
         }
+        return ScanEntry(
+            bag.id,
+            QRService.scan_etag(bag.id, bag.scan_version),
+            QRService.serialize_payload(payload)
+        )
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop all cached scan data, checklists and token filter state (used by tests and admin tooling)"""
+        scan_cache.clear()
+        checklist_cache.clear()
+        token_filter.reset()
+
+    @staticmethod
+    def cache_stats() -> Dict[str, int]:
+        """Return scan cache size and hit/miss/eviction counters"""
+        return scan_cache.stats()
+
+    @staticmethod
+    def token_filter_stats() -> Dict[str, int]:
+        """Return token filter size and rejection counters"""
+        return token_filter.stats()
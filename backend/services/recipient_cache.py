@@ -0,0 +1,81 @@
+"""
+Recipient cache - in-process LRU cache of parsed site alert recipients
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class RecipientCache:
+    """
+    Bounded, thread-safe LRU cache of Site.alert_recipients parsed from JSON,
+    keyed by site_id and validated against the site's updated_at.
+
+    The stored JSON text is compared as well, so a site changed by another
+    process within the same updated_at tick (or a reused id) is re-parsed
+    instead of served stale.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.max_size = max_size
+        # site_id -> (updated_at, recipients JSON, parsed recipients)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, site_id: int, updated_at: Optional[datetime], recipients_json: str) -> List[str]:
+        """
+        Return the parsed recipients of a site, parsing and caching them on a miss.
+
+        The returned list is shared between callers and must not be modified.
+        """
+        with self._lock:
+            entry = self._entries.get(site_id)
+            if entry is not None and entry[0] == updated_at and entry[1] == recipients_json:
+                self._entries.move_to_end(site_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        recipients = json.loads(recipients_json)
+        with self._lock:
+            self._entries[site_id] = (updated_at, recipients_json, recipients)
+            self._entries.move_to_end(site_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return recipients
+
+    def invalidate_site(self, site_id: int) -> None:
+        """Drop the cached recipients of a site (no-op if not cached)"""
+        with self._lock:
+            self._entries.pop(site_id, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Process-wide cache shared by SiteService.site_to_dict and alert analysis
+recipient_cache = RecipientCache(max_size=int(os.getenv('SITE_RECIPIENT_CACHE_SIZE', '1024')))
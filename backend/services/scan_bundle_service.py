@@ -0,0 +1,97 @@
+"""
+Scan bundle service - all scan responses of a site in one download (offline devices)
+"""
+import json
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models.bag import Bag
+from services.qr_service import QRService
+from services.site_service import SiteService
+
+# Delta bundles resend bags changed up to this long before the client's
+# version: timestamps have second resolution on some backends and a change
+# committed just after a bundle was built may carry an earlier timestamp
+SYNC_OVERLAP_SECONDS = 5
+
+
+class ScanBundleService:
+    """Builds per-site scan bundles with updated_at based delta sync"""
+
+    # Last change of a bag or one of its items (item writes bump Bag.scan_version,
+    # which refreshes Bag.updated_at)
+    changed_at = func.coalesce(Bag.updated_at, Bag.created_at)
+
+    @staticmethod
+    def parse_version(value: str) -> datetime:
+        """
+        Parse a bundle version (ISO 8601 timestamp) from a since= parameter.
+
+        Raises:
+            ValueError: if value is not a bundle version
+        """
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError("since must be a version returned by a previous bundle")
+
+    @staticmethod
+    def build_bundle(db: Session, site_id: int, since: Optional[datetime] = None) -> bytes:
+        """
+        Build the scan bundle of a site as a JSON body.
+
+        Each bag entry carries the exact GET /api/qr/<qr_token> body and ETag.
+        With since, only bags changed after that version are included, plus
+        those changed in the SYNC_OVERLAP_SECONDS before it (clients dedupe
+        by bag id); active_bag_ids always lists every active bag so clients
+        can prune deleted or deactivated ones.
+
+        Args:
+            db: Database session
+            site_id: ID of the site
+            since: version of the client's previous bundle, or None for a full bundle
+
+        Returns:
+            bytes: {"site_id", "version", "full", "active_bag_ids", "bags": [{qr_token, etag, scan}]}
+
+        Raises:
+            ValueError: if site not found
+        """
+        SiteService.get_site_by_id(db, site_id)
+
+        # Read the version first: changes committed while building land in the next delta
+        version = db.execute(
+            select(func.max(ScanBundleService.changed_at)).where(Bag.site_id == site_id)
+        ).scalar()
+        if isinstance(version, str):
+            version = datetime.fromisoformat(version)
+
+        active_bag_ids = db.execute(
+            select(Bag.id).where(Bag.site_id == site_id, Bag.active.is_(True)).order_by(Bag.id)
+        ).scalars().all()
+
+        criteria = [Bag.site_id == site_id]
+        if since is not None:
+            criteria.append(ScanBundleService.changed_at > since - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+        rows = db.execute(QRService.scan_rows_statement(*criteria))
+
+        # Splice the pre-serialized scan bodies instead of re-encoding them
+        bags = []
+        for _, bag_rows in groupby(rows, key=lambda row: row.id):
+            bag_rows = list(bag_rows)
+            entry = QRService.entry_from_rows(bag_rows)
+            bags.append(
+                b'{"qr_token":' + json.dumps(bag_rows[0].qr_token).encode('utf-8')
+                + b',"etag":' + json.dumps(entry.etag).encode('utf-8')
+                + b',"scan":' + entry.body + b'}'
+            )
+
+        header = json.dumps({
+            'site_id': site_id,
+            'version': version.isoformat() if version else (since.isoformat() if since else None),
+            'full': since is None,
+            'active_bag_ids': active_bag_ids
+        }, separators=(',', ':')).encode('utf-8')
+        return header[:-1] + b',"bags":[' + b','.join(bags) + b']}'
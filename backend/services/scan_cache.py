@@ -0,0 +1,121 @@
+"""
+Scan cache - in-process LRU cache of finished QR scan payloads
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Max age of cached entries; bounds staleness of writes that bypass the services
+QR_SCAN_CACHE_TTL_SECONDS = float(os.getenv('QR_SCAN_CACHE_TTL_SECONDS', '5'))
+
+
+class ScanCache:
+    """
+    Bounded, thread-safe LRU cache of scan payloads keyed by qr_token.
+
+    A secondary bag_id -> qr_token index lets admin mutations (which only
+    know the bag id) invalidate the right entry without a database lookup.
+
+    Invalidation only reaches the process that made the change, so with a
+    ttl (seconds) entries older than that are treated as misses: other
+    worker processes serve a changed bag for at most ttl seconds.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._token_by_bag_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so loads racing a write are not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, qr_token: str) -> Optional[Any]:
+        """
+        Return cached payload for qr_token and mark it most recently used.
+
+        Returns:
+            cached payload, or None on miss (or if the entry outlived the ttl)
+        """
+        with self._lock:
+            entry = self._entries.get(qr_token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.monotonic() - entry[2] >= self.ttl:
+                del self._entries[qr_token]
+                if self._token_by_bag_id.get(entry[0]) == qr_token:
+                    del self._token_by_bag_id[entry[0]]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(qr_token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, qr_token: str, bag_id: int, payload: Any, generation: Optional[int] = None) -> None:
+        """
+        Store payload for qr_token, evicting the least recently used entry if full.
+
+        Args:
+            qr_token: cache key
+            bag_id: bag the payload belongs to (used for invalidation)
+            payload: finished scan payload
+            generation: value of `generation` read before the payload was loaded;
+                the put is skipped if an invalidation happened in between
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if qr_token in self._entries:
+                self._entries.move_to_end(qr_token)
+            self._entries[qr_token] = (bag_id, payload, time.monotonic())
+            self._token_by_bag_id[bag_id] = qr_token
+            while len(self._entries) > self.max_size:
+                _, (evicted_bag_id, _, _) = self._entries.popitem(last=False)
+                self._token_by_bag_id.pop(evicted_bag_id, None)
+                self.evictions += 1
+
+    def invalidate_bag(self, bag_id: int) -> None:
+        """Drop the cached payload of a bag (no-op if not cached)"""
+        with self._lock:
+            self.generation += 1
+            qr_token = self._token_by_bag_id.pop(bag_id, None)
+            if qr_token is not None:
+                self._entries.pop(qr_token, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._token_by_bag_id.clear()
+            self.generation += 1
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss/eviction/expiration counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+# Process-wide cache shared by QRService and the admin mutation services
+scan_cache = ScanCache(max_size=int(os.getenv('QR_SCAN_CACHE_SIZE', '1024')),
+                       ttl=QR_SCAN_CACHE_TTL_SECONDS)
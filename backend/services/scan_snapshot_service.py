@@ -0,0 +1,73 @@
+"""
+Scan snapshot service - maintains the pre-serialized QR scan responses
+"""
+from itertools import groupby
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from models.bag import Bag
+from models.bag_scan_snapshot import BagScanSnapshot
+from services.qr_service import QRService
+
+
+class ScanSnapshotService:
+    """Rebuilds bag_scan_snapshots rows inside the caller's transaction"""
+
+    @staticmethod
+    def rebuild(db: Session, bag_id: int) -> None:
+        """
+        Rebuild the scan snapshot of one bag (does not commit).
+        
+        Flushes pending changes first so the snapshot reflects them. Inactive
+        or missing bags end up without a snapshot.
+        
+        Args:
+            db: Database session
+            bag_id: ID of the bag
+        """
+        db.flush()
+        ScanSnapshotService.delete(db, bag_id)
+        
+        rows = db.execute(QRService.scan_rows_statement(Bag.id == bag_id)).all()
+        if not rows:
+            return
+        
+        token = db.execute(select(Bag.qr_token).where(Bag.id == bag_id)).scalar_one()
+        entry = QRService.entry_from_rows(rows)
+        db.add(BagScanSnapshot(
+            qr_token=token,
+            bag_id=bag_id,
+            etag=entry.etag,
+            payload=entry.body.decode('utf-8')
+        ))
+        db.flush()
+
+    @staticmethod
+    def delete(db: Session, bag_id: int) -> None:
+        """Delete the scan snapshot of a bag (does not commit)"""
+        db.execute(delete(BagScanSnapshot).where(BagScanSnapshot.bag_id == bag_id))
+
+    @staticmethod
+    def rebuild_all(db: Session) -> int:
+        """
+        Rebuild the snapshots of every bag and commit.
+        
+        Returns:
+            int: number of snapshots written (active bags)
+        """
+        db.execute(delete(BagScanSnapshot))
+        tokens = dict(db.execute(select(Bag.id, Bag.qr_token)).all())
+        
+        count = 0
+        rows = db.execute(QRService.scan_rows_statement())
+        for bag_id, bag_rows in groupby(rows, key=lambda row: row.id):
+            entry = QRService.entry_from_rows(list(bag_rows))
+            db.add(BagScanSnapshot(
+                qr_token=tokens[bag_id],
+                bag_id=bag_id,
+                etag=entry.etag,
+                payload=entry.body.decode('utf-8')
+            ))
+            count += 1
+        
+        db.commit()
+        return count
@@ -0,0 +1,184 @@
+"""
+Scan warm-up - pre-populates the QR scan layers after a deploy
+
+- warm_scan_cache: in-process, run by each worker at app start; rebuilds the
+  token filter and fills the scan cache with active bags
+- warm_scan_snapshots: out-of-process (warm_scan_cache.py CLI); writes the
+  bag_scan_snapshots rows that are missing, so cache misses in every worker
+  are single primary-key reads
+
+Both walk active bags in id-ordered chunks, stream each chunk's rows with
+yield_per, log progress per chunk and stop at their time budget, so warm-up
+never blocks readiness indefinitely.
+"""
+import logging
+import os
+import threading
+import time
+from itertools import groupby
+from typing import Dict, Iterator, List, Tuple
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.bag import Bag
+from models.bag_scan_snapshot import BagScanSnapshot
+from services.qr_service import QRService, ScanEntry
+from services.scan_cache import scan_cache
+from services.token_filter import token_filter
+
+logger = logging.getLogger(__name__)
+
+# Warm the scan cache in a background thread when the app starts
+WARMUP_ON_START = os.getenv('QR_SCAN_WARMUP_ON_START', 'false').lower() == 'true'
+WARMUP_TIME_BUDGET_SECONDS = float(os.getenv('QR_SCAN_WARMUP_BUDGET_SECONDS', '30'))
+WARMUP_CHUNK_SIZE = int(os.getenv('QR_SCAN_WARMUP_CHUNK_SIZE', '500'))
+
+
+def iter_scan_chunks(db: Session, chunk_size: int, *criteria) -> Iterator[List[Tuple[str, ScanEntry]]]:
+    """
+    Yield the (qr_token, ScanEntry) pairs of active bags, chunk_size bags at a time.
+
+    Chunks are keyset-paginated on Bag.id and each chunk's item rows are
+    streamed with yield_per, so memory stays bounded however many bags exist.
+    Every chunk is a separate statement: callers may commit between chunks.
+
+    Args:
+        db: Database session
+        chunk_size: bags per chunk
+        criteria: extra WHERE clauses on Bag
+    """
+    last_id = 0
+    while True:
+        bag_ids = db.execute(
+            select(Bag.id)
+            .where(Bag.active.is_(True), Bag.id > last_id, *criteria)
+            .order_by(Bag.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not bag_ids:
+            return
+
+        rows = db.execute(
+            QRService.scan_rows_statement(Bag.id.in_(bag_ids))
+            .execution_options(yield_per=chunk_size)
+        )
+        chunk = []
+        for _, bag_rows in groupby(rows, key=lambda row: row.id):
+            bag_rows = list(bag_rows)
+            chunk.append((bag_rows[0].qr_token, QRService.entry_from_rows(bag_rows)))
+        yield chunk
+        last_id = bag_ids[-1]
+
+
+def warm_scan_cache(db: Session, time_budget_seconds: float = WARMUP_TIME_BUDGET_SECONDS,
+                    chunk_size: int = WARMUP_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Rebuild the token filter and fill the in-process scan cache.
+
+    Stops early at the time budget or when the cache is full (further puts
+    would only evict earlier entries). A chunk loaded while an admin write
+    invalidated the cache is skipped; those bags load on demand.
+
+    Args:
+        db: Database session
+        time_budget_seconds: wall-clock limit
+        chunk_size: bags per chunk
+
+    Returns:
+        dict: 'cached' bag count and 'completed' (1 if every active bag was visited)
+    """
+    deadline = time.monotonic() + time_budget_seconds
+    token_filter.rebuild(db)
+
+    cached = 0
+    capacity = scan_cache.max_size
+    chunks = iter_scan_chunks(db, chunk_size)
+    while True:
+        if time.monotonic() > deadline:
+            logger.warning("Scan cache warm-up stopped at time budget: %d bag(s) cached", cached)
+            return {'cached': cached, 'completed': 0}
+
+        # Read before the chunk is loaded: puts are skipped if a write lands meanwhile
+        generation = scan_cache.generation
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        if cached >= capacity:
+            logger.info("Scan cache warm-up stopped: cache full at %d bag(s)", cached)
+            return {'cached': cached, 'completed': 0}
+        if scan_cache.generation != generation:
+            logger.info("Scan cache warm-up: chunk skipped (cache invalidated while loading)")
+            continue
+
+        chunk = chunk[:capacity - cached]
+        for qr_token, entry in chunk:
+            scan_cache.put(qr_token, entry.bag_id, entry, generation=generation)
+        cached += len(chunk)
+        logger.info("Scan cache warm-up: %d bag(s) cached", cached)
+
+    logger.info("Scan cache warm-up complete: %d bag(s) cached", cached)
+    return {'cached': cached, 'completed': 1}
+
+
+def warm_scan_snapshots(db: Session, time_budget_seconds: float = 300.0,
+                        chunk_size: int = WARMUP_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Write the scan snapshots of active bags that have none, committing per chunk.
+
+    Existing snapshots are left alone: admin writes keep them current. A
+    chunk that races a concurrent snapshot write is rolled back and skipped.
+
+    Args:
+        db: Database session
+        time_budget_seconds: wall-clock limit
+        chunk_size: bags per chunk
+
+    Returns:
+        dict: 'written' snapshot count and 'completed' (1 if every active bag was visited)
+    """
+    deadline = time.monotonic() + time_budget_seconds
+    missing = ~exists().where(BagScanSnapshot.bag_id == Bag.id)
+
+    written = 0
+    for chunk in iter_scan_chunks(db, chunk_size, missing):
+        db.add_all([
+            BagScanSnapshot(
+                qr_token=qr_token,
+                bag_id=entry.bag_id,
+                etag=entry.etag,
+                payload=entry.body.decode('utf-8')
+            )
+            for qr_token, entry in chunk
+        ])
+        try:
+            db.commit()
+            written += len(chunk)
+        except IntegrityError:
+            db.rollback()
+            logger.warning("Scan snapshot warm-up: chunk skipped (concurrent snapshot write)")
+        logger.info("Scan snapshot warm-up: %d snapshot(s) written", written)
+
+        if time.monotonic() > deadline:
+            logger.warning("Scan snapshot warm-up stopped at time budget: %d snapshot(s) written", written)
+            return {'written': written, 'completed': 0}
+
+    logger.info("Scan snapshot warm-up complete: %d snapshot(s) written", written)
+    return {'written': written, 'completed': 1}
+
+
+def start_background_warmup(time_budget_seconds: float = WARMUP_TIME_BUDGET_SECONDS,
+                            chunk_size: int = WARMUP_CHUNK_SIZE) -> threading.Thread:
+    """Run warm_scan_cache in a daemon thread so app start is never delayed"""
+    def run():
+        db = SessionLocal()
+        try:
+            warm_scan_cache(db, time_budget_seconds, chunk_size)
+        except Exception:
+            logger.exception("Scan cache warm-up failed")
+        finally:
+            db.close()
+
+    thread = threading.Thread(target=run, name='scan-cache-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -2,9 +2,11 @@
 Site service - Business logic for site management
 """
 import json
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from models.site import Site
+from services.recipient_cache import recipient_cache
 
 
 class SiteService:
@@ -44,6 +46,14 @@ class SiteService:
         """Convert JSON string from database to list"""
         return json.loads(recipients_json)
 
+    @staticmethod
+    def get_alert_recipients(site_id: int, updated_at: Optional[datetime], recipients_json: str) -> List[str]:
+        """
+        Parsed alert recipients of a site, from the recipient cache when the
+        site is unchanged (the returned list is shared; do not modify it).
+        """
+        return recipient_cache.get(site_id, updated_at, recipients_json)
+
     @staticmethod
     def create_site(db: Session, name: str, alert_recipients: List[str]) -> Site:
         """Create a new site"""
@@ -96,6 +106,7 @@ class SiteService:
             site.alert_recipients = SiteService.serialize_alert_recipients(validated_recipients)
         
         db.commit()
+        recipient_cache.invalidate_site(site_id)
         db.refresh(site)
         
         return site
@@ -107,6 +118,7 @@ class SiteService:
         
         db.delete(site)
         db.commit()
+        recipient_cache.invalidate_site(site_id)
 
     @staticmethod
     def site_to_dict(site: Site) -> Dict[str, Any]:
@@ -114,7 +126,7 @@ class SiteService:
         return {
             "id": site.id,
             "name": site.name,
-            "alert_recipients": SiteService.deserialize_alert_recipients(site.alert_recipients),
+            "alert_recipients": SiteService.get_alert_recipients(site.id, site.updated_at, site.alert_recipients),
             "created_at": site.created_at.isoformat() if site.created_at else None,
             "updated_at": site.updated_at.isoformat() if site.updated_at else None
         }
@@ -0,0 +1,221 @@
+"""
+Token filter - rejects unknown QR tokens without touching the database
+
+Two layers in front of the QR lookup query:
+- a Bloom filter over every issued Bag.qr_token (no false negatives, ~1%
+  false positives), built lazily from the database and kept fresh by
+  BagService.create_bag plus a periodic incremental refresh for bags created
+  by other worker processes
+- a short-TTL negative cache of tokens that passed the Bloom filter but were
+  not found (false positives, inactive bags, deleted bags)
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models.bag import Bag
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing of one blake2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.bit_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.bit_count + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, value: str) -> None:
+        """Add value to the filter"""
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class NegativeCache:
+    """Bounded TTL set of tokens recently confirmed as not found"""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._expires_at: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, token: str) -> bool:
+        with self._lock:
+            expires_at = self._expires_at.get(token)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._expires_at[token]
+                return False
+            return True
+
+    def add(self, token: str) -> None:
+        """Remember token as not found for ttl_seconds"""
+        with self._lock:
+            self._expires_at.pop(token, None)
+            self._expires_at[token] = time.monotonic() + self.ttl_seconds
+            # Insertion order == expiry order, so the oldest entry goes first
+            while len(self._expires_at) > self.max_size:
+                self._expires_at.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        """Forget token (e.g. its bag was reactivated)"""
+        with self._lock:
+            self._expires_at.pop(token, None)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._expires_at.clear()
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
+
+
+class QRTokenFilter:
+    """
+    Membership test for issued QR tokens, backed by the bags table.
+
+    A full rebuild loads every qr_token; refreshes in between only load bags
+    created since the newest created_at seen, so tokens issued by other
+    worker processes become scannable within refresh_seconds.
+    """
+
+    def __init__(self, refresh_seconds: float = 10.0, rebuild_seconds: float = 3600.0,
+                 negative_ttl_seconds: float = 30.0, error_rate: float = 0.01):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.error_rate = error_rate
+        self.negative_cache = NegativeCache(ttl_seconds=negative_ttl_seconds)
+        self._bloom: Optional[BloomFilter] = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+        self.filter_rejections = 0
+        self.negative_hits = 0
+
+    def might_exist(self, db: Session, qr_token: str) -> bool:
+        """
+        Return False if qr_token is certainly unknown (or recently not found).
+        Builds or refreshes the filter from the database when it is stale.
+        """
+        if qr_token in self.negative_cache:
+            self.negative_hits += 1
+            return False
+
+        self._ensure_fresh(db)
+        if qr_token not in self._bloom:
+            self.filter_rejections += 1
+            return False
+        return True
+
+    def add(self, qr_token: str) -> None:
+        """Register a newly issued token (no-op until the filter is built)"""
+        self.negative_cache.discard(qr_token)
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(qr_token)
+
+    def record_not_found(self, qr_token: str) -> None:
+        """Cache a database miss for qr_token for the negative TTL"""
+        self.negative_cache.add(qr_token)
+
+    def forget_not_found(self, qr_token: str) -> None:
+        """Drop a cached miss (bag reactivated in this process)"""
+        self.negative_cache.discard(qr_token)
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the Bloom filter from all issued tokens"""
+        with self._lock:
+            self._rebuild(db)
+
+    def reset(self) -> None:
+        """Drop filter state; the next lookup rebuilds from the database"""
+        with self._lock:
+            self._bloom = None
+            self._watermark = None
+            self._refreshed_at = 0.0
+            self._rebuilt_at = 0.0
+            self.negative_cache.clear()
+            self.filter_rejections = 0
+            self.negative_hits = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return filter size and rejection counters"""
+        bloom = self._bloom
+        return {
+            'tokens': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else 0,
+            'negative_cache_size': len(self.negative_cache),
+            'filter_rejections': self.filter_rejections,
+            'negative_hits': self.negative_hits
+        }
+
+    def _ensure_fresh(self, db: Session) -> None:
+        now = time.monotonic()
+        bloom = self._bloom
+        if bloom is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        with self._lock:
+            bloom = self._bloom
+            if (bloom is None or bloom.count > bloom.capacity
+                    or now - self._rebuilt_at >= self.rebuild_seconds):
+                self._rebuild(db)
+            elif now - self._refreshed_at >= self.refresh_seconds:
+                self._refresh(db)
+
+    def _rebuild(self, db: Session) -> None:
+        token_count = db.execute(select(func.count(Bag.id))).scalar_one()
+        bloom = BloomFilter(capacity=max(1024, token_count * 2), error_rate=self.error_rate)
+        watermark = None
+        for qr_token, created_at in db.execute(select(Bag.qr_token, Bag.created_at)):
+            bloom.add(qr_token)
+            if watermark is None or created_at > watermark:
+                watermark = created_at
+        self._bloom = bloom
+        self._watermark = watermark
+        self._rebuilt_at = self._refreshed_at = time.monotonic()
+
+    def _refresh(self, db: Session) -> None:
+        stmt = select(Bag.qr_token, Bag.created_at)
+        if self._watermark is not None:
+            # Overlap by a second: created_at has second resolution on some
+            # backends; re-adding a known token is harmless
+            stmt = stmt.where(Bag.created_at >= self._watermark - timedelta(seconds=1))
+        for qr_token, created_at in db.execute(stmt):
+            self._bloom.add(qr_token)
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+        self._refreshed_at = time.monotonic()
+
+
+# Process-wide filter shared by QRService and BagService
+token_filter = QRTokenFilter(
+    refresh_seconds=float(os.getenv('QR_TOKEN_FILTER_REFRESH_SECONDS', '10')),
+    rebuild_seconds=float(os.getenv('QR_TOKEN_FILTER_REBUILD_SECONDS', '3600')),
+    negative_ttl_seconds=float(os.getenv('QR_NEGATIVE_CACHE_TTL_SECONDS', '30'))
+)
@@ -0,0 +1,99 @@
+"""
+SMTPSink - minimal local SMTP server for tests and benchmarks
+
+Accepts every message and records it; counts connections. Options simulate
+a server that drops connections after some messages and network latency
+per reply.
+"""
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Optional
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        if self.server.sink.latency:
+            time.sleep(self.server.sink.latency)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        received = 0
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command.startswith(('HELO', 'MAIL', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command.startswith('RCPT'):
+                self.reply('550 mailbox unavailable' if 'REJECT' in command else '250 OK')
+            elif command == 'DATA':
+                self.reply('354 end data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                with sink.lock:
+                    sink.messages.append(message_from_bytes(b''.join(data)))
+                self.reply('250 OK queued')
+                received += 1
+                if sink.drop_after and received >= sink.drop_after:
+                    return
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 command not implemented')
+
+
+class SMTPSink:
+    """
+    Threaded SMTP server on 127.0.0.1 (random port by default).
+
+    Args:
+        drop_after: close each connection after this many messages (server
+            idle/limit disconnects)
+        latency: seconds slept before each reply (simulated round trip)
+    """
+
+    def __init__(self, port: int = 0, drop_after: Optional[int] = None, latency: float = 0.0):
+        self.drop_after = drop_after
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.messages: List[Message] = []
+        self.connections = 0
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', port), _SMTPHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'SMTPSink':
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'SMTPSink':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,224 @@
+"""
+Tests for alert deduplication (fingerprints, clearing, TTL, shared table, LRU)
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, AlertJob, AlertJobStatus, AlertFingerprint
+from services import alert_job_service
+from services.alert_dedup_service import AlertDedupStore
+from services.alert_worker import AlertWorker
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000002401'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Create test database session with alerts enabled and empty caches and rate limits"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', True)
+    monkeypatch.setattr(alert_job_service, 'ALERT_DIGEST_WINDOW_SECONDS', 0)
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+
+    yield db
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bag(db_session):
+    """Bag with a counted item and a battery item"""
+    site = Site(name='North Station', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Trauma Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    items = [BagItem(bag_id=bag.id, name='Bandages', expected_qty=10),
+             BagItem(bag_id=bag.id, name='Flashlight', test_batteries=True)]
+    db_session.add_all(items)
+    db_session.commit()
+    bag.item_ids = [item.id for item in items]
+    return bag
+
+
+class Sender:
+    def __init__(self, fail=False):
+        self.alerts = []
+        self.fail = fail
+
+    def __call__(self, alert):
+        if self.fail:
+            raise ConnectionError('smtp down')
+        self.alerts.append(alert)
+
+    def statuses(self, index=-1):
+        return [problem['status'] for problem in self.alerts[index]['problems']]
+
+
+def submit(client, bag, statuses):
+    results = [{'bag_item_id': item_id, 'status': status} for item_id, status in zip(bag.item_ids, statuses)]
+    return client.post(f'/api/inventory/{TOKEN}', json={'results': results}).get_json()['session_id']
+
+
+def test_repeated_problem_is_suppressed(client, db_session, bag):
+    """The same problem in the next check sends no mail; the job still completes"""
+    sender = Sender()
+    worker = AlertWorker(send_alert=sender)
+    submit(client, bag, ['missing', 'present'])
+    worker.run_once()
+    second = submit(client, bag, ['missing', 'present'])
+
+    worker.run_once()
+
+    assert len(sender.alerts) == 1
+    job = db_session.query(AlertJob).filter(AlertJob.session_id == second).one()
+    assert (job.status, job.problem_count) == (AlertJobStatus.DONE, 1)
+    assert worker.stats()['suppressed'] == 1
+
+
+def test_only_new_problems_are_sent(client, db_session, bag):
+    """An alert mixing old and new problems lists only the new ones"""
+    sender = Sender()
+    worker = AlertWorker(send_alert=sender)
+    submit(client, bag, ['missing', 'present'])
+    worker.run_once()
+    submit(client, bag, ['missing', 'battery_low'])
+
+    worker.run_once()
+
+    assert sender.statuses() == ['battery_low']
+    assert sender.alerts[-1]['problem_count'] == 1
+
+
+def test_status_change_is_alerted(client, db_session, bag):
+    """missing -> not_enough is a new problem and replaces the old fingerprint"""
+    sender = Sender()
+    worker = AlertWorker(send_alert=sender)
+    for status in ['missing', 'not_enough', 'missing']:
+        submit(client, bag, [status, 'present'])
+        worker.run_once()
+
+    assert [sender.statuses(index) for index in range(3)] == [['missing'], ['not_enough'], ['missing']]
+    assert db_session.query(AlertFingerprint.status).all() == [('missing',)]
+
+
+def test_present_item_clears_fingerprint(client, db_session, bag):
+    """After the item was found present, the problem is alerted again"""
+    sender = Sender()
+    worker = AlertWorker(send_alert=sender)
+    submit(client, bag, ['missing', 'present'])
+    worker.run_once()
+    submit(client, bag, ['present', 'present'])
+    worker.run_once()
+    assert db_session.query(AlertFingerprint).count() == 0
+    submit(client, bag, ['missing', 'present'])
+
+    worker.run_once()
+
+    assert len(sender.alerts) == 2
+
+
+def test_batch_is_replayed_in_session_order(client, db_session, bag):
+    """missing, present, missing claimed together alerts twice and keeps one fingerprint"""
+    sender = Sender()
+    first = submit(client, bag, ['missing', 'present'])
+    submit(client, bag, ['missing', 'present'])
+    submit(client, bag, ['present', 'present'])
+    last = submit(client, bag, ['missing', 'present'])
+
+    AlertWorker(send_alert=sender, send_concurrency=1).run_once()
+
+    assert sorted(alert['session_id'] for alert in sender.alerts) == [first, last]
+    assert db_session.query(AlertFingerprint).count() == 1
+
+
+def test_expired_fingerprint_alerts_again(client, db_session, bag):
+    """After the TTL the problem is reported again (reminder)"""
+    sender = Sender()
+    worker = AlertWorker(send_alert=sender)
+    submit(client, bag, ['missing', 'present'])
+    worker.run_once()
+    db_session.query(AlertFingerprint).update({'expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db_session.commit()
+    worker.dedup.cache_seconds = 0
+    submit(client, bag, ['missing', 'present'])
+
+    worker.run_once()
+
+    assert len(sender.alerts) == 2
+
+
+def test_fingerprints_shared_between_workers(client, db_session, bag):
+    """A worker suppresses problems another worker already alerted"""
+    first_sender, second_sender = Sender(), Sender()
+    submit(client, bag, ['missing', 'present'])
+    AlertWorker(send_alert=first_sender).run_once()
+    submit(client, bag, ['missing', 'present'])
+
+    second = AlertWorker(send_alert=second_sender)
+    second.run_once()
+
+    assert (len(first_sender.alerts), len(second_sender.alerts)) == (1, 0)
+    assert second.dedup.stats()['cache_hits'] == 0
+
+
+def test_repeats_answered_from_cache(client, db_session, bag):
+    """Fingerprints a worker recorded are checked without a table lookup"""
+    worker = AlertWorker(send_alert=Sender())
+    submit(client, bag, ['missing', 'present'])
+    worker.run_once()
+    submit(client, bag, ['missing', 'present'])
+
+    worker.run_once()
+
+    assert worker.dedup.stats() == {'cached': 1, 'lookups': 2, 'cache_hits': 1}
+
+
+def test_failed_send_records_no_fingerprint(client, db_session, bag):
+    """A problem whose alert could not be sent is not suppressed later"""
+    submit(client, bag, ['missing', 'present'])
+
+    AlertWorker(send_alert=Sender(fail=True)).run_once()
+
+    assert db_session.query(AlertFingerprint).count() == 0
+
+
+def test_fingerprint_stored_meanwhile_is_refreshed(db_session, bag):
+    """A fingerprint another worker inserted after the purge gets the new expiry, not a key conflict"""
+    now = datetime.now(timezone.utc)
+    row = {'bag_id': bag.id, 'bag_item_id': bag.item_ids[0], 'status': 'missing'}
+    db_session.add(AlertFingerprint(**row, expires_at=now + timedelta(seconds=60)))
+    db_session.commit()
+
+    AlertDedupStore._upsert(db_session, [dict(row, expires_at=now + timedelta(hours=1))])
+    db_session.commit()
+
+    [stored] = db_session.query(AlertFingerprint).all()
+    assert stored.expires_at.replace(tzinfo=timezone.utc) > now + timedelta(minutes=59)
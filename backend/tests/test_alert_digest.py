@@ -0,0 +1,189 @@
+"""
+Tests for per-site alert digests (digest window, site claims, digest emails)
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, AlertJob, AlertJobStatus
+from services import alert_job_service
+from services.alert_job_service import AlertJobService
+from services.alert_mailer import AlertMailer, SMTPConnectionPool
+from services.alert_worker import AlertWorker
+from services.qr_service import QRService
+from tests.smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Create test database session with alerts enabled and empty caches and rate limits"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', True)
+    monkeypatch.setattr(alert_job_service, 'ALERT_DIGEST_WINDOW_SECONDS', 60)
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+
+    yield db
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def sink():
+    """Local SMTP server"""
+    with SMTPSink() as server:
+        yield server
+
+
+@pytest.fixture
+def bags(db_session):
+    """Two bags at North Station and one at South Station, one item each"""
+    north = Site(name='North Station', alert_recipients='["north@example.com"]')
+    south = Site(name='South Station', alert_recipients='["south@example.com"]')
+    db_session.add_all([north, south])
+    db_session.flush()
+    bags = [
+        Bag(site_id=north.id, name='Trauma Kit', qr_token='00000000-0000-4000-8000-000000002301', active=True),
+        Bag(site_id=north.id, name='Burn Kit', qr_token='00000000-0000-4000-8000-000000002302', active=True),
+        Bag(site_id=south.id, name='Trauma Kit', qr_token='00000000-0000-4000-8000-000000002303', active=True)
+    ]
+    db_session.add_all(bags)
+    db_session.flush()
+    for bag in bags:
+        item = BagItem(bag_id=bag.id, name='Bandages')
+        db_session.add(item)
+        db_session.flush()
+        bag.item_id = item.id
+    db_session.commit()
+    return bags
+
+
+def submit(client, bag, status='missing'):
+    response = client.post(f'/api/inventory/{bag.qr_token}',
+                           json={'nickname': 'Sam', 'results': [{'bag_item_id': bag.item_id, 'status': status}]})
+    return response.get_json()['session_id']
+
+
+def make_due(db_session, session_id):
+    db_session.query(AlertJob).filter(AlertJob.session_id == session_id).update(
+        {'run_after': datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db_session.commit()
+
+
+def make_mailer(sink):
+    return AlertMailer(SMTPConnectionPool('127.0.0.1', sink.port, starttls=False, size=2))
+
+
+def test_jobs_wait_for_digest_window(client, db_session, bags):
+    """New jobs record their site and are not due before the window ends"""
+    session_id = submit(client, bags[0])
+
+    [job] = db_session.query(AlertJob).all()
+    assert (job.session_id, job.site_id) == (session_id, bags[0].site_id)
+    assert job.run_after.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(seconds=50)
+    assert AlertJobService.claim(db_session, 10, lease_seconds=60)[1] == []
+
+
+def test_due_job_claims_pending_jobs_of_its_site(client, db_session, bags):
+    """Claiming a due job also claims the other pending jobs of its site only"""
+    first = submit(client, bags[0])
+    second = submit(client, bags[1])
+    submit(client, bags[2])
+    make_due(db_session, first)
+
+    _, claimed = AlertJobService.claim(db_session, 10, lease_seconds=60)
+
+    assert sorted(job.session_id for job in claimed) == [first, second]
+    assert {job.site_id for job in claimed} == {bags[0].site_id}
+
+
+def test_site_alerts_sent_as_one_digest(client, db_session, bags, sink):
+    """Several problem checks of a site within the window become one email per site"""
+    north = [submit(client, bags[0]), submit(client, bags[1]), submit(client, bags[0])]
+    south = submit(client, bags[2])
+    make_due(db_session, north[0])
+    make_due(db_session, south)
+    mailer = make_mailer(sink)
+    worker = AlertWorker(send_alert=mailer.send_alert, send_digest=mailer.send_digest, dedup=False)
+
+    assert worker.run_once() == 4
+
+    messages = {msg['To']: msg for msg in sink.messages}
+    assert len(sink.messages) == 2
+    digest = messages['north@example.com']
+    assert digest['Subject'] == '[Inventory] 3 problem(s) in 3 checks: North Station'
+    body = digest.get_payload()
+    assert body.count('Bag: Trauma Kit') == 2
+    assert body.count('Bag: Burn Kit') == 1
+    assert messages['south@example.com']['Subject'] == '[Inventory] 1 problem(s): South Station / Trauma Kit'
+    assert worker.stats()['alerts_sent'] == 4
+    assert worker.stats()['digests_sent'] == 1
+    assert db_session.query(AlertJob).filter(AlertJob.status == AlertJobStatus.DONE).count() == 4
+
+
+def test_without_digest_sender_alerts_sent_separately(client, db_session, bags):
+    """Workers without send_digest send one alert per session"""
+    first = submit(client, bags[0])
+    submit(client, bags[1])
+    make_due(db_session, first)
+    sent = []
+
+    AlertWorker(send_alert=sent.append, send_concurrency=1).run_once()
+
+    assert len(sent) == 2
+
+
+def test_failed_digest_retries_all_its_jobs(client, db_session, bags):
+    """A digest that could not be sent puts every job of it into backoff"""
+    first = submit(client, bags[0])
+    submit(client, bags[1])
+    make_due(db_session, first)
+
+    def fail(alerts):
+        raise ConnectionError('smtp down')
+
+    worker = AlertWorker(send_alert=lambda alert: None, send_digest=fail)
+    worker.run_once()
+
+    db_session.expire_all()
+    jobs = db_session.query(AlertJob).filter(AlertJob.site_id == bags[0].site_id).all()
+    assert [job.attempts for job in jobs] == [1, 1]
+    assert all(job.status is AlertJobStatus.PENDING and job.lease_token is None for job in jobs)
+    assert worker.stats()['retried'] == 2
+
+
+def test_jobs_in_backoff_are_not_pulled_into_digest(client, db_session, bags):
+    """Only first-attempt jobs of the site join a due job's claim"""
+    retrying = submit(client, bags[0])
+    db_session.query(AlertJob).filter(AlertJob.session_id == retrying).update({'attempts': 1})
+    db_session.commit()
+    due = submit(client, bags[1])
+    make_due(db_session, due)
+
+    _, claimed = AlertJobService.claim(db_session, 10, lease_seconds=60)
+
+    assert [job.session_id for job in claimed] == [due]
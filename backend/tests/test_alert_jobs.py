@@ -0,0 +1,299 @@
+"""
+Tests for the alert job queue, problem analysis and alert workers
+"""
+import pytest
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Admin, Site, Bag, BagItem, InventorySession, AlertJob, AlertJobStatus
+from services import alert_job_service
+from services.alert_analysis_service import AlertAnalysisService
+from services.alert_job_service import AlertJobService
+from services.alert_worker import AlertWorker
+from services.auth_service import AuthService
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000001301'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Create test database session with alerts enabled and empty caches and rate limits"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', True)
+    monkeypatch.setattr(alert_job_service, 'ALERT_DIGEST_WINDOW_SECONDS', 0)
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bag(db_session):
+    """Active bag: counted item, battery item, item expiring in 10 days, item expiring in 60 days"""
+    site = Site(name='North Station', alert_recipients='["admin@example.com", "safety@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Trauma Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    today = date.today()
+    items = [
+        BagItem(bag_id=bag.id, name='Bandages', expected_qty=10),
+        BagItem(bag_id=bag.id, name='Flashlight', test_batteries=True),
+        BagItem(bag_id=bag.id, name='Saline', track_expiry=True, expiry_date=today + timedelta(days=10)),
+        BagItem(bag_id=bag.id, name='Burn gel', track_expiry=True, expiry_date=today + timedelta(days=60))
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    bag.item_ids = [item.id for item in items]
+    return bag
+
+
+def submit(client, bag, statuses, **kwargs):
+    results = [{'bag_item_id': item_id, 'status': status} for item_id, status in zip(bag.item_ids, statuses)]
+    return client.post(f'/api/inventory/{TOKEN}', json={'nickname': 'Sam', 'results': results}, **kwargs)
+
+
+def jobs(db_session):
+    db_session.expire_all()
+    return db_session.query(AlertJob).order_by(AlertJob.id).all()
+
+
+class RecordingSender:
+    def __init__(self, failures=0):
+        self.alerts = []
+        self.failures = failures
+    
+    def __call__(self, alert):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('smtp down')
+        self.alerts.append(alert)
+
+
+def test_submission_queues_one_job(client, db_session, bag):
+    """A stored session queues its analysis; an idempotent replay does not"""
+    first = submit(client, bag, ['present'] * 4, headers={'Idempotency-Key': 'k1'})
+    submit(client, bag, ['present'] * 4, headers={'Idempotency-Key': 'k1'})
+    
+    assert 'enqueue_analysis;dur=' in first.headers['Server-Timing']
+    [job] = jobs(db_session)
+    assert job.status is AlertJobStatus.PENDING
+    assert job.attempts == 0
+
+
+def test_no_jobs_when_alerts_disabled(client, db_session, bag, monkeypatch):
+    """Without ALERTS_ENABLED nothing is queued"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', False)
+    
+    assert submit(client, bag, ['missing'] * 4).status_code == 201
+    assert jobs(db_session) == []
+
+
+def test_upload_queues_job_on_finalize(client, db_session, bag):
+    """A chunked upload is analyzed once finalized, not when opened"""
+    upload = client.post(f'/api/inventory/{TOKEN}/uploads', json={}).get_json()
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    client.put(f'{base}/chunks/0', json={'results': [{'bag_item_id': bag.item_ids[0], 'status': 'missing'}]})
+    assert jobs(db_session) == []
+    
+    client.post(f'{base}/finalize', json={'total_chunks': 1})
+    client.post(f'{base}/finalize', json={'total_chunks': 1})
+    
+    assert [job.session_id for job in jobs(db_session)] == [upload['session_id']]
+
+
+def test_worker_sends_alert_for_problems(client, db_session, bag):
+    """Problems and items expiring within 30 days make one alert"""
+    session_id = submit(client, bag, ['not_enough', 'battery_low', 'present', 'present']).get_json()['session_id']
+    sender = RecordingSender()
+    
+    assert AlertWorker(send_alert=sender).run_once() == 1
+    
+    [alert] = sender.alerts
+    assert alert['session_id'] == session_id
+    assert alert['nickname'] == 'Sam'
+    assert alert['site'] == {'id': bag.site_id, 'name': 'North Station'}
+    assert alert['bag'] == {'id': bag.id, 'name': 'Trauma Kit'}
+    assert alert['recipients'] == ['admin@example.com', 'safety@example.com']
+    assert [(p['item_name'], p['status'], p['expected_qty']) for p in alert['problems']] == [
+        ('Bandages', 'not_enough', 10), ('Flashlight', 'battery_low', None)
+    ]
+    assert [item['item_name'] for item in alert['expiring']] == ['Saline']
+    [job] = jobs(db_session)
+    assert job.status is AlertJobStatus.DONE
+    assert job.problem_count == 3
+    assert job.lease_token is None
+
+
+def test_worker_sends_nothing_without_problems(client, db_session, bag):
+    """A clean check with nothing expiring soon completes without an alert"""
+    db_session.query(BagItem).filter(BagItem.track_expiry.is_(True)).update(
+        {'expiry_date': date.today() + timedelta(days=365)}
+    )
+    db_session.commit()
+    submit(client, bag, ['present'] * 4)
+    sender = RecordingSender()
+    
+    AlertWorker(send_alert=sender).run_once()
+    
+    assert sender.alerts == []
+    [job] = jobs(db_session)
+    assert job.status is AlertJobStatus.DONE
+    assert job.problem_count == 0
+
+
+def test_failed_send_is_retried_with_backoff(client, db_session, bag):
+    """A failed send releases the job until its backoff has passed"""
+    submit(client, bag, ['missing'] * 4)
+    sender = RecordingSender(failures=1)
+    worker = AlertWorker(send_alert=sender)
+    
+    worker.run_once()
+    
+    [job] = jobs(db_session)
+    assert job.status is AlertJobStatus.PENDING
+    assert job.attempts == 1
+    assert job.last_error == 'send failed: smtp down'
+    assert worker.run_once() == 0
+    
+    job.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+    assert worker.run_once() == 1
+    assert len(sender.alerts) == 1
+    assert jobs(db_session)[0].status is AlertJobStatus.DONE
+
+
+def test_job_fails_after_max_attempts(client, db_session, bag):
+    """The last allowed attempt marks the job failed"""
+    submit(client, bag, ['missing'] * 4)
+    worker = AlertWorker(send_alert=RecordingSender(failures=1), max_attempts=1)
+    
+    worker.run_once()
+    
+    [job] = jobs(db_session)
+    assert job.status is AlertJobStatus.FAILED
+    assert worker.stats()['failed'] == 1
+
+
+def test_lease_excludes_other_workers_until_expired(client, db_session, bag):
+    """Leased jobs are skipped; an expired lease is reclaimed and the old lease loses its update"""
+    submit(client, bag, ['missing'] * 4)
+    
+    first_token, [first] = AlertJobService.claim(db_session, 10, lease_seconds=60)
+    assert AlertJobService.claim(db_session, 10, lease_seconds=60)[1] == []
+    
+    db_session.query(AlertJob).update({'lease_expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db_session.commit()
+    second_token, [second] = AlertJobService.claim(db_session, 10, lease_seconds=60)
+    assert (second.id, second.attempts) == (first.id, 2)
+    
+    AlertJobService.complete(db_session, first_token, [(first.id, 1)])
+    db_session.commit()
+    assert jobs(db_session)[0].status is AlertJobStatus.PENDING
+
+
+def test_concurrent_claims_are_disjoint(tmp_path, monkeypatch):
+    """Workers claiming in parallel never get the same job"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', True)
+    monkeypatch.setattr(alert_job_service, 'ALERT_DIGEST_WINDOW_SECONDS', 0)
+    file_engine = create_engine(f'sqlite:///{tmp_path}/jobs.db', connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=file_engine)
+    factory = sessionmaker(bind=file_engine)
+    db = factory()
+    site = Site(name='Site', alert_recipients='["a@example.com"]')
+    db.add(site)
+    db.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db.add(bag)
+    db.flush()
+    sessions = [InventorySession(bag_id=bag.id) for _ in range(200)]
+    db.add_all(sessions)
+    db.flush()
+    AlertJobService.enqueue(db, [session.id for session in sessions])
+    db.commit()
+    db.close()
+    claimed = []
+    
+    def claim_all():
+        worker_db = factory()
+        try:
+            while True:
+                _, batch = AlertJobService.claim(worker_db, 7, lease_seconds=60)
+                if not batch:
+                    return
+                claimed.extend(job.id for job in batch)
+        finally:
+            worker_db.close()
+    
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    file_engine.dispose()
+    
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
+
+
+def test_analysis_uses_three_queries(client, db_session, bag):
+    """A batch of sessions is analyzed with a fixed number of queries"""
+    session_ids = [submit(client, bag, ['missing'] * 4).get_json()['session_id'] for _ in range(5)]
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        alerts = AlertAnalysisService.analyze_sessions(db_session, session_ids)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert len(statements) == 3
+    assert sorted(alerts) == sorted(session_ids)
+    assert all(alert['problem_count'] == 5 for alert in alerts.values())
+
+
+def test_metrics_report_alert_queue(client, db_session, bag):
+    """GET /api/metrics includes queue counts and the oldest pending job age"""
+    db_session.add(Admin(username='admin', password_hash=AuthService.hash_password('testpassword123')))
+    db_session.commit()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpassword123'}).get_json()['token']
+    submit(client, bag, ['missing'] * 4)
+    
+    response = client.get('/api/metrics', headers={'Authorization': f'Bearer {token}'})
+    
+    stats = response.get_json()['alert_jobs']
+    assert (stats['pending'], stats['done'], stats['failed']) == (1, 0, 0)
+    assert stats['oldest_pending_seconds'] >= 0
@@ -0,0 +1,220 @@
+"""
+Tests for pooled SMTP alert delivery (AlertMailer / SMTPConnectionPool)
+"""
+import pytest
+import os
+import smtplib
+import socket
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from email.message import EmailMessage
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, AlertJob, AlertJobStatus
+from services import alert_job_service
+from services.alert_mailer import AlertMailer, SMTPConnectionPool
+from services.alert_worker import AlertWorker
+from services.qr_service import QRService
+from tests.smtp_sink import SMTPSink
+
+TOKEN = '00000000-0000-4000-8000-000000001401'
+
+
+@pytest.fixture
+def sink():
+    """Local SMTP server recording messages"""
+    with SMTPSink() as sink:
+        yield sink
+
+
+def make_mailer(sink, **pool_options):
+    return AlertMailer(SMTPConnectionPool('127.0.0.1', sink.port, starttls=False, timeout=5, **pool_options),
+                       sender='alerts@example.com')
+
+
+def message(index):
+    msg = EmailMessage()
+    msg['From'] = 'alerts@example.com'
+    msg['To'] = 'admin@example.com'
+    msg['Subject'] = f'Alert {index}'
+    msg.set_content(f'body {index}')
+    return msg
+
+
+def sample_alert(**overrides):
+    alert = {
+        'session_id': 7,
+        'checked_at': '2026-10-17T09:30:00+00:00',
+        'nickname': 'Sam',
+        'ip_address': '203.0.113.9',
+        'geo_city': 'Lyon',
+        'geo_country': 'France',
+        'site': {'id': 1, 'name': 'North Station'},
+        'bag': {'id': 2, 'name': 'Trauma Kit'},
+        'recipients': ['admin@example.com', 'safety@example.com'],
+        'problems': [
+            {'bag_item_id': 3, 'item_name': 'Bandages', 'status': 'not_enough', 'observed_qty': 2,
+             'expected_qty': 10, 'notes': 'used on shift'},
+            {'bag_item_id': 4, 'item_name': 'Flashlight', 'status': 'battery_low', 'observed_qty': None,
+             'expected_qty': None, 'notes': None}
+        ],
+        'expiring': [{'bag_item_id': 5, 'item_name': 'Saline', 'expiry_date': '2026-10-27'}],
+        'problem_count': 3
+    }
+    alert.update(overrides)
+    return alert
+
+
+def test_messages_share_one_connection(sink):
+    """Sequential sends reuse one persistent connection"""
+    mailer = make_mailer(sink)
+    
+    for index in range(10):
+        mailer.send(message(index))
+    
+    assert sink.connections == 1
+    assert [msg['Subject'] for msg in sink.messages] == [f'Alert {i}' for i in range(10)]
+    assert mailer.pool.stats()['connections_opened'] == 1
+
+
+def test_connection_retired_after_message_limit(sink):
+    """A connection is closed after max_messages and a new one opened"""
+    mailer = make_mailer(sink, max_messages=3)
+    
+    for index in range(7):
+        mailer.send(message(index))
+    
+    assert len(sink.messages) == 7
+    assert sink.connections == 3
+
+
+def test_idle_connection_is_not_reused(sink):
+    """Connections idle longer than max_idle are replaced"""
+    mailer = make_mailer(sink, max_idle=0)
+    
+    mailer.send(message(0))
+    mailer.send(message(1))
+    
+    assert sink.connections == 2
+    assert mailer.pool.stats()['connections_closed'] == 1
+
+
+def test_reconnect_when_server_drops_connection():
+    """A message failing on a dropped pooled connection is resent on a new one"""
+    with SMTPSink(drop_after=2) as sink:
+        mailer = make_mailer(sink)
+        
+        for index in range(5):
+            mailer.send(message(index))
+    
+    assert len(sink.messages) == 5
+    assert mailer.reconnects >= 1
+    assert mailer.sent == 5
+
+
+def test_pool_bounds_parallel_connections(sink):
+    """Threads sending at once never open more than pool size connections"""
+    mailer = make_mailer(sink, size=3)
+    
+    def send_batch(offset):
+        for index in range(10):
+            mailer.send(message(offset + index))
+    
+    threads = [threading.Thread(target=send_batch, args=(offset,)) for offset in (0, 10, 20, 30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(sink.messages) == 40
+    assert sink.connections <= 3
+
+
+def test_unreachable_server_raises():
+    """A fresh connection that cannot be opened fails without retrying"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    mailer = AlertMailer(SMTPConnectionPool('127.0.0.1', port, starttls=False, timeout=1))
+    
+    with pytest.raises(OSError):
+        mailer.send(message(0))
+    assert mailer.reconnects == 0
+
+
+def test_refused_recipients_raise(sink):
+    """Recipient errors surface to the caller (the job is retried)"""
+    mailer = make_mailer(sink)
+    msg = message(0)
+    msg.replace_header('To', 'reject@example.com')
+    
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        mailer.send(msg)
+
+
+def test_alert_email_content(sink):
+    """The alert email lists problems, expiring items and who checked where"""
+    mailer = make_mailer(sink)
+    
+    mailer.send_alert(sample_alert())
+    
+    [msg] = sink.messages
+    assert msg['To'] == 'admin@example.com, safety@example.com'
+    assert msg['Subject'] == '[Inventory] 3 problem(s): North Station / Trauma Kit'
+    body = msg.get_payload()
+    assert 'Checked by: Sam' in body
+    assert 'Location: Lyon, France' in body
+    assert '- Bandages: not enough (2 of 10) - used on shift' in body
+    assert '- Flashlight: battery low' in body
+    assert '- Saline: 2026-10-27' in body
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Create test database session with alerts enabled and empty caches and rate limits"""
+    monkeypatch.setattr(alert_job_service, 'ALERTS_ENABLED', True)
+    monkeypatch.setattr(alert_job_service, 'ALERT_DIGEST_WINDOW_SECONDS', 0)
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_worker_sends_batch_over_pool(sink, db_session):
+    """A worker batch is emailed in parallel over the pool's connections"""
+    site = Site(name='North Station', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Trauma Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db_session.add(item)
+    db_session.commit()
+    item_id = item.id
+    with app.test_client() as client:
+        for _ in range(12):
+            client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': item_id, 'status': 'missing'}]})
+    mailer = make_mailer(sink, size=3)
+    
+    AlertWorker(send_alert=mailer.send_alert, send_concurrency=3, dedup=False).run_once()
+    
+    assert len(sink.messages) == 12
+    assert sink.connections <= 3
+    assert db_session.query(AlertJob).filter(AlertJob.status == AlertJobStatus.DONE).count() == 12
@@ -0,0 +1,163 @@
+"""
+Tests for the denormalized bag check state (Bag.last_checked_at, ...)
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus, InventoryUpload
+from services.bag_service import BagService
+from services.inventory_service import InventoryService, PreparedSubmission
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000000f01'
+OTHER_TOKEN = '00000000-0000-4000-8000-000000000f02'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bag(db_session):
+    """Active bag with two items (ids available as bag.item_ids)"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    items = [BagItem(bag_id=bag.id, name='Bandages', expected_qty=10), BagItem(bag_id=bag.id, name='Gloves')]
+    db_session.add_all(items)
+    db_session.commit()
+    bag.item_ids = [item.id for item in items]
+    return bag
+
+
+def reload(db_session, bag):
+    db_session.expire_all()
+    return db_session.get(Bag, bag.id)
+
+
+def test_submission_updates_check_state(client, db_session, bag):
+    """A submission records its session and problem count on the bag"""
+    before = reload(db_session, bag)
+    updated_at, scan_version = before.updated_at, before.scan_version
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json={'results': [
+        {'bag_item_id': bag.item_ids[0], 'status': 'not_enough', 'observed_qty': 2},
+        {'bag_item_id': bag.item_ids[1], 'status': 'missing'}
+    ]})
+    
+    checked = reload(db_session, bag)
+    assert checked.last_session_id == response.get_json()['session_id']
+    assert checked.last_problem_count == 2
+    assert checked.last_checked_at == db_session.get(InventorySession, checked.last_session_id).created_at
+    # Not a scan change: bundle deltas and ETags are unaffected
+    assert checked.updated_at == updated_at
+    assert checked.scan_version == scan_version
+
+
+def test_latest_submission_wins(client, db_session, bag):
+    """A later all-present check resets the problem count"""
+    client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': bag.item_ids[1], 'status': 'missing'}]})
+    response = client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': bag.item_ids[1], 'status': 'present'}]})
+    
+    checked = reload(db_session, bag)
+    assert checked.last_session_id == response.get_json()['session_id']
+    assert checked.last_problem_count == 0
+    
+    data = BagService.bag_to_dict(checked)
+    assert data['last_session_id'] == checked.last_session_id
+    assert data['last_problem_count'] == 0
+    assert data['last_checked_at'] is not None
+
+
+def test_replayed_and_older_sessions_do_not_overwrite(client, db_session, bag):
+    """Idempotent replays and late-arriving older sessions keep the newest state"""
+    headers = {'Idempotency-Key': 'k1'}
+    first = client.post(f'/api/inventory/{TOKEN}', headers=headers,
+                        json={'results': [{'bag_item_id': bag.item_ids[1], 'status': 'present'}]})
+    client.post(f'/api/inventory/{TOKEN}', headers=headers,
+                json={'results': [{'bag_item_id': bag.item_ids[1], 'status': 'missing'}]})
+    old = PreparedSubmission(bag.id, None, None, [
+        {'bag_item_id': bag.item_ids[1], 'status': InventoryStatus.MISSING, 'observed_qty': None, 'notes': None}
+    ], created_at=datetime.now(timezone.utc) - timedelta(days=1))
+    InventoryService.write_submissions(db_session, [old])
+    db_session.commit()
+    
+    checked = reload(db_session, bag)
+    assert checked.last_session_id == first.get_json()['session_id']
+    assert checked.last_problem_count == 0
+
+
+def test_backfill_check_state(db_session, bag):
+    """Backfill derives the state from the latest historical session of each bag"""
+    other = Bag(site_id=bag.site_id, name='Unchecked', qr_token=OTHER_TOKEN, active=True)
+    db_session.add(other)
+    now = datetime.now(timezone.utc)
+    old = InventorySession(bag_id=bag.id, created_at=now - timedelta(days=2))
+    latest = InventorySession(bag_id=bag.id, created_at=now - timedelta(days=1))
+    db_session.add_all([latest, old])
+    db_session.flush()
+    db_session.add_all([
+        InventoryResult(session_id=old.id, bag_item_id=bag.item_ids[0], status=InventoryStatus.PRESENT),
+        InventoryResult(session_id=latest.id, bag_item_id=bag.item_ids[0], status=InventoryStatus.NOT_ENOUGH),
+        InventoryResult(session_id=latest.id, bag_item_id=bag.item_ids[1], status=InventoryStatus.PRESENT)
+    ])
+    db_session.commit()
+    
+    assert InventoryService.backfill_check_state(db_session, chunk_size=1) == 1
+    
+    checked = reload(db_session, bag)
+    assert checked.last_session_id == latest.id
+    assert checked.last_problem_count == 1
+    assert checked.last_checked_at is not None
+    assert db_session.get(Bag, other.id).last_checked_at is None
+
+
+def test_backfill_skips_open_uploads(client, db_session, bag):
+    """A session of an upload that was never finalized is not the bag's last check"""
+    submitted = client.post(f'/api/inventory/{TOKEN}', json={
+        'results': [{'bag_item_id': bag.item_ids[0], 'status': 'missing'}]
+    }).get_json()['session_id']
+    response = client.post(f'/api/inventory/{TOKEN}/uploads', json={'nickname': 'Sam'})
+    assert response.status_code == 201
+    assert db_session.query(InventoryUpload).count() == 1
+    
+    InventoryService.backfill_check_state(db_session)
+    
+    checked = reload(db_session, bag)
+    assert checked.last_session_id == submitted
+    assert checked.last_problem_count == 1
@@ -74,7 +74,7 @@ def sample_bag(db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Test Bag',
-        qr_token='test-token-123',
+        qr_token='00000000-0000-4000-8000-000000000100',
         active=True
     )
     db_session.add(bag)
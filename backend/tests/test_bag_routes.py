@@ -214,8 +214,8 @@ def test_create_bag_client_cannot_provide_qr_token(client, db_session, auth_toke
 def test_list_bags_by_site(client, db_session, auth_token, test_site):
     """Test GET /api/sites/<site_id>/bags returns bags for site"""
     # Create two bags
-    bag1 = Bag(site_id=test_site.id, name='Bag 1', qr_token='token-1', active=True)
-    bag2 = Bag(site_id=test_site.id, name='Bag 2', qr_token='token-2', active=False)
+    bag1 = Bag(site_id=test_site.id, name='Bag 1', qr_token='00000000-0000-4000-8000-000000000001', active=True)
+    bag2 = Bag(site_id=test_site.id, name='Bag 2', qr_token='00000000-0000-4000-8000-000000000002', active=False)
     db_session.add_all([bag1, bag2])
     db_session.commit()
     
@@ -249,7 +249,7 @@ def test_list_bags_invalid_site(client, db_session, auth_token):
 
 def test_get_bag_success(client, db_session, auth_token, test_site):
     """Test GET /api/bags/<id> returns bag"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='test-token-123', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000100', active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -262,7 +262,7 @@ def test_get_bag_success(client, db_session, auth_token, test_site):
     assert data['id'] == bag.id
     assert data['site_id'] == test_site.id
     assert data['name'] == 'Test Bag'
-    assert data['qr_token'] == 'test-token-123'
+    assert data['qr_token'] == '00000000-0000-4000-8000-000000000100'
     assert data['active'] is True
 
 
@@ -282,7 +282,7 @@ def test_get_bag_not_found(client, db_session, auth_token):
 
 def test_update_bag_name(client, db_session, auth_token, test_site):
     """Test PATCH /api/bags/<id> updates name"""
-    bag = Bag(site_id=test_site.id, name='Original Name', qr_token='test-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Original Name', qr_token='00000000-0000-4000-8000-000000000107', active=True)
     db_session.add(bag)
     db_session.commit()
     bag_id = bag.id
@@ -304,7 +304,7 @@ def test_update_bag_name(client, db_session, auth_token, test_site):
 
 def test_update_bag_active_status(client, db_session, auth_token, test_site):
     """Test PATCH /api/bags/<id> updates active status"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='test-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000107', active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -334,7 +334,7 @@ def test_update_bag_not_found(client, db_session, auth_token):
 
 def test_update_bag_qr_token_immutable(client, db_session, auth_token, test_site):
     """Test PATCH rejects attempt to update qr_token"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='original-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-00000000010f', active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -352,7 +352,7 @@ def test_update_bag_qr_token_immutable(client, db_session, auth_token, test_site
 
 def test_update_bag_site_id_immutable(client, db_session, auth_token, test_site):
     """Test PATCH rejects attempt to update site_id"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='test-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000107', active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -372,7 +372,7 @@ def test_update_bag_site_id_immutable(client, db_session, auth_token, test_site)
 
 def test_delete_bag_success(client, db_session, auth_token, test_site):
     """Test DELETE /api/bags/<id> returns 204 when successful"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='test-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000107', active=True)
     db_session.add(bag)
     db_session.commit()
     bag_id = bag.id
@@ -391,7 +391,7 @@ def test_delete_bag_success(client, db_session, auth_token, test_site):
 
 def test_delete_bag_with_sessions_conflict(client, db_session, auth_token, test_site):
     """Test DELETE /api/bags/<id> returns 409 when bag has inventory sessions"""
-    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='test-token', active=True)
+    bag = Bag(site_id=test_site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000107', active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -0,0 +1,179 @@
+"""
+Tests for NDJSON bulk inventory upload (POST /api/inventory/bulk)
+"""
+import pytest
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult
+from services.qr_service import QRService
+from services.inventory_service import InventoryService
+
+TOKEN_A = '00000000-0000-4000-8000-000000000d01'
+TOKEN_B = '00000000-0000-4000-8000-000000000d02'
+INACTIVE_TOKEN = '00000000-0000-4000-8000-000000000d03'
+UNKNOWN_TOKEN = '00000000-0000-4000-8000-000000000dff'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def items(db_session):
+    """One item in each of two active bags and an inactive bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bags = [
+        Bag(site_id=site.id, name='Kit A', qr_token=TOKEN_A, active=True),
+        Bag(site_id=site.id, name='Kit B', qr_token=TOKEN_B, active=True),
+        Bag(site_id=site.id, name='Retired', qr_token=INACTIVE_TOKEN, active=False)
+    ]
+    db_session.add_all(bags)
+    db_session.flush()
+    items = {bag.qr_token: BagItem(bag_id=bag.id, name='Bandages') for bag in bags}
+    db_session.add_all(items.values())
+    db_session.commit()
+    return {token: item.id for token, item in items.items()}
+
+
+def session_line(token, item_id, **extra):
+    """One NDJSON session line"""
+    return json.dumps({'qr_token': token, 'results': [{'bag_item_id': item_id, 'status': 'present'}], **extra})
+
+
+def post_ndjson(client, lines):
+    response = client.post('/api/inventory/bulk', data='\n'.join(lines) + '\n',
+                           content_type='application/x-ndjson')
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_bulk_upload_reports_each_line(client, db_session, items):
+    """Valid sessions are stored; every line gets its own result, in order"""
+    response, outcomes = post_ndjson(client, [
+        session_line(TOKEN_A, items[TOKEN_A], nickname='Sam'),
+        session_line(UNKNOWN_TOKEN, items[TOKEN_A]),
+        '{not json',
+        '',
+        session_line(TOKEN_B, items[TOKEN_A]),  # item of another bag
+        session_line(INACTIVE_TOKEN, items[INACTIVE_TOKEN]),
+        json.dumps({'qr_token': TOKEN_B, 'results': []}),
+        session_line(TOKEN_B, items[TOKEN_B])
+    ])
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [(o['line'], o['ok']) for o in outcomes] == [
+        (1, True), (2, False), (3, False), (5, False), (6, False), (7, False), (8, True)
+    ]
+    assert [o['error']['code'] for o in outcomes if not o['ok']] == [
+        'NOT_FOUND', 'INVALID_INPUT', 'INVALID_INPUT', 'NOT_FOUND', 'INVALID_INPUT'
+    ]
+    assert outcomes[0]['result_count'] == 1
+    assert outcomes[-1]['replayed'] is False
+    assert db_session.query(InventorySession).count() == 2
+    assert db_session.query(InventoryResult).count() == 2
+    assert db_session.get(InventorySession, outcomes[0]['session_id']).nickname == 'Sam'
+
+
+def test_bulk_upload_idempotency_keys(client, db_session, items):
+    """Re-uploading the same sessions (or repeating a key) stores them once"""
+    lines = [
+        session_line(TOKEN_A, items[TOKEN_A], idempotency_key='device-1:1'),
+        session_line(TOKEN_A, items[TOKEN_A], idempotency_key='device-1:1'),
+        session_line(TOKEN_B, items[TOKEN_B], idempotency_key='device-1:2')
+    ]
+    
+    _, first = post_ndjson(client, lines)
+    _, retry = post_ndjson(client, lines)
+    
+    assert [o['replayed'] for o in first] == [False, True, False]
+    assert [o['replayed'] for o in retry] == [True, True, True]
+    assert [o['session_id'] for o in retry] == [o['session_id'] for o in first]
+    assert db_session.query(InventorySession).count() == 2
+
+
+def test_bulk_chunks_resolve_tokens_set_based(db_session, items):
+    """Uncached tokens of a chunk are resolved with one query; later chunks hit the checklist cache"""
+    body = '\n'.join(session_line(TOKEN_A if i % 2 else TOKEN_B, items[TOKEN_A if i % 2 else TOKEN_B])
+                     for i in range(5)).encode()
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        outcomes = list(InventoryService.submit_bulk(
+            db_session, InventoryService.iter_ndjson(io.BytesIO(body)), chunk_size=2
+        ))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert all(o['ok'] for o in outcomes)
+    lookups = [s for s in statements if s.startswith('SELECT') and 'FROM bags' in s]
+    assert len(lookups) == 1
+    assert 'IN' in lookups[0]
+    assert db_session.query(InventorySession).count() == 5
+
+
+def test_bulk_parses_incrementally(db_session, items):
+    """The first chunk is stored and reported before the rest of the body is read"""
+    stream = io.BytesIO('\n'.join(session_line(TOKEN_A, items[TOKEN_A]) for _ in range(10)).encode())
+    
+    outcomes = InventoryService.submit_bulk(db_session, InventoryService.iter_ndjson(stream), chunk_size=2)
+    first = next(outcomes)
+    
+    assert first['ok'] is True
+    assert stream.tell() < len(stream.getvalue())
+
+
+def test_iter_ndjson_skips_oversized_line():
+    """An oversized line is reported and skipped; parsing resumes on the next line"""
+    stream = io.BytesIO(b'{"a": "' + b'x' * 100 + b'"}\n{"b": 1}\n')
+    
+    lines = list(InventoryService.iter_ndjson(stream, max_line_bytes=50))
+    
+    assert lines[0][0] == 1 and lines[0][2] == 'line exceeds 50 bytes'
+    assert lines[1] == (2, {'b': 1}, None)
+
+
+def test_single_submit_route_still_matches_tokens(client, db_session, items):
+    """/api/inventory/bulk does not shadow per-bag submissions"""
+    response = client.post(f'/api/inventory/{TOKEN_A}',
+                           json={'results': [{'bag_item_id': items[TOKEN_A], 'status': 'present'}]})
+    assert response.status_code == 201
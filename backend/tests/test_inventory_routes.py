@@ -0,0 +1,302 @@
+"""
+Tests for inventory submission (POST /api/inventory/<qr_token>)
+"""
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus
+from services import scan_cache as scan_cache_module
+from services.bag_item_service import BagItemService
+from services.checklist_index import checklist_cache
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000000b01'
+INACTIVE_TOKEN = '00000000-0000-4000-8000-000000000b02'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bag_items(db_session):
+    """An active bag with three items, an inactive bag, and an item of another bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    inactive = Bag(site_id=site.id, name='Retired', qr_token=INACTIVE_TOKEN, active=False)
+    db_session.add_all([bag, inactive])
+    db_session.flush()
+    items = [
+        BagItem(bag_id=bag.id, name='Bandages', expected_qty=10),
+        BagItem(bag_id=bag.id, name='Flashlight', test_batteries=True),
+        BagItem(bag_id=bag.id, name='Gloves'),
+        BagItem(bag_id=inactive.id, name='Elsewhere')
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    return items
+
+
+def submission(items, **overrides):
+    """Valid submission body for the first three items"""
+    body = {
+        'nickname': 'Sam',
+        'results': [
+            {'bag_item_id': items[0].id, 'status': 'not_enough', 'observed_qty': 4},
+            {'bag_item_id': items[1].id, 'status': 'battery_low', 'notes': 'dim'},
+            {'bag_item_id': items[2].id, 'status': 'present'}
+        ]
+    }
+    body.update(overrides)
+    return body
+
+
+def test_submit_inventory(client, db_session, bag_items):
+    """POST /api/inventory/<token> stores one session and its results"""
+    response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items),
+                           environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['result_count'] == 3
+    assert data['bag_id'] == bag_items[0].bag_id
+    
+    session = db_session.get(InventorySession, data['session_id'])
+    assert session.nickname == 'Sam'
+    assert session.ip_address == '203.0.113.7'
+    results = {r.bag_item_id: r for r in session.inventory_results}
+    assert results[bag_items[0].id].status == InventoryStatus.NOT_ENOUGH
+    assert results[bag_items[0].id].observed_qty == 4
+    assert results[bag_items[1].id].notes == 'dim'
+    assert results[bag_items[2].id].status == InventoryStatus.PRESENT
+
+
+def test_submit_uses_two_inserts_in_one_transaction(client, db_session, bag_items):
+    """Session insert + one executemany for all results, one commit"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, executemany))
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.status_code == 201
+    inserts = [s for s in statements if s[0].startswith('INSERT')]
+    assert len(inserts) == 2
+    assert 'inventory_sessions' in inserts[0][0]
+    assert 'inventory_results' in inserts[1][0]
+
+
+def test_submit_idempotency_key_replay(client, db_session, bag_items):
+    """A retry with the same Idempotency-Key returns the original session"""
+    headers = {'Idempotency-Key': 'c0ffee-1'}
+    first = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items), headers=headers)
+    retry = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items), headers=headers)
+    
+    assert first.status_code == 201
+    assert first.get_json()['replayed'] is False
+    assert retry.status_code == 200
+    assert retry.get_json()['replayed'] is True
+    assert retry.get_json()['session_id'] == first.get_json()['session_id']
+    assert db_session.query(InventorySession).count() == 1
+    assert db_session.query(InventoryResult).count() == 3
+
+
+def test_submit_idempotency_key_retry_is_one_insert_or_return(client, db_session, bag_items):
+    """A retry writes no results: a no-op conflicting INSERT, then the id lookup"""
+    headers = {'Idempotency-Key': 'c0ffee-2'}
+    client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items), headers=headers)
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items), headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.status_code == 200
+    inserts = [s for s in statements if s.startswith('INSERT')]
+    assert len(inserts) == 1
+    assert 'ON CONFLICT' in inserts[0]
+
+
+def test_submit_different_idempotency_keys(client, db_session, bag_items):
+    """Distinct keys (and no key) create distinct sessions"""
+    for headers in [{'Idempotency-Key': 'a'}, {'Idempotency-Key': 'b'}, {}, {}]:
+        response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items), headers=headers)
+        assert response.status_code == 201
+    
+    assert db_session.query(InventorySession).count() == 4
+
+
+def test_submit_idempotency_key_too_long(client, db_session, bag_items):
+    """Keys over 255 characters are rejected"""
+    response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items),
+                           headers={'Idempotency-Key': 'k' * 256})
+    
+    assert response.status_code == 400
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_submit_validates_from_cached_checklist(client, db_session, bag_items):
+    """Once a bag's checklist is cached, a submission runs no SELECT at all"""
+    client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.status_code == 201
+    assert [s for s in statements if s.startswith('SELECT')] == []
+    assert checklist_cache.stats()['hits'] >= 1
+
+
+def test_submit_sees_item_changes(client, db_session, bag_items):
+    """BagItemService changes invalidate the cached checklist"""
+    client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    new_item = BagItemService.create_bag_item(db_session, bag_items[0].bag_id, {'name': 'Splint'})
+    BagItemService.delete_bag_item(db_session, bag_items[2].id)
+    
+    added = client.post(f'/api/inventory/{TOKEN}',
+                        json={'results': [{'bag_item_id': new_item.id, 'status': 'present'}]})
+    removed = client.post(f'/api/inventory/{TOKEN}',
+                          json={'results': [{'bag_item_id': bag_items[2].id, 'status': 'present'}]})
+    
+    assert added.status_code == 201
+    assert removed.status_code == 400
+
+
+def test_submit_item_deleted_behind_cache(client, db_session, bag_items):
+    """An item deleted without invalidation returns 409 and drops the stale checklist"""
+    client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': bag_items[0].id, 'status': 'present'}]})
+    db_session.query(BagItem).filter(BagItem.id == bag_items[2].id).delete()
+    db_session.commit()
+    body = {'results': [{'bag_item_id': bag_items[2].id, 'status': 'present'}]}
+    
+    conflict = client.post(f'/api/inventory/{TOKEN}', json=body)
+    retry = client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    assert conflict.status_code == 409
+    assert conflict.get_json()['error']['code'] == 'CONFLICT'
+    assert retry.status_code == 400
+    assert db_session.query(InventorySession).count() == 1
+
+
+def test_cached_checklist_expires(client, db_session, bag_items, monkeypatch):
+    """A bag deactivated without invalidation accepts submissions for at most the ttl"""
+    now = [1000.0]
+    monkeypatch.setattr(scan_cache_module.time, 'monotonic', lambda: now[0])
+    client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    db_session.query(Bag).filter(Bag.qr_token == TOKEN).update({'active': False})
+    db_session.commit()
+    
+    cached = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    now[0] += checklist_cache.ttl
+    expired = client.post(f'/api/inventory/{TOKEN}', json=submission(bag_items))
+    
+    assert cached.status_code == 201
+    assert expired.status_code == 404
+
+
+@pytest.mark.parametrize('result', [
+    {'index': 0, 'status': 'battery_low'},                        # no battery test
+    {'index': 2, 'status': 'not_enough'},                         # presence-only item
+    {'index': 0, 'status': 'not_enough', 'observed_qty': 10},     # not below expected_qty
+])
+def test_submit_status_must_fit_item(client, db_session, bag_items, result):
+    """battery_low / not_enough are checked against the item's configuration"""
+    body = {'results': [{'bag_item_id': bag_items[result.pop('index')].id, **result}]}
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    assert response.status_code == 400
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_submit_unknown_or_inactive_bag(client, db_session, bag_items):
+    """Unknown, malformed and inactive tokens return 404"""
+    for token in ['00000000-0000-4000-8000-000000000bff', 'not-a-uuid', INACTIVE_TOKEN]:
+        response = client.post(f'/api/inventory/{token}', json=submission(bag_items))
+        assert response.status_code == 404
+        assert response.get_json()['error']['code'] == 'NOT_FOUND'
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_submit_item_of_other_bag(client, db_session, bag_items):
+    """Results must reference items of the scanned bag"""
+    body = submission(bag_items, results=[{'bag_item_id': bag_items[3].id, 'status': 'present'}])
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    assert response.status_code == 400
+    assert db_session.query(InventorySession).count() == 0
+
+
+@pytest.mark.parametrize('results', [
+    [],
+    'present',
+    [{'bag_item_id': 'one', 'status': 'present'}],
+    [{'bag_item_id': 1, 'status': 'lost'}],
+    [{'bag_item_id': 1, 'status': 'not_enough', 'observed_qty': -1}],
+    [{'bag_item_id': 1, 'status': 'present'}, {'bag_item_id': 1, 'status': 'missing'}]
+])
+def test_submit_invalid_results(client, db_session, bag_items, results):
+    """Malformed results return 400 and write nothing"""
+    response = client.post(f'/api/inventory/{TOKEN}', json={'results': results})
+    
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_INPUT'
+    assert db_session.query(InventoryResult).count() == 0
+
+
+def test_submit_requires_json(client, db_session, bag_items):
+    """Non-JSON body returns 400"""
+    response = client.post(f'/api/inventory/{TOKEN}', data='results', content_type='text/plain')
+    assert response.status_code == 400
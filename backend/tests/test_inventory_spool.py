@@ -0,0 +1,210 @@
+"""
+Tests for the durable inventory spool (database unavailable)
+"""
+import pytest
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import app
+from database import Base
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus
+from routes import inventory_routes
+from services.inventory_service import PreparedSubmission
+from services.inventory_spool import InventorySpool
+from services.inventory_writer import InventoryWriter
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000000e01'
+UNKNOWN_TOKEN = '00000000-0000-4000-8000-000000000eff'
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory on one shared in-memory connection"""
+    shared_engine = create_engine('sqlite://', poolclass=StaticPool,
+                                  connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=shared_engine)
+    QRService.clear_cache()
+    yield sessionmaker(autocommit=False, autoflush=False, bind=shared_engine)
+    Base.metadata.drop_all(bind=shared_engine)
+    shared_engine.dispose()
+
+
+@pytest.fixture
+def unavailable_factory(tmp_path):
+    """Session factory whose database cannot be opened (OperationalError on first query)"""
+    broken_engine = create_engine(f'sqlite:///{tmp_path}/missing/dir/db.sqlite')
+    yield sessionmaker(bind=broken_engine)
+    broken_engine.dispose()
+
+
+@pytest.fixture
+def item(session_factory):
+    """(bag_id, item_id) of one active bag item"""
+    db = session_factory()
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db.add(site)
+    db.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db.add(bag)
+    db.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db.add(item)
+    db.commit()
+    ids = (bag.id, item.id)
+    db.close()
+    return ids
+
+
+@pytest.fixture
+def spool(tmp_path, session_factory):
+    return InventorySpool(str(tmp_path / 'spool.ndjson'), batch_size=2, session_factory=session_factory)
+
+
+def body(item_id, status='present'):
+    return {'nickname': 'Sam', 'results': [{'bag_item_id': item_id, 'status': status}]}
+
+
+def stored(factory):
+    db = factory()
+    try:
+        return db.query(InventorySession).all(), db.query(InventoryResult).count()
+    finally:
+        db.close()
+
+
+def test_spool_appends_one_line_per_session(spool, item):
+    """Records are appended as JSON lines and counted as depth"""
+    spool.spool_request(TOKEN, body(item[1]), '127.0.0.1')
+    spool.spool_submissions([PreparedSubmission(item[0], None, None, [
+        {'bag_item_id': item[1], 'status': InventoryStatus.MISSING, 'observed_qty': None, 'notes': None}
+    ])])
+    
+    lines = Path(spool.path).read_bytes().splitlines()
+    assert [json.loads(line).get('qr_token') for line in lines] == [TOKEN, None]
+    assert all(json.loads(line)['idempotency_key'] for line in lines)
+    assert spool.stats()['depth'] == 2
+    spool.stop()
+
+
+def test_replay_stores_spooled_sessions(spool, session_factory, item):
+    """replay_once writes everything back (original check time) and empties the spool"""
+    for _ in range(3):
+        spool.spool_request(TOKEN, body(item[1]))
+    spool.stop()
+    spooled_at = json.loads(Path(spool.path).read_bytes().splitlines()[0])['created_at']
+    
+    assert spool.replay_once() is True
+    
+    sessions, result_count = stored(session_factory)
+    assert len(sessions) == 3 and result_count == 3
+    assert sessions[0].created_at.replace(tzinfo=timezone.utc) == datetime.fromisoformat(spooled_at)
+    assert spool.stats() == {'depth': 0, 'spooled': 3, 'replayed': 3, 'rejected': 0, 'replay_failures': 0}
+    assert not os.path.exists(spool.path) and not os.path.exists(spool.replaying_path)
+
+
+def test_replaying_twice_stores_once(spool, session_factory, item):
+    """A crash after storing a batch but before removing the file causes no duplicates"""
+    spool.spool_request(TOKEN, body(item[1]))
+    spool.spool_request(TOKEN, body(item[1]), idempotency_key='client-key')
+    spool.stop()
+    saved = spool.path + '.saved'
+    shutil.copy(spool.path, saved)
+    spool.replay_once()
+    
+    os.replace(saved, spool.path)
+    spool.replay_once()
+    
+    assert len(stored(session_factory)[0]) == 2
+
+
+def test_replay_rejects_unstorable_records(spool, session_factory, item):
+    """Corrupt lines and sessions of unknown bags go to the rejected file"""
+    spool.spool_request(UNKNOWN_TOKEN, body(item[1]))
+    spool.spool_request(TOKEN, body(item[1]))
+    with open(spool.path, 'ab') as spool_file:
+        spool_file.write(b'{"torn')
+    spool.stop()
+    
+    assert spool.replay_once() is True
+    
+    assert len(stored(session_factory)[0]) == 1
+    assert spool.rejected == 2
+    assert len(Path(spool.rejected_path).read_bytes().splitlines()) == 2
+
+
+def test_replay_keeps_spool_while_database_unavailable(tmp_path, unavailable_factory, item):
+    """A failed replay keeps every record for the next attempt"""
+    spool = InventorySpool(str(tmp_path / 'spool.ndjson'), session_factory=unavailable_factory)
+    spool.spool_request(TOKEN, body(item[1]))
+    spool.stop()
+    
+    assert spool.replay_once() is False
+    
+    assert spool.stats()['depth'] == 1
+    assert spool.replay_failures == 1
+
+
+def test_writer_spools_batch_when_database_unavailable(tmp_path, unavailable_factory, item):
+    """Write-behind batches failing on connection errors are spooled, not dropped"""
+    spool = InventorySpool(str(tmp_path / 'spool.ndjson'), session_factory=unavailable_factory)
+    writer = InventoryWriter(batch_size=2, flush_interval=30, session_factory=unavailable_factory, spool=spool)
+    for _ in range(2):
+        writer.enqueue(PreparedSubmission(item[0], None, None, [
+            {'bag_item_id': item[1], 'status': InventoryStatus.PRESENT, 'observed_qty': None, 'notes': None}
+        ]))
+    
+    writer.stop()
+    spool.stop()
+    
+    assert writer.stats()['spooled'] == 2
+    assert writer.stats()['failed'] == 0
+    assert spool.stats()['depth'] == 2
+
+
+# Route test
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_route_spools_when_database_unavailable(client, monkeypatch, spool, session_factory,
+                                                unavailable_factory, item):
+    """POST /api/inventory/<token> answers 202 spooled; the session is stored on replay"""
+    reset_rate_limits()
+    monkeypatch.setattr(inventory_routes, 'SessionLocal', unavailable_factory)
+    monkeypatch.setattr(inventory_routes, 'inventory_spool', spool)
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json=body(item[1]),
+                           headers={'Idempotency-Key': 'offline-1'})
+    invalid = client.post(f'/api/inventory/{TOKEN}', json={'results': []})
+    spool.stop()
+    
+    assert response.status_code == 202
+    assert response.get_json() == {'status': 'accepted', 'spooled': True, 'result_count': 1}
+    assert invalid.status_code == 400
+    assert spool.stats()['depth'] == 1
+    
+    spool.replay_once()
+    sessions, _ = stored(session_factory)
+    assert [(s.idempotency_key, s.nickname) for s in sessions] == [('offline-1', 'Sam')]
@@ -0,0 +1,219 @@
+"""
+Tests for resumable chunked inventory uploads (/api/inventory/.../uploads)
+"""
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000001101'
+UNKNOWN_UPLOAD = '00000000-0000-4000-8000-0000000011ff'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def item_ids(db_session):
+    """Ids of the six items of a shelf"""
+    site = Site(name='Warehouse', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Shelf A', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    items = [BagItem(bag_id=bag.id, name=f'Item {i}') for i in range(6)]
+    db_session.add_all(items)
+    db_session.commit()
+    return [item.id for item in items]
+
+
+def chunk(ids, status='present'):
+    return {'results': [{'bag_item_id': item_id, 'status': status} for item_id in ids]}
+
+
+def open_upload(client, **kwargs):
+    response = client.post(f'/api/inventory/{TOKEN}/uploads', json={'nickname': 'Sam'}, **kwargs)
+    return response, response.get_json()
+
+
+def test_chunked_upload_flow(client, db_session, item_ids):
+    """Open, send chunks in any order, finalize: one session with all results"""
+    response, upload = open_upload(client)
+    assert response.status_code == 201
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    
+    assert client.put(f'{base}/chunks/1', json=chunk(item_ids[3:], 'missing')).status_code == 201
+    assert client.put(f'{base}/chunks/0', json=chunk(item_ids[:3])).status_code == 201
+    status = client.get(base).get_json()
+    assert status['received_chunks'] == [0, 1]
+    assert status['result_count'] == 6
+    assert status['finalized'] is False
+    
+    response = client.post(f'{base}/finalize', json={'total_chunks': 2})
+    
+    assert response.status_code == 200
+    assert response.get_json() == {'session_id': upload['session_id'], 'bag_id': upload['bag_id'], 'result_count': 6}
+    session = db_session.get(InventorySession, upload['session_id'])
+    assert session.nickname == 'Sam'
+    assert len(session.inventory_results) == 6
+    bag = db_session.get(Bag, upload['bag_id'])
+    assert bag.last_session_id == upload['session_id']
+    assert bag.last_problem_count == 3
+
+
+def test_chunk_is_one_bulk_insert(client, db_session, item_ids):
+    """A chunk writes its marker row and all its results with one executemany"""
+    _, upload = open_upload(client)
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, executemany))
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.put(f"/api/inventory/uploads/{upload['upload_id']}/chunks/0", json=chunk(item_ids))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    result_inserts = [s for s in statements if s[0].startswith('INSERT INTO inventory_results')]
+    assert len(result_inserts) == 1 and result_inserts[0][1] is True
+
+
+def test_resent_chunk_is_a_no_op(client, db_session, item_ids):
+    """Retrying a received chunk answers 200 and stores nothing twice"""
+    _, upload = open_upload(client)
+    url = f"/api/inventory/uploads/{upload['upload_id']}/chunks/0"
+    
+    first = client.put(url, json=chunk(item_ids[:2]))
+    retry = client.put(url, json=chunk(item_ids[:2]))
+    
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert db_session.query(InventoryResult).count() == 2
+
+
+def test_finalize_reports_missing_chunks(client, db_session, item_ids):
+    """Finalize lists missing chunks; the bag's check state is untouched until complete"""
+    _, upload = open_upload(client)
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    client.put(f'{base}/chunks/0', json=chunk(item_ids[:2]))
+    client.put(f'{base}/chunks/2', json=chunk(item_ids[4:]))
+    
+    response = client.post(f'{base}/finalize', json={'total_chunks': 3})
+    
+    assert response.status_code == 409
+    assert response.get_json()['error']['message'] == 'missing chunks: [1]'
+    assert db_session.get(Bag, upload['bag_id']).last_session_id is None
+
+
+def test_finalized_upload_is_closed(client, db_session, item_ids):
+    """After finalize, chunks are refused and finalize is idempotent"""
+    _, upload = open_upload(client)
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    client.put(f'{base}/chunks/0', json=chunk(item_ids[:2]))
+    first = client.post(f'{base}/finalize', json={'total_chunks': 1})
+    
+    again = client.post(f'{base}/finalize', json={'total_chunks': 1})
+    late = client.put(f'{base}/chunks/1', json=chunk(item_ids[2:]))
+    
+    assert again.status_code == 200
+    assert again.get_json() == first.get_json()
+    assert late.status_code == 409
+
+
+def test_item_cannot_be_sent_in_two_chunks(client, db_session, item_ids):
+    """An item already reported in another chunk is rejected"""
+    _, upload = open_upload(client)
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    client.put(f'{base}/chunks/0', json=chunk(item_ids[:2]))
+    
+    response = client.put(f'{base}/chunks/1', json=chunk(item_ids[1:3]))
+    
+    assert response.status_code == 400
+    assert response.get_json()['error']['message'] == f'items already sent in another chunk: [{item_ids[1]}]'
+    assert client.get(base).get_json()['received_chunks'] == [0]
+
+
+def test_chunk_with_deleted_item(client, db_session, item_ids):
+    """An item deleted after the checklist was cached is reported as such, not as a duplicate"""
+    _, upload = open_upload(client)
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    client.put(f'{base}/chunks/0', json=chunk(item_ids[:1]))
+    db_session.query(BagItem).filter(BagItem.id == item_ids[5]).delete()
+    db_session.commit()
+    
+    response = client.put(f'{base}/chunks/1', json=chunk(item_ids[4:]))
+    retry = client.put(f'{base}/chunks/1', json=chunk(item_ids[4:]))
+    
+    assert response.status_code == 400
+    assert response.get_json()['error']['message'] == 'results contain items that no longer exist'
+    assert retry.status_code == 400
+    assert client.get(base).get_json()['received_chunks'] == [0]
+
+
+def test_open_is_idempotent_with_key(client, db_session, item_ids):
+    """A retried open with the same Idempotency-Key returns the same upload"""
+    first_response, first = open_upload(client, headers={'Idempotency-Key': 'shelf-a-1'})
+    retry_response, retry = open_upload(client, headers={'Idempotency-Key': 'shelf-a-1'})
+    
+    assert first_response.status_code == 201
+    assert retry_response.status_code == 200
+    assert retry['upload_id'] == first['upload_id']
+    assert db_session.query(InventorySession).count() == 1
+
+
+@pytest.mark.parametrize('method, path, body', [
+    ('get', '', None),
+    ('put', '/chunks/0', {'results': [{'bag_item_id': 1, 'status': 'present'}]}),
+    ('post', '/finalize', {'total_chunks': 1})
+])
+def test_unknown_upload(client, db_session, item_ids, method, path, body):
+    """Unknown and malformed upload ids return 404"""
+    for upload_id in [UNKNOWN_UPLOAD, 'not-an-upload']:
+        response = getattr(client, method)(f'/api/inventory/uploads/{upload_id}{path}', json=body)
+        assert response.status_code == 404
+
+
+def test_invalid_chunk_requests(client, db_session, item_ids):
+    """Out-of-range indexes and totals are rejected"""
+    _, upload = open_upload(client)
+    base = f"/api/inventory/uploads/{upload['upload_id']}"
+    
+    assert client.put(f'{base}/chunks/100000', json=chunk(item_ids[:1])).status_code == 400
+    assert client.post(f'{base}/finalize', json={'total_chunks': 0}).status_code == 400
+    assert client.post(f'{base}/finalize', json={}).status_code == 400
@@ -0,0 +1,241 @@
+"""
+Tests for the write-behind inventory writer
+"""
+import pytest
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus
+from routes import inventory_routes
+from services.qr_service import QRService
+from services.inventory_service import PreparedSubmission
+from services.inventory_writer import InventoryWriter
+
+TOKEN = '00000000-0000-4000-8000-000000000c01'
+
+
+@pytest.fixture
+def shared_session_factory():
+    """Session factory on one shared in-memory connection (visible to the writer thread)"""
+    shared_engine = create_engine('sqlite://', poolclass=StaticPool,
+                                  connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=shared_engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=shared_engine)
+    yield factory
+    Base.metadata.drop_all(bind=shared_engine)
+    shared_engine.dispose()
+
+
+@pytest.fixture
+def item(shared_session_factory):
+    """One bag item in the shared database"""
+    db = shared_session_factory()
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db.add(site)
+    db.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db.add(bag)
+    db.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db.add(item)
+    db.commit()
+    ids = (bag.id, item.id)
+    db.close()
+    return ids
+
+
+def make_submission(item, status=InventoryStatus.PRESENT, idempotency_key=None):
+    """Prepared submission with one result"""
+    bag_id, item_id = item
+    return PreparedSubmission(bag_id, 'Sam', '127.0.0.1', [
+        {'bag_item_id': item_id, 'status': status, 'observed_qty': None, 'notes': None}
+    ], idempotency_key)
+
+
+def wait_for(predicate, timeout=2.0):
+    """Poll predicate until true or timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def count_sessions(factory):
+    db = factory()
+    try:
+        return db.query(InventorySession).count(), db.query(InventoryResult).count()
+    finally:
+        db.close()
+
+
+def test_flush_on_size(shared_session_factory, item):
+    """A full batch is written at once, in one transaction"""
+    writer = InventoryWriter(batch_size=3, flush_interval=30, session_factory=shared_session_factory)
+    try:
+        for _ in range(3):
+            assert writer.enqueue(make_submission(item))
+        
+        assert wait_for(lambda: writer.written == 3)
+        assert writer.stats()['batches'] == 1
+        assert count_sessions(shared_session_factory) == (3, 3)
+    finally:
+        writer.stop()
+
+
+def test_flush_on_interval(shared_session_factory, item):
+    """A partial batch is written after flush_interval"""
+    writer = InventoryWriter(batch_size=100, flush_interval=0.05, session_factory=shared_session_factory)
+    try:
+        writer.enqueue(make_submission(item))
+        writer.enqueue(make_submission(item))
+        
+        assert wait_for(lambda: writer.written == 2)
+    finally:
+        writer.stop()
+
+
+def test_stop_drains_queue(shared_session_factory, item):
+    """stop() writes everything queued before returning"""
+    writer = InventoryWriter(batch_size=2, flush_interval=30, session_factory=shared_session_factory)
+    for _ in range(5):
+        writer.enqueue(make_submission(item))
+    
+    assert writer.stop() is True
+    assert writer.written == 5
+    assert count_sessions(shared_session_factory) == (5, 5)
+
+
+def test_failing_submission_does_not_drop_batch(shared_session_factory, item):
+    """A bad submission fails alone; the rest of its batch is written"""
+    writer = InventoryWriter(batch_size=3, flush_interval=30, session_factory=shared_session_factory)
+    writer.enqueue(make_submission(item))
+    writer.enqueue(make_submission(item, status=None))  # violates NOT NULL
+    writer.enqueue(make_submission(item))
+    
+    writer.stop()
+    
+    assert writer.written == 2
+    assert writer.failed == 1
+    assert count_sessions(shared_session_factory) == (2, 2)
+
+
+def test_duplicate_idempotency_keys_written_once(shared_session_factory, item):
+    """A retried submission in the same batch is not written twice"""
+    writer = InventoryWriter(batch_size=3, flush_interval=30, session_factory=shared_session_factory)
+    writer.enqueue(make_submission(item, idempotency_key='retry-1'))
+    writer.enqueue(make_submission(item, idempotency_key='retry-1'))
+    writer.enqueue(make_submission(item, idempotency_key='retry-2'))
+    
+    writer.stop()
+    
+    assert writer.stats()['duplicates'] == 1
+    assert count_sessions(shared_session_factory) == (2, 2)
+
+
+def test_queue_full_rejects(item):
+    """enqueue returns False when the queue is full"""
+    writer = InventoryWriter(max_queue=1)
+    writer.start = lambda: None  # no consumer
+    
+    assert writer.enqueue(make_submission(item)) is True
+    assert writer.enqueue(make_submission(item)) is False
+    assert writer.stats()['rejected'] == 1
+
+
+# Route tests (write-behind mode)
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def route_item(db_session):
+    """One bag item in the app database"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db_session.add(item)
+    db_session.commit()
+    return item
+
+
+@pytest.fixture
+def idle_writer(monkeypatch):
+    """Write-behind mode with a writer that never drains (queue of 1)"""
+    writer = InventoryWriter(max_queue=1)
+    writer.start = lambda: None
+    monkeypatch.setattr(inventory_routes, 'WRITE_BEHIND_ENABLED', True)
+    monkeypatch.setattr(inventory_routes, 'inventory_writer', writer)
+    return writer
+
+
+def test_route_acknowledges_with_202(client, db_session, route_item, idle_writer):
+    """Valid submission is queued and acknowledged before it is written"""
+    body = {'results': [{'bag_item_id': route_item.id, 'status': 'missing'}]}
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    assert response.status_code == 202
+    assert response.get_json() == {'status': 'accepted', 'bag_id': route_item.bag_id, 'result_count': 1}
+    assert idle_writer.stats()['queued'] == 1
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_route_returns_503_when_queue_full(client, db_session, route_item, idle_writer):
+    """Backpressure: full queue answers 503 with Retry-After"""
+    body = {'results': [{'bag_item_id': route_item.id, 'status': 'present'}]}
+    client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    response = client.post(f'/api/inventory/{TOKEN}', json=body)
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['error']['code'] == 'UNAVAILABLE'
+
+
+def test_route_still_validates(client, db_session, route_item, idle_writer):
+    """Invalid submissions are rejected before queueing"""
+    response = client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': 999, 'status': 'present'}]})
+    
+    assert response.status_code == 400
+    assert idle_writer.stats()['queued'] == 0
@@ -16,6 +16,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 os.environ['TESTING'] = 'true'
 
+from sqlalchemy import text
 from database import Base, engine, SessionLocal
 from models import Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus
 
@@ -66,14 +67,14 @@ def test_create_bag_with_qr_token(db_session):
     bag = Bag(
         site_id=site.id,
         name="First Aid Kit",
-        qr_token="test-token-12345",
+        qr_token="00000000-0000-4000-8000-000000000101",
         active=True
     )
     db_session.add(bag)
     db_session.commit()
     
     assert bag.id is not None
-    assert bag.qr_token == "test-token-12345"
+    assert bag.qr_token == "00000000-0000-4000-8000-000000000101"
     assert bag.active is True
 
 
@@ -84,12 +85,12 @@ def test_bag_qr_token_unique_constraint(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag1 = Bag(site_id=site.id, name="Bag 1", qr_token="duplicate-token", active=True)
+    bag1 = Bag(site_id=site.id, name="Bag 1", qr_token="00000000-0000-4000-8000-0000000000dd", active=True)
     db_session.add(bag1)
     db_session.commit()
     
     # Try to create another bag with same qr_token
-    bag2 = Bag(site_id=site.id, name="Bag 2", qr_token="duplicate-token", active=True)
+    bag2 = Bag(site_id=site.id, name="Bag 2", qr_token="00000000-0000-4000-8000-0000000000dd", active=True)
     db_session.add(bag2)
     
     with pytest.raises(Exception):  # IntegrityError
@@ -108,18 +109,35 @@ def test_query_bag_by_qr_token(db_session):
         bag = Bag(
             site_id=site.id,
             name=f"Bag {i}",
-            qr_token=f"token-{i:04d}",
+            qr_token=f"00000000-0000-4000-8000-{i:012d}",
             active=True
         )
         db_session.add(bag)
     db_session.commit()
     
     # Query by qr_token
-    found_bag = db_session.query(Bag).filter(Bag.qr_token == "token-0002").first()
+    found_bag = db_session.query(Bag).filter(Bag.qr_token == "00000000-0000-4000-8000-000000000002").first()
     
     assert found_bag is not None
     assert found_bag.name == "Bag 2"
-    assert found_bag.qr_token == "token-0002"
+    assert found_bag.qr_token == "00000000-0000-4000-8000-000000000002"
+
+
+def test_bag_qr_token_stored_as_16_bytes(db_session):
+    """qr_token is stored as binary and read back as a canonical UUID string"""
+    site = Site(name="Test Site", alert_recipients=json.dumps(["admin@example.com"]))
+    db_session.add(site)
+    db_session.commit()
+    
+    bag = Bag(site_id=site.id, name="Bag", qr_token="00000000-0000-4000-8000-0000000000AB", active=True)
+    db_session.add(bag)
+    db_session.commit()
+    
+    raw = db_session.execute(text("SELECT qr_token FROM bags")).scalar_one()
+    db_session.expire_all()
+    
+    assert len(raw) == 16
+    assert db_session.get(Bag, bag.id).qr_token == "00000000-0000-4000-8000-0000000000ab"
 
 
 def test_create_bag_items(db_session):
@@ -129,7 +147,7 @@ def test_create_bag_items(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Safety Kit", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Safety Kit", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -186,7 +204,7 @@ def test_create_inventory_session(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -213,7 +231,7 @@ def test_create_inventory_results(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -257,7 +275,7 @@ def test_foreign_key_cascade_bag_to_items(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -285,7 +303,7 @@ def test_foreign_key_restrict_site_to_bags(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -303,7 +321,7 @@ def test_foreign_key_cascade_session_to_results(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -336,7 +354,7 @@ def test_foreign_key_set_null_item_to_results(db_session):
     db_session.add(site)
     db_session.commit()
     
-    bag = Bag(site_id=site.id, name="Test Bag", qr_token="test-token", active=True)
+    bag = Bag(site_id=site.id, name="Test Bag", qr_token="00000000-0000-4000-8000-000000000107", active=True)
     db_session.add(bag)
     db_session.commit()
     
@@ -0,0 +1,174 @@
+"""
+Tests for batch QR lookup endpoint (POST /api/qr/batch)
+Public (anonymous) endpoint - no authentication required
+"""
+import pytest
+import os
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from models import Site, Bag, BagItem
+from services.qr_service import QRService, QR_BATCH_MAX_TOKENS
+from services.scan_snapshot_service import ScanSnapshotService
+
+
+TOKEN_A = '00000000-0000-4000-8000-000000000110'
+TOKEN_B = '00000000-0000-4000-8000-000000000111'
+TOKEN_INACTIVE = '00000000-0000-4000-8000-000000000112'
+UNKNOWN_TOKEN = '00000000-0000-4000-8000-0000000001ff'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bags(db_session):
+    """Create two active bags (with items) and one inactive bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.commit()
+    
+    kit_a = Bag(site_id=site.id, name='Kit A', qr_token=TOKEN_A, active=True)
+    kit_b = Bag(site_id=site.id, name='Kit B', qr_token=TOKEN_B, active=True)
+    hidden = Bag(site_id=site.id, name='Hidden', qr_token=TOKEN_INACTIVE, active=False)
+    db_session.add_all([kit_a, kit_b, hidden])
+    db_session.commit()
+    
+    db_session.add_all([
+        BagItem(bag_id=kit_a.id, name='Bandages', expected_qty=10),
+        BagItem(bag_id=kit_a.id, name='Gauze', expected_qty=5),
+        BagItem(bag_id=kit_b.id, name='Flashlight', test_batteries=True)
+    ])
+    db_session.commit()
+    return kit_a, kit_b, hidden
+
+
+def test_batch_returns_all_payloads(client, db_session, bags):
+    """Each requested token maps to the same payload as a single lookup"""
+    response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A, TOKEN_B]})
+    
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results[TOKEN_A] == client.get(f'/api/qr/{TOKEN_A}').get_json()
+    assert [i['name'] for i in results[TOKEN_A]['items']] == ['Bandages', 'Gauze']
+    assert results[TOKEN_B]['bag']['name'] == 'Kit B'
+
+
+def test_batch_not_found_markers_are_identical(client, db_session, bags):
+    """Unknown and inactive tokens get the same marker"""
+    response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_INACTIVE, 'bogus']})
+    
+    results = response.get_json()['results']
+    assert results[TOKEN_INACTIVE] == results['bogus']
+    assert results['bogus']['error']['code'] == 'NOT_FOUND'
+
+
+def test_batch_uses_set_based_queries(client, db_session, bags):
+    """Lookup of many bags costs a fixed number of statements"""
+    client.post('/api/qr/batch', json={'qr_tokens': [UNKNOWN_TOKEN]})  # builds the token filter
+    statements = []
+    
+    def record(*args):
+        statements.append(args[2])
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A, TOKEN_B, TOKEN_INACTIVE]})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    # snapshot IN query + live IN query for bags without snapshots
+    assert len(statements) == 2
+
+
+def test_batch_served_from_snapshots(client, db_session, bags):
+    """With snapshots built, the batch is a single IN query"""
+    ScanSnapshotService.rebuild_all(db_session)
+    client.post('/api/qr/batch', json={'qr_tokens': [UNKNOWN_TOKEN]})  # builds the token filter
+    statements = []
+    
+    def record(*args):
+        statements.append(args[2])
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A, TOKEN_B]})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert len(statements) == 1
+    assert response.get_json()['results'][TOKEN_B]['bag']['name'] == 'Kit B'
+
+
+def test_batch_populates_scan_cache(client, db_session, bags):
+    """Batch results are cached for later single lookups"""
+    client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A]})
+    client.get(f'/api/qr/{TOKEN_A}')
+    
+    assert QRService.cache_stats()['hits'] == 1
+
+
+def test_batch_duplicate_tokens(client, db_session, bags):
+    """Duplicates are returned once"""
+    response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A, TOKEN_A]})
+    assert list(response.get_json()['results']) == [TOKEN_A]
+
+
+def test_batch_size_cap(client, db_session):
+    """More than QR_BATCH_MAX_TOKENS tokens returns 400"""
+    tokens = [f'token-{i}' for i in range(QR_BATCH_MAX_TOKENS + 1)]
+    response = client.post('/api/qr/batch', json={'qr_tokens': tokens})
+    
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_INPUT'
+
+
+@pytest.mark.parametrize('body', [None, {}, {'qr_tokens': []}, {'qr_tokens': TOKEN_A}, {'qr_tokens': ['', 1]}])
+def test_batch_invalid_body(client, db_session, body):
+    """Malformed bodies return 400"""
+    response = client.post('/api/qr/batch', json=body)
+    assert response.status_code == 400
+
+
+def test_batch_response_does_not_expose_other_tokens(client, db_session, bags):
+    """Only requested tokens appear in the response"""
+    response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A]})
+    assert TOKEN_B not in json.dumps(response.get_json())
+
+
+def test_batch_accepts_non_canonical_tokens(client, db_session, bags):
+    """Tokens are matched in canonical UUID form but echoed back as sent"""
+    response = client.post('/api/qr/batch', json={'qr_tokens': [TOKEN_A.upper()]})
+    
+    results = response.get_json()['results']
+    assert results[TOKEN_A.upper()]['bag']['name'] == 'Kit A'
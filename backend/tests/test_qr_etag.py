@@ -0,0 +1,165 @@
+"""
+Tests for ETag / If-None-Match on the public QR lookup endpoint
+"""
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from models import Admin, Site, Bag, BagItem
+from services.auth_service import AuthService
+from services.qr_service import QRService
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user and empty scan cache"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    password_hash = AuthService.hash_password('testpassword123')
+    db.add(Admin(username='admin', password_hash=password_hash))
+    db.commit()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization headers for the test admin"""
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'testpassword123'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def bag_with_item(db_session):
+    """Create an active bag with one item"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.commit()
+    
+    bag = Bag(site_id=site.id, name='Emergency Kit', qr_token='00000000-0000-4000-8000-000000000108', active=True)
+    db_session.add(bag)
+    db_session.commit()
+    
+    item = BagItem(bag_id=bag.id, name='Bandages', expected_qty=10)
+    db_session.add(item)
+    db_session.commit()
+    db_session.refresh(bag)
+    db_session.refresh(item)
+    return bag, item
+
+
+def test_lookup_returns_strong_etag(client, db_session, bag_with_item):
+    """200 response carries a strong ETag"""
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108')
+    
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag
+    assert weak is False
+
+
+def test_matching_if_none_match_returns_304(client, db_session, bag_with_item):
+    """Re-scan with the current ETag returns 304 with no body"""
+    etag = client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']
+    
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_304_with_cold_cache_does_not_load_items(client, db_session, bag_with_item):
+    """Conditional request on a cold cache answers from the bag row only"""
+    etag = client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']
+    QRService.clear_cache()
+    
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 304
+    assert QRService.cache_stats()['size'] == 0
+
+
+def test_stale_if_none_match_returns_200(client, db_session, bag_with_item):
+    """Unknown ETag returns the full body"""
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': '"v1-0-0"'})
+    
+    assert response.status_code == 200
+    assert response.get_json()['bag']['name'] == 'Emergency Kit'
+
+
+def test_item_change_changes_etag(client, db_session, bag_with_item, auth_headers):
+    """Editing an item bumps the bag version, so the old ETag no longer matches"""
+    _, item = bag_with_item
+    etag = client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']
+    
+    client.patch(f'/api/items/{item.id}', json={'expected_qty': 5}, headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['items'][0]['expected_qty'] == 5
+
+
+def test_item_create_and_delete_change_etag(client, db_session, bag_with_item, auth_headers):
+    """Adding and removing items bumps the bag version"""
+    bag, item = bag_with_item
+    etags = {client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']}
+    
+    client.post(f'/api/bags/{bag.id}/items', json={'name': 'Flashlight'}, headers=auth_headers)
+    etags.add(client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag'])
+    
+    client.delete(f'/api/items/{item.id}', headers=auth_headers)
+    etags.add(client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag'])
+    
+    assert len(etags) == 3
+
+
+def test_bag_rename_changes_etag(client, db_session, bag_with_item, auth_headers):
+    """Updating the bag bumps its version"""
+    bag, _ = bag_with_item
+    etag = client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']
+    
+    client.patch(f'/api/bags/{bag.id}', json={'name': 'Renamed'}, headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 200
+    assert response.get_json()['bag']['name'] == 'Renamed'
+
+
+def test_if_none_match_on_inactive_bag_returns_404(client, db_session, bag_with_item, auth_headers):
+    """Conditional request for a deactivated bag returns 404, not 304"""
+    bag, _ = bag_with_item
+    etag = client.get('/api/qr/00000000-0000-4000-8000-000000000108').headers['ETag']
+    
+    client.patch(f'/api/bags/{bag.id}', json={'active': False}, headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000108', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 404
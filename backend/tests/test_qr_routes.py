@@ -20,6 +20,7 @@ os.environ['TESTING'] = 'true'
 from app import app
 from database import Base, engine, SessionLocal
 from models import Site, Bag, BagItem
+from services.qr_service import QRService
 
 
 @pytest.fixture
@@ -34,6 +35,7 @@ def client():
 def db_session():
     """Create test database session"""
     Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
     db = SessionLocal()
     
     yield db
@@ -58,7 +60,7 @@ def active_bag_with_items(db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Emergency Kit',
-        qr_token='test-token-active',
+        qr_token='00000000-0000-4000-8000-000000000102',
         active=True
     )
     db_session.add(bag)
@@ -94,7 +96,7 @@ def active_bag_no_items(db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Empty Bag',
-        qr_token='test-token-empty',
+        qr_token='00000000-0000-4000-8000-000000000104',
         active=True
     )
     db_session.add(bag)
@@ -109,7 +111,7 @@ def inactive_bag(db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Inactive Bag',
-        qr_token='test-token-inactive',
+        qr_token='00000000-0000-4000-8000-000000000103',
         active=False
     )
     db_session.add(bag)
@@ -122,7 +124,7 @@ def inactive_bag(db_session, sample_site):
 
 def test_lookup_valid_bag_with_items(client, db_session, active_bag_with_items):
     """GET /api/qr/<qr_token> with valid token returns 200 with bag and items"""
-    response = client.get('/api/qr/test-token-active')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000102')
     assert response.status_code == 200
     
     data = json.loads(response.data)
@@ -155,7 +157,7 @@ def test_lookup_valid_bag_with_items(client, db_session, active_bag_with_items):
 
 def test_lookup_valid_bag_no_items(client, db_session, active_bag_no_items):
     """GET /api/qr/<qr_token> with valid token but no items returns 200 with empty items array"""
-    response = client.get('/api/qr/test-token-empty')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000104')
     assert response.status_code == 200
     
     data = json.loads(response.data)
@@ -184,9 +186,16 @@ def test_lookup_invalid_token(client, db_session):
     assert 'not found' in data['error']['message'].lower()
 
 
+def test_lookup_non_canonical_token(client, db_session, active_bag_with_items):
+    """GET /api/qr/<qr_token> accepts upper-case UUIDs"""
+    response = client.get('/api/qr/' + '00000000-0000-4000-8000-000000000102'.upper())
+    assert response.status_code == 200
+    assert response.get_json()['bag']['name'] == 'Emergency Kit'
+
+
 def test_lookup_inactive_bag(client, db_session, inactive_bag):
     """GET /api/qr/<qr_token> with inactive bag returns 404 (not 403, to avoid info leakage)"""
-    response = client.get('/api/qr/test-token-inactive')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000103')
     assert response.status_code == 404
     
     data = json.loads(response.data)
@@ -199,7 +208,7 @@ def test_lookup_inactive_bag(client, db_session, inactive_bag):
 
 def test_response_shape_completeness(client, db_session, active_bag_with_items):
     """Verify response contains all required fields"""
-    response = client.get('/api/qr/test-token-active')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000102')
     data = json.loads(response.data)
     
     # Bag fields
@@ -217,7 +226,7 @@ def test_response_shape_completeness(client, db_session, active_bag_with_items):
 
 def test_qr_token_not_in_response(client, db_session, active_bag_with_items):
     """Verify qr_token is NOT exposed in response (security check)"""
-    response = client.get('/api/qr/test-token-active')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000102')
     data = json.loads(response.data)
     
     # Ensure qr_token is not in bag object
@@ -225,7 +234,7 @@ def test_qr_token_not_in_response(client, db_session, active_bag_with_items):
     
     # Convert response to string and check it doesn't contain the token
     response_str = json.dumps(data)
-    assert 'test-token-active' not in response_str
+    assert '00000000-0000-4000-8000-000000000102' not in response_str
 
 
 def test_items_ordered_by_created_at(client, db_session, sample_site):
@@ -236,7 +245,7 @@ def test_items_ordered_by_created_at(client, db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Test Bag',
-        qr_token='test-token-order',
+        qr_token='00000000-0000-4000-8000-000000000106',
         active=True
     )
     db_session.add(bag)
@@ -261,7 +270,7 @@ def test_items_ordered_by_created_at(client, db_session, sample_site):
     db_session.commit()
     
     # Look up bag
-    response = client.get('/api/qr/test-token-order')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000106')
     data = json.loads(response.data)
     
     # Verify order
@@ -277,7 +286,7 @@ def test_multiple_items_all_returned(client, db_session, sample_site):
     bag = Bag(
         site_id=sample_site.id,
         name='Multi-Item Bag',
-        qr_token='test-token-multi',
+        qr_token='00000000-0000-4000-8000-000000000105',
         active=True
     )
     db_session.add(bag)
@@ -295,7 +304,7 @@ def test_multiple_items_all_returned(client, db_session, sample_site):
     db_session.commit()
     
     # Look up bag
-    response = client.get('/api/qr/test-token-multi')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000105')
     data = json.loads(response.data)
     
     # Verify all items returned
@@ -308,10 +317,32 @@ def test_multiple_items_all_returned(client, db_session, sample_site):
 def test_no_authentication_required(client, db_session, active_bag_with_items):
     """Verify endpoint works without authentication (public endpoint)"""
     # No Authorization header provided
-    response = client.get('/api/qr/test-token-active')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000102')
     
     # Should succeed (not 401)
     assert response.status_code == 200
     data = json.loads(response.data)
     assert 'bag' in data
     assert 'items' in data
+
+
+# Lookup mode tests
+
+def test_joined_lookup_matches_two_query_lookup(db_session, active_bag_with_items):
+    """Single-statement lookup returns the same payload as the two-query path"""
+    joined = QRService._load_scan_entry_joined(db_session, '00000000-0000-4000-8000-000000000102')
+    two_query = QRService._load_scan_entry_two_query(db_session, '00000000-0000-4000-8000-000000000102')
+    assert joined == two_query
+
+
+def test_joined_lookup_bag_without_items(db_session, active_bag_no_items):
+    """Single-statement lookup of a bag without items returns an empty items list"""
+    payload = json.loads(QRService._load_scan_entry_joined(db_session, '00000000-0000-4000-8000-000000000104').body)
+    assert payload['bag']['name'] == 'Empty Bag'
+    assert payload['items'] == []
+
+
+def test_joined_lookup_inactive_bag(db_session, inactive_bag):
+    """Single-statement lookup treats inactive bags as not found"""
+    with pytest.raises(ValueError):
+        QRService._load_scan_entry_joined(db_session, '00000000-0000-4000-8000-000000000103')
@@ -0,0 +1,199 @@
+"""
+Tests for the token-bucket rate limiter on anonymous QR endpoints
+"""
+import pytest
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import TokenBucketLimiter, ip_limiter, qr_token_limiter, reset_rate_limits
+from models import Site, Bag
+from services.qr_service import QRService
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    reset_rate_limits()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def sample_bag(db_session):
+    """Create an active bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token='00000000-0000-4000-8000-000000000100', active=True)
+    db_session.add(bag)
+    db_session.commit()
+    return bag
+
+
+@pytest.fixture
+def tight_limits(monkeypatch):
+    """Small buckets that refill too slowly to matter during a test"""
+    monkeypatch.setattr(ip_limiter, 'rate', 0.01)
+    monkeypatch.setattr(ip_limiter, 'burst', 5)
+    monkeypatch.setattr(qr_token_limiter, 'rate', 0.01)
+    monkeypatch.setattr(qr_token_limiter, 'burst', 3)
+
+
+def test_bucket_allows_burst_then_rejects():
+    """A full bucket allows `burst` requests, then returns the wait time"""
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+    
+    assert [limiter.acquire('a') for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = limiter.acquire('a')
+    
+    assert 0 < retry_after <= 0.5
+    assert limiter.acquire('b') == 0.0
+    assert limiter.stats()['rejections'] == 1
+
+
+def test_bucket_refills_lazily(monkeypatch):
+    """Tokens come back at `rate` per second of elapsed time"""
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    limiter = TokenBucketLimiter(rate=1, burst=2)
+    limiter.acquire('a')
+    limiter.acquire('a')
+    assert limiter.acquire('a') == pytest.approx(1.0)
+    
+    now[0] += 1.0
+    
+    assert limiter.acquire('a') == 0.0
+    assert limiter.acquire('a') > 0
+
+
+def test_bucket_memory_is_bounded():
+    """Each shard keeps at most max_keys / shards buckets"""
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=32, shards=4)
+    
+    for i in range(1000):
+        limiter.acquire(f'client-{i}')
+    
+    assert limiter.stats()['keys'] <= 32
+
+
+def test_lookup_rate_limited_per_token(client, sample_bag, tight_limits):
+    """Scans of one token beyond its burst get 429 with Retry-After"""
+    statuses = [client.get('/api/qr/00000000-0000-4000-8000-000000000100').status_code for _ in range(3)]
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000100')
+    
+    assert statuses == [200, 200, 200]
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['error']['code'] == 'RATE_LIMITED'
+    
+    # Another token is only limited by the IP bucket
+    assert client.get('/api/qr/00000000-0000-4000-8000-00000000011b').status_code == 404
+
+
+def test_token_spellings_share_one_bucket(client, sample_bag, tight_limits):
+    """Case and hyphen variants of a token are limited together"""
+    token = '00000000-0000-4000-8000-000000000100'
+    spellings = [token, token.upper(), token.replace('-', '')]
+    
+    statuses = [client.get(f'/api/qr/{spelling}').status_code for spelling in spellings + [token.upper()]]
+    
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_unparsable_tokens_use_no_token_bucket(client, sample_bag, tight_limits):
+    """Garbage tokens are rejected as not found without filling the token limiter"""
+    statuses = [client.get(f'/api/qr/not-a-token-{i}').status_code for i in range(3)]
+    
+    assert statuses == [404] * 3
+    assert qr_token_limiter.stats()['keys'] == 0
+
+
+def test_lookup_rate_limited_per_ip(client, sample_bag, tight_limits):
+    """One client scanning many tokens is limited by its IP bucket"""
+    statuses = [client.get(f'/api/qr/00000000-0000-4000-8000-{i:012d}').status_code for i in range(6)]
+    
+    assert statuses == [404] * 5 + [429]
+
+
+def test_rejected_request_skips_database(client, sample_bag, tight_limits):
+    """Shed requests never reach SQLAlchemy"""
+    for _ in range(3):
+        client.get('/api/qr/00000000-0000-4000-8000-000000000100')
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/qr/00000000-0000-4000-8000-000000000100')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.status_code == 429
+    assert statements == []
+
+
+def test_batch_rate_limited_per_ip(client, sample_bag, tight_limits):
+    """POST /api/qr/batch shares the IP bucket"""
+    statuses = [
+        client.post('/api/qr/batch', json={'qr_tokens': [f'00000000-0000-4000-8000-{i:012d}']}).status_code
+        for i in range(6)
+    ]
+    
+    assert statuses == [200] * 5 + [429]
+
+
+def test_batch_charges_ip_per_token(client, sample_bag, tight_limits):
+    """A batch costs one IP request per token"""
+    tokens = [f'00000000-0000-4000-8000-{i:012d}' for i in range(4)]
+    
+    assert client.post('/api/qr/batch', json={'qr_tokens': tokens}).status_code == 200
+    assert client.post('/api/qr/batch', json={'qr_tokens': tokens[:2]}).status_code == 429
+
+
+def test_batch_rate_limited_per_token(client, sample_bag, tight_limits):
+    """A batch containing a token over its limit is rejected, in any spelling"""
+    for _ in range(3):
+        client.get('/api/qr/00000000-0000-4000-8000-000000000100')
+    
+    response = client.post('/api/qr/batch', json={'qr_tokens': ['00000000-0000-4000-8000-000000000100'.upper()]})
+    
+    assert response.status_code == 429
+    assert response.get_json()['error']['code'] == 'RATE_LIMITED'
+
+
+def test_default_limits_allow_normal_use(client, sample_bag):
+    """A device scanning a bag a few times is never limited"""
+    for _ in range(10):
+        assert client.get('/api/qr/00000000-0000-4000-8000-000000000100').status_code == 200
+    assert ip_limiter.stats()['rejections'] == 0
+    assert qr_token_limiter.stats()['rejections'] == 0
@@ -0,0 +1,150 @@
+"""
+Tests for the site alert recipient cache
+Unit tests for RecipientCache plus its use by site responses and alert analysis
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from models import Admin, Site, Bag, BagItem, InventorySession, InventoryResult, InventoryStatus
+from services.alert_analysis_service import AlertAnalysisService
+from services.auth_service import AuthService
+from services.recipient_cache import RecipientCache, recipient_cache
+
+UPDATED = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user and empty recipient cache"""
+    Base.metadata.create_all(bind=engine)
+    recipient_cache.clear()
+    db = SessionLocal()
+    db.add(Admin(username='admin', password_hash=AuthService.hash_password('testpassword123')))
+    db.commit()
+
+    yield db
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization header of a logged in admin"""
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpassword123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def test_cache_hit_returns_parsed_list():
+    """An unchanged site is parsed once"""
+    cache = RecipientCache()
+    first = cache.get(1, UPDATED, '["a@example.com"]')
+
+    assert cache.get(1, UPDATED, '["a@example.com"]') is first
+    assert first == ['a@example.com']
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_changed_site_is_reparsed():
+    """A new updated_at or different JSON text misses"""
+    cache = RecipientCache()
+    cache.get(1, UPDATED, '["a@example.com"]')
+
+    assert cache.get(1, datetime(2026, 10, 18, tzinfo=timezone.utc), '["b@example.com"]') == ['b@example.com']
+    assert cache.get(1, datetime(2026, 10, 18, tzinfo=timezone.utc), '["c@example.com"]') == ['c@example.com']
+    assert cache.stats()['misses'] == 3
+
+
+def test_least_recently_used_site_is_evicted():
+    """The cache stays within max_size"""
+    cache = RecipientCache(max_size=2)
+    cache.get(1, None, '["a@example.com"]')
+    cache.get(2, None, '["b@example.com"]')
+    cache.get(1, None, '["a@example.com"]')
+    cache.get(3, None, '["c@example.com"]')
+
+    assert cache.stats()['size'] == 2
+    assert cache.stats()['evictions'] == 1
+    cache.get(2, None, '["b@example.com"]')
+    assert cache.stats()['misses'] == 4
+
+
+def test_invalid_max_size():
+    """max_size must be positive"""
+    with pytest.raises(ValueError):
+        RecipientCache(max_size=0)
+
+
+def test_site_responses_use_cache(client, db_session, auth_headers):
+    """Listing sites repeatedly parses each site's recipients once"""
+    for name in ('North', 'South'):
+        client.post('/api/sites', json={'name': name, 'alert_recipients': [f'{name.lower()}@example.com']},
+                    headers=auth_headers)
+
+    for _ in range(3):
+        response = client.get('/api/sites', headers=auth_headers)
+
+    assert sorted(site['alert_recipients'][0] for site in response.get_json()['sites']) == [
+        'north@example.com', 'south@example.com'
+    ]
+    assert recipient_cache.stats()['misses'] == 2
+
+
+def test_update_site_invalidates(client, db_session, auth_headers):
+    """Updated recipients are returned right after the update"""
+    site_id = client.post('/api/sites', json={'name': 'North', 'alert_recipients': ['old@example.com']},
+                          headers=auth_headers).get_json()['id']
+    client.get(f'/api/sites/{site_id}', headers=auth_headers)
+
+    response = client.patch(f'/api/sites/{site_id}', json={'alert_recipients': ['new@example.com']},
+                            headers=auth_headers)
+
+    assert response.get_json()['alert_recipients'] == ['new@example.com']
+    assert client.get(f'/api/sites/{site_id}', headers=auth_headers).get_json()['alert_recipients'] == [
+        'new@example.com'
+    ]
+
+
+def test_alert_analysis_shares_cache(db_session):
+    """Alerts of many sessions of a site parse its recipients once"""
+    site = Site(name='North', alert_recipients='["north@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token='00000000-0000-4000-8000-000000002501', active=True)
+    db_session.add(bag)
+    db_session.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db_session.add(item)
+    db_session.flush()
+    sessions = [InventorySession(bag_id=bag.id) for _ in range(5)]
+    db_session.add_all(sessions)
+    db_session.flush()
+    db_session.add_all([InventoryResult(session_id=session.id, bag_item_id=item.id, status=InventoryStatus.MISSING)
+                        for session in sessions])
+    db_session.commit()
+
+    alerts = AlertAnalysisService.analyze_sessions(db_session, [session.id for session in sessions])
+
+    assert all(alert['recipients'] == ['north@example.com'] for alert in alerts.values())
+    assert (recipient_cache.stats()['misses'], recipient_cache.stats()['hits']) == (1, 4)
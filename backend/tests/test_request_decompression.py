@@ -0,0 +1,206 @@
+"""
+Tests for compressed request bodies (Content-Encoding: gzip / zstd)
+"""
+import pytest
+import gzip
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from middleware.request_decompression import (
+    InvalidRequestEncoding, RequestDecompressionMiddleware, decompressing_stream
+)
+from models import Site, Bag, BagItem, InventorySession, InventoryResult
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000001201'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def item_id(db_session):
+    """Id of the only item of an active bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db_session.add(item)
+    db_session.commit()
+    return item.id
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    """Lower the decompressed-size limit of the app's middleware to 2 KiB"""
+    middleware = app.wsgi_app
+    assert isinstance(middleware, RequestDecompressionMiddleware)
+    monkeypatch.setattr(middleware, 'max_bytes', 2048)
+
+
+def submission(item_id, notes='ok'):
+    return {'nickname': 'Sam', 'results': [{'bag_item_id': item_id, 'status': 'present', 'notes': notes}]}
+
+
+def post_gzip(client, url, body: bytes, content_type='application/json', encoding='gzip'):
+    return client.post(url, data=gzip.compress(body), content_type=content_type,
+                       headers={'Content-Encoding': encoding})
+
+
+def test_gzip_submission(client, db_session, item_id):
+    """A gzip-encoded submission is stored like a plain one"""
+    response = post_gzip(client, f'/api/inventory/{TOKEN}', json.dumps(submission(item_id)).encode())
+    
+    assert response.status_code == 201
+    assert db_session.query(InventoryResult).one().notes == 'ok'
+
+
+def test_x_gzip_alias(client, db_session, item_id):
+    """x-gzip is accepted as gzip"""
+    response = post_gzip(client, f'/api/inventory/{TOKEN}', json.dumps(submission(item_id)).encode(),
+                         encoding='x-gzip')
+    
+    assert response.status_code == 201
+
+
+def test_gzip_bulk_upload(client, db_session, item_id):
+    """A gzip-encoded NDJSON body is parsed line by line"""
+    lines = [json.dumps({'qr_token': TOKEN, 'idempotency_key': f'k{i}', **submission(item_id)})
+             for i in range(3)]
+    
+    response = post_gzip(client, '/api/inventory/bulk', ('\n'.join(lines) + '\n').encode(),
+                         content_type='application/x-ndjson')
+    
+    outcomes = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [outcome['ok'] for outcome in outcomes] == [True, True, True]
+    assert db_session.query(InventorySession).count() == 3
+
+
+def test_corrupt_gzip_body(client, db_session, item_id):
+    """Data that is not gzip, or gzip cut short, returns 400"""
+    body = gzip.compress(json.dumps(submission(item_id)).encode())
+    
+    for data in [b'not gzip at all', body[:len(body) // 2]]:
+        response = client.post(f'/api/inventory/{TOKEN}', data=data, content_type='application/json',
+                               headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == 400
+        assert response.get_json()['error']['code'] == 'INVALID_INPUT'
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_decompressed_size_limit(client, db_session, item_id, small_limit):
+    """A body inflating past the limit returns 413 (a small compressed size does not help)"""
+    body = json.dumps(submission(item_id, notes='x' * 100000)).encode()
+    
+    response = post_gzip(client, f'/api/inventory/{TOKEN}', body)
+    
+    assert response.status_code == 413
+    assert response.get_json()['error']['code'] == 'PAYLOAD_TOO_LARGE'
+    assert db_session.query(InventorySession).count() == 0
+
+
+def test_bulk_size_limit_ends_stream(client, db_session, item_id, small_limit):
+    """A bulk body over the limit ends the response stream with an error line"""
+    lines = [json.dumps({'qr_token': TOKEN, 'idempotency_key': f'k{i}', **submission(item_id)})
+             for i in range(50)]
+    
+    response = post_gzip(client, '/api/inventory/bulk', ('\n'.join(lines) + '\n').encode(),
+                         content_type='application/x-ndjson')
+    
+    outcomes = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert outcomes[-1] == {'ok': False, 'error': {
+        'code': 'PAYLOAD_TOO_LARGE', 'message': 'Decompressed request body exceeds 2048 bytes'
+    }}
+    assert db_session.query(InventorySession).count() == len(outcomes) - 1
+
+
+def test_unsupported_encoding(client, db_session, item_id):
+    """Unknown encodings are refused with 415 before the route runs"""
+    response = client.post(f'/api/inventory/{TOKEN}', data=b'...', content_type='application/json',
+                           headers={'Content-Encoding': 'br'})
+    
+    assert response.status_code == 415
+    assert response.get_json()['error']['code'] == 'UNSUPPORTED_ENCODING'
+    assert 'gzip' in response.headers['Accept-Encoding']
+
+
+def test_identity_and_plain_bodies(client, db_session, item_id):
+    """Uncompressed bodies are untouched"""
+    response = client.post(f'/api/inventory/{TOKEN}', json=submission(item_id),
+                           headers={'Content-Encoding': 'identity'})
+    
+    assert response.status_code == 201
+
+
+def test_zstd_submission(client, db_session, item_id):
+    """A zstd-encoded submission is stored (needs the optional zstandard package)"""
+    zstandard = pytest.importorskip('zstandard')
+    body = zstandard.ZstdCompressor().compress(json.dumps(submission(item_id)).encode())
+    
+    response = client.post(f'/api/inventory/{TOKEN}', data=body, content_type='application/json',
+                           headers={'Content-Encoding': 'zstd'})
+    
+    assert response.status_code == 201
+
+
+def test_stream_reads_are_bounded():
+    """A compression bomb fails once the limit is passed, without inflating the rest"""
+    bomb = gzip.compress(b'\0' * (20 * 1024 * 1024))
+    stream = decompressing_stream(io.BytesIO(bomb), 'gzip', max_bytes=1024 * 1024)
+    
+    with pytest.raises(RequestEntityTooLarge):
+        stream.read()
+    assert stream.raw.bytes_read <= 1024 * 1024 + 65536
+
+
+def test_stream_multi_member_gzip():
+    """Concatenated gzip members decompress as one body"""
+    stream = decompressing_stream(io.BytesIO(gzip.compress(b'a\n') + gzip.compress(b'b\n')), 'gzip')
+    
+    assert stream.readline() == b'a\n'
+    assert stream.read() == b'b\n'
+
+
+def test_stream_invalid_data():
+    """Decoder errors surface as InvalidRequestEncoding"""
+    stream = decompressing_stream(io.BytesIO(b'\x1f\x8bgarbage'), 'gzip')
+    
+    with pytest.raises(InvalidRequestEncoding):
+        stream.read()
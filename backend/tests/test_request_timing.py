@@ -0,0 +1,140 @@
+"""
+Tests for per-stage request timing (Server-Timing header and histograms)
+"""
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from middleware.timing import Histogram, StageTimer, reset_timings, stage, timing_stats
+from models import Site, Bag, BagItem
+from services.qr_service import QRService
+
+TOKEN = '00000000-0000-4000-8000-000000001001'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty caches, rate limits and timings"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    reset_timings()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def item(db_session):
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    bag = Bag(site_id=site.id, name='Kit', qr_token=TOKEN, active=True)
+    db_session.add(bag)
+    db_session.flush()
+    item = BagItem(bag_id=bag.id, name='Bandages')
+    db_session.add(item)
+    db_session.commit()
+    return item
+
+
+def server_timing(response):
+    """Parse Server-Timing into {name: duration_ms}"""
+    entries = {}
+    for entry in response.headers['Server-Timing'].split(', '):
+        name, duration = entry.split(';dur=')
+        entries[name] = float(duration)
+    return entries
+
+
+def test_submission_reports_stages(client, db_session, item):
+    """A stored submission reports every stage and the total in Server-Timing"""
+    response = client.post(f'/api/inventory/{TOKEN}',
+                           json={'results': [{'bag_item_id': item.id, 'status': 'present'}]})
+    
+    assert response.status_code == 201
+    timings = server_timing(response)
+    assert list(timings) == ['parse', 'validate', 'resolve', 'write', 'total']
+    assert timings['total'] >= sum(d for name, d in timings.items() if name != 'total')
+
+
+def test_submission_errors_are_timed(client, db_session, item):
+    """Rejected submissions still carry Server-Timing (only the stages they ran)"""
+    response = client.post('/api/inventory/00000000-0000-4000-8000-0000000010ff',
+                           json={'results': [{'bag_item_id': item.id, 'status': 'present'}]})
+    
+    assert response.status_code == 404
+    assert list(server_timing(response)) == ['parse', 'validate', 'resolve', 'total']
+
+
+def test_undecodable_body_is_timed(client, db_session, item):
+    """A 400 raised while reading the body is rendered inside the timing"""
+    response = client.post(f'/api/inventory/{TOKEN}', data=b'not gzip at all', content_type='application/json',
+                           headers={'Content-Encoding': 'gzip'})
+    
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_INPUT'
+    assert 'total' in server_timing(response)
+    assert timing_stats()['inventory_submission_duration_ms']['count'] == 1
+
+
+def test_timings_are_aggregated_in_metrics(client, db_session, item):
+    """Totals and per-stage histograms are exposed by timing_stats()"""
+    for _ in range(3):
+        client.post(f'/api/inventory/{TOKEN}', json={'results': [{'bag_item_id': item.id, 'status': 'present'}]})
+    
+    stats = timing_stats()
+    
+    assert stats['inventory_submission_duration_ms']['count'] == 3
+    assert stats['inventory_submission_stage_ms']['write']['count'] == 3
+    assert stats['inventory_submission_duration_ms']['buckets']['+Inf'] == 3
+
+
+def test_stage_is_noop_outside_timed_request():
+    """Services can be called outside a timed request"""
+    with stage('write'):
+        pass
+
+
+def test_histogram_percentiles():
+    """Percentiles are bucket upper bounds; the overflow bucket reports the max"""
+    histogram = Histogram(bounds=(1, 10, 100))
+    for value in [0.5] * 90 + [50] * 9 + [700]:
+        histogram.observe(value)
+    
+    assert histogram.percentile(0.5) == 1
+    assert histogram.percentile(0.95) == 100
+    assert histogram.percentile(1.0) == 700
+    assert histogram.stats()['buckets'] == {'1': 90, '10': 90, '100': 99, '+Inf': 100}
+
+
+def test_repeated_stage_adds_up():
+    """A stage entered twice reports its summed duration"""
+    timer = StageTimer()
+    timer.add('validate', 1.5)
+    timer.add('validate', 2.0)
+    
+    assert timer.server_timing(5.0) == 'validate;dur=3.500, total;dur=5.000'
@@ -0,0 +1,175 @@
+"""
+Tests for the per-site offline scan bundle (GET /api/sites/<id>/scan-bundle)
+"""
+import pytest
+import os
+import sys
+import gzip
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from models import Admin, Site, Bag, BagItem
+from services.auth_service import AuthService
+from services.qr_service import QRService
+
+TOKEN_A = '00000000-0000-4000-8000-000000000a01'
+TOKEN_B = '00000000-0000-4000-8000-000000000a02'
+TOKEN_INACTIVE = '00000000-0000-4000-8000-000000000a03'
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user and empty scan caches"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    password_hash = AuthService.hash_password('testpassword123')
+    db.add(Admin(username='admin', password_hash=password_hash))
+    db.commit()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization headers for the test admin"""
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'testpassword123'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def site_bags(db_session):
+    """A site with two active bags (one with items) and one inactive bag, last changed days ago"""
+    site = Site(name='Remote Site', alert_recipients='["admin@example.com"]')
+    other = Site(name='Other Site', alert_recipients='["admin@example.com"]')
+    db_session.add_all([site, other])
+    db_session.flush()
+    
+    day_ago = datetime.now() - timedelta(days=1)
+    kit_a = Bag(site_id=site.id, name='Kit A', qr_token=TOKEN_A, active=True, created_at=day_ago - timedelta(days=1))
+    kit_b = Bag(site_id=site.id, name='Kit B', qr_token=TOKEN_B, active=True, created_at=day_ago)
+    hidden = Bag(site_id=site.id, name='Hidden', qr_token=TOKEN_INACTIVE, active=False, created_at=day_ago)
+    elsewhere = Bag(site_id=other.id, name='Elsewhere', qr_token='00000000-0000-4000-8000-000000000a04',
+                    active=True, created_at=day_ago)
+    db_session.add_all([kit_a, kit_b, hidden, elsewhere])
+    db_session.flush()
+    db_session.add_all([BagItem(bag_id=kit_a.id, name='Bandages'), BagItem(bag_id=kit_a.id, name='Gauze')])
+    db_session.commit()
+    return site, kit_a, kit_b
+
+
+def get_bundle(client, site_id, auth_headers, since=None):
+    """Fetch and decode a bundle without compression"""
+    url = f'/api/sites/{site_id}/scan-bundle'
+    response = client.get(url, query_string={'since': since} if since else None, headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_full_bundle(client, db_session, site_bags, auth_headers):
+    """Full bundle has every active bag of the site with its exact scan body"""
+    site, kit_a, kit_b = site_bags
+    
+    bundle = get_bundle(client, site.id, auth_headers)
+    
+    assert bundle['full'] is True
+    assert bundle['site_id'] == site.id
+    assert bundle['active_bag_ids'] == [kit_a.id, kit_b.id]
+    assert [b['qr_token'] for b in bundle['bags']] == [TOKEN_A, TOKEN_B]
+    
+    scan = client.get(f'/api/qr/{TOKEN_A}')
+    assert bundle['bags'][0]['scan'] == scan.get_json()
+    assert f'"{bundle["bags"][0]["etag"]}"' == scan.headers['ETag']
+
+
+def test_delta_bundle_contains_changed_bags_only(client, db_session, site_bags, auth_headers):
+    """since=<version> returns bags whose bag or items changed after that version"""
+    site, kit_a, kit_b = site_bags
+    version = get_bundle(client, site.id, auth_headers)['version']
+    
+    # Only the bag changed at the version itself is resent (sync overlap)
+    idle = get_bundle(client, site.id, auth_headers, since=version)
+    assert idle['full'] is False
+    assert [b['qr_token'] for b in idle['bags']] == [TOKEN_B]
+    
+    client.post(f'/api/bags/{kit_a.id}/items', json={'name': 'Splint'}, headers=auth_headers)
+    delta = get_bundle(client, site.id, auth_headers, since=version)
+    
+    assert [b['qr_token'] for b in delta['bags']] == [TOKEN_A, TOKEN_B]
+    assert [i['name'] for i in delta['bags'][0]['scan']['items']] == ['Bandages', 'Gauze', 'Splint']
+    assert delta['version'] > version
+    
+    assert [b['qr_token'] for b in get_bundle(client, site.id, auth_headers, since=delta['version'])['bags']] == [TOKEN_A]
+
+
+def test_delta_lists_active_bags_for_pruning(client, db_session, site_bags, auth_headers):
+    """Deactivated bags drop out of active_bag_ids"""
+    site, kit_a, kit_b = site_bags
+    version = get_bundle(client, site.id, auth_headers)['version']
+    
+    client.patch(f'/api/bags/{kit_a.id}', json={'active': False}, headers=auth_headers)
+    delta = get_bundle(client, site.id, auth_headers, since=version)
+    
+    assert delta['active_bag_ids'] == [kit_b.id]
+    assert TOKEN_A not in [b['qr_token'] for b in delta['bags']]
+
+
+def test_bundle_gzip(client, db_session, site_bags, auth_headers):
+    """Clients accepting gzip get a compressed body"""
+    site, _, _ = site_bags
+    
+    response = client.get(f'/api/sites/{site.id}/scan-bundle',
+                          headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+    
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    bundle = json.loads(gzip.decompress(response.data))
+    assert len(bundle['bags']) == 2
+
+
+def test_bundle_requires_auth(client, db_session, site_bags):
+    """Bundle contains QR tokens: authentication required"""
+    site, _, _ = site_bags
+    assert client.get(f'/api/sites/{site.id}/scan-bundle').status_code == 401
+
+
+def test_bundle_site_not_found(client, db_session, auth_headers):
+    """Unknown site returns 404"""
+    response = client.get('/api/sites/999/scan-bundle', headers=auth_headers)
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'NOT_FOUND'
+
+
+def test_bundle_invalid_since(client, db_session, site_bags, auth_headers):
+    """A since value that is not a version returns 400"""
+    site, _, _ = site_bags
+    response = client.get(f'/api/sites/{site.id}/scan-bundle?since=yesterday', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_INPUT'
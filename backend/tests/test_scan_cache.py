@@ -0,0 +1,245 @@
+"""
+Tests for the QR scan payload cache
+Unit tests for ScanCache plus read-through/invalidation through the API
+"""
+import pytest
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from app import app
+from database import Base, engine, SessionLocal
+from middleware.rate_limit import reset_rate_limits
+from models import Admin, Site, Bag, BagItem
+from services.auth_service import AuthService
+from services.qr_service import QRService
+from services import scan_cache as scan_cache_module
+from services.scan_cache import ScanCache, scan_cache
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user, empty scan cache and rate limits"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    reset_rate_limits()
+    db = SessionLocal()
+    
+    password_hash = AuthService.hash_password('testpassword123')
+    db.add(Admin(username='admin', password_hash=password_hash))
+    db.commit()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization headers for the test admin"""
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'testpassword123'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def bag_with_item(db_session):
+    """Create an active bag with one item"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.commit()
+    
+    bag = Bag(site_id=site.id, name='Emergency Kit', qr_token='00000000-0000-4000-8000-000000000109', active=True)
+    db_session.add(bag)
+    db_session.commit()
+    
+    item = BagItem(bag_id=bag.id, name='Bandages', expected_qty=10)
+    db_session.add(item)
+    db_session.commit()
+    db_session.refresh(bag)
+    db_session.refresh(item)
+    return bag, item
+
+
+# ScanCache unit tests
+
+def test_cache_hit_and_miss_counters():
+    """get() counts misses and hits"""
+    cache = ScanCache(max_size=2)
+    assert cache.get('a') is None
+    cache.put('a', 1, {'bag': 1})
+    assert cache.get('a') == {'bag': 1}
+    
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """When full, the least recently used entry is evicted"""
+    cache = ScanCache(max_size=2)
+    cache.put('a', 1, 'A')
+    cache.put('b', 2, 'B')
+    cache.get('a')  # 'b' is now least recently used
+    cache.put('c', 3, 'C')
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_invalidate_by_bag_id():
+    """invalidate_bag() drops the entry of that bag only"""
+    cache = ScanCache(max_size=4)
+    cache.put('a', 1, 'A')
+    cache.put('b', 2, 'B')
+    cache.invalidate_bag(1)
+    
+    assert cache.get('a') is None
+    assert cache.get('b') == 'B'
+
+
+def test_cache_put_skipped_after_concurrent_invalidation():
+    """A payload loaded before an invalidation is not stored"""
+    cache = ScanCache(max_size=4)
+    generation = cache.generation
+    cache.invalidate_bag(1)
+    cache.put('a', 1, 'stale', generation=generation)
+    
+    assert cache.get('a') is None
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    """Entries older than ttl are misses and are dropped"""
+    now = [1000.0]
+    monkeypatch.setattr(scan_cache_module.time, 'monotonic', lambda: now[0])
+    cache = ScanCache(max_size=4, ttl=5)
+    cache.put('a', 1, 'A')
+    now[0] += 4.9
+    assert cache.get('a') == 'A'
+    now[0] += 0.1
+    
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['size'], stats['expirations'], stats['misses']) == (0, 1, 1)
+
+
+def test_cache_rejects_invalid_size():
+    """max_size must be positive"""
+    with pytest.raises(ValueError):
+        ScanCache(max_size=0)
+
+
+# Read-through and invalidation via the API
+
+def test_lookup_served_from_cache(client, db_session, bag_with_item):
+    """Second scan of the same token is a cache hit"""
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    assert response.status_code == 200
+    stats = QRService.cache_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+def test_item_update_invalidates_cache(client, db_session, bag_with_item, auth_headers):
+    """PATCH /api/items/<id> is visible on the next scan"""
+    _, item = bag_with_item
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    client.patch(f'/api/items/{item.id}', json={'name': 'Gauze'}, headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    assert response.get_json()['items'][0]['name'] == 'Gauze'
+
+
+def test_item_create_and_delete_invalidate_cache(client, db_session, bag_with_item, auth_headers):
+    """Adding and removing items is visible on the next scan"""
+    bag, item = bag_with_item
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    client.post(f'/api/bags/{bag.id}/items', json={'name': 'Flashlight'}, headers=auth_headers)
+    assert len(client.get('/api/qr/00000000-0000-4000-8000-000000000109').get_json()['items']) == 2
+    
+    client.delete(f'/api/items/{item.id}', headers=auth_headers)
+    items = client.get('/api/qr/00000000-0000-4000-8000-000000000109').get_json()['items']
+    assert [i['name'] for i in items] == ['Flashlight']
+
+
+def test_bag_deactivation_invalidates_cache(client, db_session, bag_with_item, auth_headers):
+    """Deactivated bags stop being served from cache"""
+    bag, _ = bag_with_item
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    client.patch(f'/api/bags/{bag.id}', json={'active': False}, headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    assert response.status_code == 404
+
+
+def test_change_by_other_process_served_until_ttl(client, db_session, bag_with_item, auth_headers, monkeypatch):
+    """A process that missed the invalidation serves the old payload for at most the ttl"""
+    now = [1000.0]
+    monkeypatch.setattr(scan_cache_module.time, 'monotonic', lambda: now[0])
+    bag, _ = bag_with_item
+    token = '00000000-0000-4000-8000-000000000109'
+    client.get(f'/api/qr/{token}')
+    stale = scan_cache.get(token)
+    client.patch(f'/api/bags/{bag.id}', json={'active': False}, headers=auth_headers)
+    # Another worker process still holds the payload it cached before the change
+    scan_cache.put(token, bag.id, stale)
+    assert client.get(f'/api/qr/{token}').status_code == 200
+    
+    now[0] += scan_cache.ttl
+    
+    assert client.get(f'/api/qr/{token}').status_code == 404
+
+
+def test_bag_delete_invalidates_cache(client, db_session, bag_with_item, auth_headers):
+    """Deleted bags stop being served from cache"""
+    bag, _ = bag_with_item
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    client.delete(f'/api/bags/{bag.id}', headers=auth_headers)
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    
+    assert response.status_code == 404
+
+
+def test_metrics_exposes_cache_stats(client, db_session, bag_with_item, auth_headers):
+    """GET /api/metrics returns scan cache counters"""
+    client.get('/api/qr/00000000-0000-4000-8000-000000000109')
+    response = client.get('/api/metrics', headers=auth_headers)
+    
+    assert response.status_code == 200
+    stats = response.get_json()['scan_cache']
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+
+def test_metrics_requires_auth(client, db_session):
+    """GET /api/metrics without token returns 401"""
+    response = client.get('/api/metrics')
+    assert response.status_code == 401
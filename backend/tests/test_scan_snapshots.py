@@ -0,0 +1,182 @@
+"""
+Tests for pre-serialized QR scan snapshots (bag_scan_snapshots)
+"""
+import pytest
+import os
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from models import Admin, Site, Bag, BagItem, BagScanSnapshot
+from services.auth_service import AuthService
+from services.qr_service import QRService
+from services.scan_snapshot_service import ScanSnapshotService
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user and empty scan caches"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    password_hash = AuthService.hash_password('testpassword123')
+    db.add(Admin(username='admin', password_hash=password_hash))
+    db.commit()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization headers for the test admin"""
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'testpassword123'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def sample_site(db_session):
+    """Create a sample site"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.commit()
+    db_session.refresh(site)
+    return site
+
+
+@pytest.fixture
+def api_bag(client, sample_site, auth_headers):
+    """Create a bag through the API (snapshot built on write)"""
+    response = client.post(f'/api/sites/{sample_site.id}/bags', json={'name': 'Kit'},
+                           headers=auth_headers)
+    return response.get_json()
+
+
+def get_snapshot(db_session, bag_id):
+    """Fetch the snapshot row of a bag (fresh read)"""
+    db_session.expire_all()
+    return db_session.query(BagScanSnapshot).filter(BagScanSnapshot.bag_id == bag_id).first()
+
+
+def test_create_bag_builds_snapshot(client, db_session, api_bag):
+    """POST /api/sites/<id>/bags writes the scan snapshot"""
+    snapshot = get_snapshot(db_session, api_bag['id'])
+    
+    assert snapshot is not None
+    assert snapshot.qr_token == api_bag['qr_token']
+    assert json.loads(snapshot.payload) == {
+        'bag': {'id': api_bag['id'], 'site_id': api_bag['site_id'], 'name': 'Kit', 'active': True},
+        'items': []
+    }
+
+
+def test_item_changes_rebuild_snapshot(client, db_session, api_bag, auth_headers):
+    """Item create/update/delete rewrite the snapshot in the same transaction"""
+    response = client.post(f"/api/bags/{api_bag['id']}/items", json={'name': 'Bandages'},
+                           headers=auth_headers)
+    item_id = response.get_json()['id']
+    assert json.loads(get_snapshot(db_session, api_bag['id']).payload)['items'][0]['name'] == 'Bandages'
+    
+    client.patch(f'/api/items/{item_id}', json={'name': 'Gauze'}, headers=auth_headers)
+    assert json.loads(get_snapshot(db_session, api_bag['id']).payload)['items'][0]['name'] == 'Gauze'
+    
+    client.delete(f'/api/items/{item_id}', headers=auth_headers)
+    assert json.loads(get_snapshot(db_session, api_bag['id']).payload)['items'] == []
+
+
+def test_deactivate_removes_snapshot(client, db_session, api_bag, auth_headers):
+    """Inactive bags have no snapshot"""
+    client.patch(f"/api/bags/{api_bag['id']}", json={'active': False}, headers=auth_headers)
+    assert get_snapshot(db_session, api_bag['id']) is None
+    
+    client.patch(f"/api/bags/{api_bag['id']}", json={'active': True}, headers=auth_headers)
+    assert get_snapshot(db_session, api_bag['id']) is not None
+
+
+def test_delete_bag_removes_snapshot(client, db_session, api_bag, auth_headers):
+    """Deleting a bag deletes its snapshot"""
+    client.delete(f"/api/bags/{api_bag['id']}", headers=auth_headers)
+    assert get_snapshot(db_session, api_bag['id']) is None
+
+
+def test_snapshot_etag_matches_bag_version(client, db_session, api_bag, auth_headers):
+    """Snapshot ETag equals the ETag derived from the bag row"""
+    client.post(f"/api/bags/{api_bag['id']}/items", json={'name': 'Bandages'}, headers=auth_headers)
+    
+    snapshot = get_snapshot(db_session, api_bag['id'])
+    QRService.clear_cache()
+    assert snapshot.etag == QRService.get_scan_etag(db_session, api_bag['qr_token'])
+
+
+def test_scan_is_single_snapshot_read(client, db_session, api_bag):
+    """With a built token filter and cold cache, a scan is one SQL statement"""
+    client.get('/api/qr/00000000-0000-4000-8000-00000000011a')  # builds the token filter
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f"/api/qr/{api_bag['qr_token']}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert response.status_code == 200
+    assert response.get_json()['bag']['name'] == 'Kit'
+    assert len(statements) == 1
+    assert 'bag_scan_snapshots' in statements[0]
+
+
+def test_bag_without_snapshot_falls_back_to_live_query(client, db_session, sample_site):
+    """Bags written outside the services are still served"""
+    bag = Bag(site_id=sample_site.id, name='Legacy Kit', qr_token='00000000-0000-4000-8000-00000000010d', active=True)
+    db_session.add(bag)
+    db_session.commit()
+    
+    response = client.get('/api/qr/00000000-0000-4000-8000-00000000010d')
+    
+    assert response.status_code == 200
+    assert response.get_json()['bag']['name'] == 'Legacy Kit'
+
+
+def test_rebuild_all(db_session, sample_site):
+    """rebuild_all writes one snapshot per active bag"""
+    active = Bag(site_id=sample_site.id, name='Active', qr_token='00000000-0000-4000-8000-00000000010c', active=True)
+    inactive = Bag(site_id=sample_site.id, name='Inactive', qr_token='00000000-0000-4000-8000-00000000010b', active=False)
+    db_session.add_all([active, inactive])
+    db_session.commit()
+    db_session.add(BagItem(bag_id=active.id, name='Bandages'))
+    db_session.commit()
+    
+    count = ScanSnapshotService.rebuild_all(db_session)
+    
+    assert count == 1
+    snapshot = get_snapshot(db_session, active.id)
+    assert json.loads(snapshot.payload)['items'][0]['name'] == 'Bandages'
+    assert get_snapshot(db_session, inactive.id) is None
@@ -0,0 +1,123 @@
+"""
+Tests for the QR scan warm-up (scan cache and scan snapshots)
+"""
+import pytest
+import os
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from database import Base, engine, SessionLocal
+from models import Site, Bag, BagItem, BagScanSnapshot
+from services.qr_service import QRService
+from services.scan_cache import scan_cache
+from services.scan_warmup import iter_scan_chunks, warm_scan_cache, warm_scan_snapshots
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with empty scan caches"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    yield db
+    
+    db.close()
+    QRService.clear_cache()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def bags(db_session):
+    """Five active bags with two items each, plus one inactive bag"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.flush()
+    
+    active = [Bag(site_id=site.id, name=f'Kit {i}', qr_token=f'00000000-0000-4000-8000-{i:012d}', active=True) for i in range(5)]
+    inactive = Bag(site_id=site.id, name='Retired', qr_token='00000000-0000-4000-8000-000000000113', active=False)
+    db_session.add_all(active + [inactive])
+    db_session.flush()
+    for bag in active:
+        db_session.add_all([BagItem(bag_id=bag.id, name='Bandages'), BagItem(bag_id=bag.id, name='Gauze')])
+    db_session.commit()
+    return active
+
+
+def test_iter_scan_chunks(db_session, bags):
+    """Active bags are yielded in id order, chunk_size bags per chunk"""
+    chunks = list(iter_scan_chunks(db_session, 2))
+    
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    tokens = [token for chunk in chunks for token, _ in chunk]
+    assert tokens == [f'00000000-0000-4000-8000-{i:012d}' for i in range(5)]
+    payload = json.loads(chunks[0][0][1].body)
+    assert [item['name'] for item in payload['items']] == ['Bandages', 'Gauze']
+
+
+def test_warm_scan_cache_fills_cache(db_session, bags):
+    """Warm-up caches every active bag; scans then issue no SQL"""
+    result = warm_scan_cache(db_session, time_budget_seconds=30, chunk_size=2)
+    
+    assert result == {'cached': 5, 'completed': 1}
+    assert scan_cache.stats()['size'] == 5
+    
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        entry = QRService.lookup_scan(db_session, '00000000-0000-4000-8000-000000000003')
+        with pytest.raises(ValueError):
+            QRService.lookup_scan(db_session, '00000000-0000-4000-8000-00000000011d')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    
+    assert json.loads(entry.body)['bag']['name'] == 'Kit 3'
+    assert statements == []
+
+
+def test_warm_scan_cache_respects_time_budget(db_session, bags):
+    """An exhausted budget stops warm-up before the first chunk"""
+    result = warm_scan_cache(db_session, time_budget_seconds=-1, chunk_size=2)
+    
+    assert result == {'cached': 0, 'completed': 0}
+    assert scan_cache.stats()['size'] == 0
+
+
+def test_warm_scan_cache_stops_when_cache_full(db_session, bags, monkeypatch):
+    """Warm-up never evicts its own entries"""
+    monkeypatch.setattr(scan_cache, 'max_size', 3)
+    
+    result = warm_scan_cache(db_session, time_budget_seconds=30, chunk_size=2)
+    
+    assert result == {'cached': 3, 'completed': 0}
+    assert scan_cache.stats()['evictions'] == 0
+
+
+def test_warm_scan_snapshots_writes_missing_only(db_session, bags):
+    """Only bags without a snapshot get one; existing snapshots are kept"""
+    db_session.add(BagScanSnapshot(qr_token='00000000-0000-4000-8000-000000000000', bag_id=bags[0].id, etag='existing', payload='{}'))
+    db_session.commit()
+    
+    result = warm_scan_snapshots(db_session, time_budget_seconds=30, chunk_size=2)
+    
+    assert result == {'written': 4, 'completed': 1}
+    snapshots = {s.bag_id: s for s in db_session.query(BagScanSnapshot).all()}
+    assert len(snapshots) == 5
+    assert snapshots[bags[0].id].etag == 'existing'
+    assert json.loads(snapshots[bags[1].id].payload)['bag']['name'] == 'Kit 1'
+    
+    assert warm_scan_snapshots(db_session, time_budget_seconds=30, chunk_size=2) == {'written': 0, 'completed': 1}
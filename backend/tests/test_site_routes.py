@@ -346,7 +346,7 @@ def test_delete_site_with_bags_conflict(client, db_session, auth_token):
     db_session.commit()
     
     # Add a bag to the site
-    bag = Bag(site_id=site.id, name='Test Bag', qr_token='test-token-123', active=True)
+    bag = Bag(site_id=site.id, name='Test Bag', qr_token='00000000-0000-4000-8000-000000000100', active=True)
     db_session.add(bag)
     db_session.commit()
     
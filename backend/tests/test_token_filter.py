@@ -0,0 +1,200 @@
+"""
+Tests for the QR token filter (Bloom filter + negative cache)
+"""
+import pytest
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ['JWT_SECRET'] = 'test-secret-key-for-testing'
+os.environ['ADMIN_PASSWORD'] = 'testpassword123'
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['TESTING'] = 'true'
+
+from sqlalchemy import event
+from app import app
+from database import Base, engine, SessionLocal
+from models import Admin, Site, Bag
+from services.auth_service import AuthService
+from services.qr_service import QRService
+from services.token_filter import BloomFilter, NegativeCache
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session with admin user and empty scan caches"""
+    Base.metadata.create_all(bind=engine)
+    QRService.clear_cache()
+    db = SessionLocal()
+    
+    password_hash = AuthService.hash_password('testpassword123')
+    db.add(Admin(username='admin', password_hash=password_hash))
+    db.commit()
+    
+    yield db
+    
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def auth_headers(client, db_session):
+    """Authorization headers for the test admin"""
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'testpassword123'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def sample_site(db_session):
+    """Create a sample site"""
+    site = Site(name='Test Site', alert_recipients='["admin@example.com"]')
+    db_session.add(site)
+    db_session.commit()
+    db_session.refresh(site)
+    return site
+
+
+@pytest.fixture
+def statement_counter():
+    """Count SQL statements executed while the fixture is active"""
+    counter = {'count': 0}
+    
+    def count(*args):
+        counter['count'] += 1
+    
+    event.listen(engine, 'before_cursor_execute', count)
+    yield counter
+    event.remove(engine, 'before_cursor_execute', count)
+
+
+# Unit tests
+
+def test_bloom_filter_has_no_false_negatives():
+    """Every added value is reported as present"""
+    bloom = BloomFilter(capacity=1000)
+    values = [f"token-{i}" for i in range(1000)]
+    for value in values:
+        bloom.add(value)
+    
+    assert all(value in bloom for value in values)
+
+
+def test_bloom_filter_false_positive_rate():
+    """False positive rate stays near the configured error rate"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"token-{i}")
+    
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_negative_cache_expires():
+    """Entries disappear after the TTL"""
+    cache = NegativeCache(ttl_seconds=0.01)
+    cache.add('bogus')
+    assert 'bogus' in cache
+    
+    time.sleep(0.02)
+    assert 'bogus' not in cache
+
+
+def test_negative_cache_is_bounded():
+    """Oldest entries are dropped when full"""
+    cache = NegativeCache(ttl_seconds=60, max_size=2)
+    cache.add('a')
+    cache.add('b')
+    cache.add('c')
+    
+    assert 'a' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+# Integration tests
+
+def test_unknown_token_rejected_without_query(client, db_session, sample_site, statement_counter):
+    """Once the filter is built, bogus tokens return 404 without any SQL"""
+    bag = Bag(site_id=sample_site.id, name='Kit', qr_token='00000000-0000-4000-8000-00000000010e', active=True)
+    db_session.add(bag)
+    db_session.commit()
+    client.get('/api/qr/00000000-0000-4000-8000-00000000010e')  # builds the filter
+    
+    statement_counter['count'] = 0
+    response = client.get('/api/qr/00000000-0000-4000-8000-000000000119')
+    
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'NOT_FOUND'
+    assert statement_counter['count'] == 0
+    assert QRService.token_filter_stats()['filter_rejections'] == 1
+
+
+def test_malformed_token_rejected_without_query(client, db_session, statement_counter):
+    """Tokens that are not UUIDs return 404 before the filter or database"""
+    response = client.get('/api/qr/not-a-uuid')
+    
+    assert response.status_code == 404
+    assert statement_counter['count'] == 0
+    assert QRService.token_filter_stats()['tokens'] == 0
+
+
+def test_inactive_bag_is_negative_cached(client, db_session, sample_site, statement_counter):
+    """A DB miss (inactive bag) is answered from the negative cache next time"""
+    bag = Bag(site_id=sample_site.id, name='Kit', qr_token='00000000-0000-4000-8000-00000000010b', active=False)
+    db_session.add(bag)
+    db_session.commit()
+    assert client.get('/api/qr/00000000-0000-4000-8000-00000000010b').status_code == 404
+    
+    statement_counter['count'] = 0
+    response = client.get('/api/qr/00000000-0000-4000-8000-00000000010b')
+    
+    assert response.status_code == 404
+    assert statement_counter['count'] == 0
+    assert QRService.token_filter_stats()['negative_hits'] == 1
+
+
+def test_new_bag_scannable_immediately(client, db_session, sample_site, auth_headers):
+    """Bags created after the filter was built are added by create_bag"""
+    client.get('/api/qr/00000000-0000-4000-8000-00000000011c')  # builds the (empty) filter
+    
+    response = client.post(f'/api/sites/{sample_site.id}/bags', json={'name': 'New Kit'},
+                           headers=auth_headers)
+    qr_token = response.get_json()['qr_token']
+    
+    assert client.get(f'/api/qr/{qr_token}').status_code == 200
+
+
+def test_reactivated_bag_leaves_negative_cache(client, db_session, sample_site, auth_headers):
+    """Reactivating a bag makes it scannable again right away"""
+    bag = Bag(site_id=sample_site.id, name='Kit', qr_token='00000000-0000-4000-8000-00000000010a', active=False)
+    db_session.add(bag)
+    db_session.commit()
+    assert client.get('/api/qr/00000000-0000-4000-8000-00000000010a').status_code == 404
+    
+    client.patch(f'/api/bags/{bag.id}', json={'active': True}, headers=auth_headers)
+    
+    assert client.get('/api/qr/00000000-0000-4000-8000-00000000010a').status_code == 200
+
+
+def test_metrics_exposes_token_filter_stats(client, db_session, auth_headers):
+    """GET /api/metrics includes token filter counters"""
+    client.get('/api/qr/00000000-0000-4000-8000-000000000119')
+    response = client.get('/api/metrics', headers=auth_headers)
+    
+    stats = response.get_json()['token_filter']
+    assert stats['filter_rejections'] == 1
@@ -0,0 +1,39 @@
+"""
+Warm the QR scan layers after a deploy: write missing scan snapshots
+Run with: python warm_scan_cache.py [--budget 300] [--chunk-size 500]
+
+Worker-local scan caches cannot be filled from another process; set
+QR_SCAN_WARMUP_ON_START=true to warm them when each worker starts.
+"""
+import argparse
+import logging
+import sys
+from dotenv import load_dotenv
+from database import SessionLocal
+from services.scan_warmup import warm_scan_snapshots
+
+load_dotenv()
+
+
+def warm_scan_cache(time_budget_seconds: float, chunk_size: int):
+    """Write bag_scan_snapshots rows for active bags that have none"""
+    db = SessionLocal()
+    try:
+        result = warm_scan_snapshots(db, time_budget_seconds, chunk_size)
+        status = "complete" if result['completed'] else "stopped at time budget"
+        print(f"✓ Wrote {result['written']} scan snapshot(s) ({status})")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Failed to warm scan snapshots: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget', type=float, default=300.0, help='time budget in seconds')
+    parser.add_argument('--chunk-size', type=int, default=500, help='bags per chunk')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    warm_scan_cache(args.budget, args.chunk_size)